@@ -20,8 +20,18 @@ from app.database.models import Base, UserModel  # noqa: E402, F401
 from app.database.models.order_models import Order  # noqa: E402
 from app.database.models.trade_models import Trade  # noqa: E402
 from app.database.models.price_models import PriceHistoryModel  # noqa: E402
+from app.database.models.instrument_models import (  # noqa: E402
+    InstrumentModel,
+)
 
-__all__ = ["Base", "UserModel", "Order", "Trade", "PriceHistoryModel"]
+__all__ = [
+    "Base",
+    "UserModel",
+    "Order",
+    "Trade",
+    "PriceHistoryModel",
+    "InstrumentModel",
+]
 
 config = context.config
 
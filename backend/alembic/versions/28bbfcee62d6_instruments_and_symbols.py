@@ -0,0 +1,78 @@
+"""instruments and symbols
+
+Revision ID: 28bbfcee62d6
+Revises: 4447c8986e01
+Create Date: 2026-10-19 07:45:25.449330
+
+"""
+
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "28bbfcee62d6"
+down_revision: Union[str, Sequence[str], None] = "4447c8986e01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Instrument that existing orders, trades and prices are assigned to
+DEFAULT_SYMBOL = "BTC-USD"
+SYMBOL_TABLES = ("orders", "trades", "price_history")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    instruments = op.create_table(
+        "instruments",
+        sa.Column("symbol", sa.String(length=20), nullable=False),
+        sa.Column("active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("symbol"),
+    )
+    op.bulk_insert(
+        instruments,
+        [
+            {
+                "symbol": DEFAULT_SYMBOL,
+                "active": True,
+                "created_at": datetime.utcnow(),
+            }
+        ],
+    )
+    for table in SYMBOL_TABLES:
+        # Backfill existing rows through the server default, then drop it
+        op.add_column(
+            table,
+            sa.Column(
+                "symbol",
+                sa.String(length=20),
+                nullable=False,
+                server_default=DEFAULT_SYMBOL,
+            ),
+        )
+        op.alter_column(table, "symbol", server_default=None)
+        op.create_index(
+            op.f(f"ix_{table}_symbol"), table, ["symbol"], unique=False
+        )
+        op.create_foreign_key(
+            f"fk_{table}_symbol_instruments",
+            table,
+            "instruments",
+            ["symbol"],
+            ["symbol"],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(SYMBOL_TABLES):
+        op.drop_constraint(
+            f"fk_{table}_symbol_instruments", table, type_="foreignkey"
+        )
+        op.drop_index(op.f(f"ix_{table}_symbol"), table_name=table)
+        op.drop_column(table, "symbol")
+    op.drop_table("instruments")
@@ -0,0 +1,40 @@
+"""stop orders
+
+Revision ID: 5e8a0f3c1d27
+Revises: 9c41d2e7b5a3
+Create Date: 2026-10-19 08:41:52.618307
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8a0f3c1d27"
+down_revision: Union[str, Sequence[str], None] = "9c41d2e7b5a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STOP_ORDER_TYPES = ("STOP", "STOP_LIMIT")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # New enum values cannot be used in the transaction adding them
+    with op.get_context().autocommit_block():
+        for order_type in STOP_ORDER_TYPES:
+            op.execute(
+                f"ALTER TYPE ordertype ADD VALUE IF NOT EXISTS '{order_type}'"
+            )
+    op.add_column("orders", sa.Column("stop_price", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop enum values: stop orders are removed and the
+    # values are left on ordertype, unused
+    op.execute("DELETE FROM orders WHERE order_type IN ('STOP', 'STOP_LIMIT')")
+    op.drop_column("orders", "stop_price")
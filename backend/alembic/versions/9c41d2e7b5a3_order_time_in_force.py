@@ -0,0 +1,44 @@
+"""order time in force
+
+Revision ID: 9c41d2e7b5a3
+Revises: 28bbfcee62d6
+Create Date: 2026-10-19 08:12:37.204815
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9c41d2e7b5a3"
+down_revision: Union[str, Sequence[str], None] = "28bbfcee62d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+time_in_force = sa.Enum("GTC", "IOC", "FOK", "POST_ONLY", name="timeinforce")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    time_in_force.create(op.get_bind(), checkfirst=True)
+    # Existing orders are good till cancelled: backfill them through the
+    # server default, then drop it
+    op.add_column(
+        "orders",
+        sa.Column(
+            "time_in_force",
+            time_in_force,
+            nullable=False,
+            server_default="GTC",
+        ),
+    )
+    op.alter_column("orders", "time_in_force", server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("orders", "time_in_force")
+    time_in_force.drop(op.get_bind(), checkfirst=True)
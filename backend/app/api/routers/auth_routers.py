@@ -6,7 +6,9 @@ from sqlalchemy.exc import IntegrityError
 
 
 from app.api.services.auth_service import AuthService
+from app.core.rate_limit_dependencies import auth_rate_limit
 from app.database import get_db_session
+from app.util.auth_util import PasswordHasherBusyError
 from app.schemas.auth_schemas import (
     UserSignupRequestSchema,
     UserSignupResponseSchema,
@@ -19,6 +21,7 @@ router = APIRouter()
 
 @router.post(
     path="/signup",
+    dependencies=[Depends(auth_rate_limit)],
     response_model=UserSignupResponseSchema,
     status_code=status.HTTP_201_CREATED,
 )
@@ -44,6 +47,13 @@ async def signup_user(
             status_code=status.HTTP_409_CONFLICT,
         )
 
+    except PasswordHasherBusyError as e:
+        return JSONResponse(
+            content={"message": "User creation failed", "error": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+
     except Exception as e:
         return JSONResponse(
             content={"message": "User creation failed", "error": str(e)},
@@ -53,6 +63,7 @@ async def signup_user(
 
 @router.post(
     path="/login",
+    dependencies=[Depends(auth_rate_limit)],
     response_model=UserLoginResponseSchema,
     status_code=status.HTTP_200_OK,
 )
@@ -78,6 +89,13 @@ async def login_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
         )
 
+    except PasswordHasherBusyError as e:
+        return JSONResponse(
+            content={"message": "Login failed", "error": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+
     except Exception as e:
         return JSONResponse(
             content={"message": "Login failed", "error": str(e)},
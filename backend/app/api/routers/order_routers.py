@@ -1,31 +1,56 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+from app.config import config
 from app.database import get_db_session
+from app.database.enums.oder_enums import Side
 from app.api.services.order_book_service import OrderBookService
-from app.api.services.ws_service import ws_manager
-from app.database.models.user_models import UserModel
+from app.api.services.order_matching_service import engine_registry
+from app.api.services.engine_shard_service import engine_shard_pool
 from app.schemas.order_schemas import (
     PlaceOrderRequest,
+    PlaceOrderBatchRequest,
+    CancelOrderBatchRequest,
+    AmendOrderRequest,
     OrderResponse,
     BookSnapshotResponse,
+    QuoteResponse,
 )
+from app.schemas.auth_schemas import AuthenticatedUserSchema
 from app.schemas.trade_scehmas import TradeResponse
 from app.core.auth_dependencies import get_current_user, get_current_admin_user
+from app.core.admission_dependencies import admit_order
+from app.core.rate_limit_dependencies import charge_user, order_rate_limit
 
 router = APIRouter()
-ws_service = ws_manager
+
+# Instrument of the book a route works on
+symbol_query = Query(
+    default=config.DEFAULT_SYMBOL,
+    min_length=1,
+    max_length=20,
+    description="Instrument symbol",
+)
 
 
-@router.post("/place")
+@router.post(
+    "/place",
+    dependencies=[Depends(order_rate_limit), Depends(admit_order)],
+)
 async def place_order(
     order_request: PlaceOrderRequest,
-    current_user: UserModel = Depends(get_current_user),
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
     db_session: Session = Depends(get_db_session),
 ):
     """
-    Place a new buy/sell order
+    Place a new buy/sell order on the book of order_request.symbol
+
+    An optional client_order_id (unique per user) makes retries safe: placing
+    the same client_order_id again returns the existing order and its trades
+    without matching it again
+
+    Answers 503 with Retry-After while the server sheds new orders
 
     Returns:
     - trades: List of executed trades (if any)
@@ -33,17 +58,14 @@ async def place_order(
     - order_executed: Boolean indicating if the order was executed immediately
     """
     try:
-        order_service = OrderBookService(db_session)
+        order_service = OrderBookService(db_session, order_request.symbol)
+        # Book updates and executions are queued by the service and fanned
+        # out by the broadcaster task, so this returns without waiting on
+        # WebSocket clients
         result = await order_service.place_order(
             user_id=str(current_user.user_id), order_request=order_request
         )
 
-        # Broadcast order book updates via WebSocket
-        order_book = order_service.get_order_book_snapshot()
-        await ws_service.broadcast_message(
-            {"type": "order_book_update", "data": order_book.dict()}
-        )
-
         return result
 
     except Exception as e:
@@ -53,21 +75,69 @@ async def place_order(
         )
 
 
+@router.post("/batch", dependencies=[Depends(admit_order)])
+async def place_order_batch(
+    batch_request: PlaceOrderBatchRequest,
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
+    db_session: Session = Depends(get_db_session),
+):
+    """
+    Place several buy/sell orders for one symbol in one request
+
+    Orders are matched in request order and persisted in one transaction,
+    with a single order book update for the whole batch. An order that
+    cannot be placed is skipped, the others still are. Every order counts
+    against the rate limit; a batch larger than its burst is rejected
+    with 422. Answers 503 with Retry-After, like /place,
+    while the server sheds new orders.
+
+    Returns:
+    - results: for each order, in request order, the same trades, order and
+      order_executed fields as /place, or the error of a skipped order
+    """
+    charge_user("orders", current_user.user_id, len(batch_request.orders))
+    try:
+        order_service = OrderBookService(db_session, batch_request.symbol)
+        results = await order_service.place_orders(
+            user_id=str(current_user.user_id),
+            order_requests=batch_request.orders,
+        )
+
+        return {
+            "results": [
+                (
+                    {"error": f"Failed to place order: {str(result)}"}
+                    if isinstance(result, Exception)
+                    else result
+                )
+                for result in results
+            ]
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to place orders: {str(e)}",
+        )
+
+
 @router.delete("/cancel/{order_id}")
 async def cancel_order(
     order_id: str,
-    current_user: UserModel = Depends(get_current_user),
+    symbol: str = symbol_query,
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
     db_session: Session = Depends(get_db_session),
 ):
     """
     Cancel an existing order
 
     - **order_id**: ID of the order to cancel
+    - **symbol**: instrument of the order
     """
     try:
-        order_service = OrderBookService(db_session)
-        success = order_service.cancel_order(
-            user_id=current_user.user_id, order_id=order_id
+        order_service = OrderBookService(db_session, symbol)
+        success = await order_service.run_priority_command(
+            "cancel_order", user_id=current_user.user_id, order_id=order_id
         )
 
         if not success:
@@ -76,12 +146,6 @@ async def cancel_order(
                 detail="Order not found or cannot be cancelled",
             )
 
-        # Broadcast order book updates
-        order_book = order_service.get_order_book_snapshot()
-        await ws_service.broadcast_message(
-            {"type": "order_book_update", "data": order_book.dict()}
-        )
-
         return {
             "message": "Order cancelled successfully",
             "order_id": order_id,
@@ -96,10 +160,129 @@ async def cancel_order(
         )
 
 
+@router.patch("/{order_id}", dependencies=[Depends(order_rate_limit)])
+async def amend_order(
+    order_id: str,
+    amend_request: AmendOrderRequest,
+    symbol: str = symbol_query,
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
+    db_session: Session = Depends(get_db_session),
+):
+    """
+    Amend an open limit order
+
+    - **quantity**: new total quantity, must exceed the filled quantity
+    - **price**: new limit price
+    - **symbol**: instrument of the order
+
+    Reducing the quantity keeps the order's queue priority; a price change
+    or a quantity increase re-queues it and may execute immediately.
+    Returns the same fields as /place
+    """
+    try:
+        order_service = OrderBookService(db_session, symbol)
+        result = await order_service.run_priority_command(
+            "amend_order",
+            user_id=str(current_user.user_id),
+            order_id=order_id,
+            quantity=amend_request.quantity,
+            price=amend_request.price,
+        )
+
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found or cannot be amended",
+            )
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to amend order: {str(e)}",
+        )
+
+
+@router.post("/cancel-batch")
+async def cancel_order_batch(
+    cancel_request: CancelOrderBatchRequest,
+    symbol: str = symbol_query,
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
+    db_session: Session = Depends(get_db_session),
+):
+    """
+    Cancel several orders in one request
+
+    - **order_ids**: IDs of the orders to cancel
+    - **symbol**: instrument of the orders
+
+    Returns the IDs cancelled and the IDs not found or no longer open
+    """
+    try:
+        order_ids = [str(order_id) for order_id in cancel_request.order_ids]
+        order_service = OrderBookService(db_session, symbol)
+        cancelled = await order_service.run_priority_command(
+            "cancel_orders",
+            user_id=str(current_user.user_id),
+            order_ids=order_ids,
+        )
+
+        cancelled_ids = set(cancelled)
+        return {
+            "message": f"{len(cancelled)} orders cancelled",
+            "cancelled": cancelled,
+            "not_found": [
+                order_id
+                for order_id in order_ids
+                if order_id not in cancelled_ids
+            ],
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to cancel orders: {str(e)}",
+        )
+
+
+@router.delete("/all")
+async def cancel_all_orders(
+    side: Optional[Side] = None,
+    symbol: str = symbol_query,
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
+    db_session: Session = Depends(get_db_session),
+):
+    """
+    Cancel all of the user's open orders on one instrument
+
+    - **side**: only cancel BUY or SELL orders (default: both)
+    - **symbol**: instrument of the orders
+    """
+    try:
+        order_service = OrderBookService(db_session, symbol)
+        cancelled = await order_service.run_priority_command(
+            "cancel_all_orders", user_id=str(current_user.user_id), side=side
+        )
+
+        return {
+            "message": f"{len(cancelled)} orders cancelled",
+            "cancelled": cancelled,
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to cancel orders: {str(e)}",
+        )
+
+
 @router.get("/my-orders", response_model=List[OrderResponse])
 async def get_my_orders(
     active_only: bool = False,
-    current_user: UserModel = Depends(get_current_user),
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
     db_session: Session = Depends(get_db_session),
 ):
     """
@@ -121,16 +304,55 @@ async def get_my_orders(
         )
 
 
+@router.get("/client/{client_order_id}", response_model=OrderResponse)
+async def get_order_by_client_order_id(
+    client_order_id: str,
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
+    db_session: Session = Depends(get_db_session),
+):
+    """
+    Get one of the user's orders by the client_order_id it was placed with,
+    e.g. to check whether a timed out /place went through
+    """
+    try:
+        order_service = OrderBookService(db_session)
+        order = await engine_shard_pool.run(
+            order_service.get_order_by_client_order_id,
+            user_id=str(current_user.user_id),
+            client_order_id=client_order_id,
+        )
+
+        if order is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found",
+            )
+
+        return order
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to fetch order: {str(e)}",
+        )
+
+
 @router.get("/book", response_model=BookSnapshotResponse)
-async def get_order_book(db: Session = Depends(get_db_session)):
+async def get_order_book(
+    symbol: str = symbol_query, db: Session = Depends(get_db_session)
+):
     """
-    Get current order book snapshot
+    Get current order book snapshot of an instrument
 
     Returns current bids, asks, and last trade price
     """
     try:
-        order_service = OrderBookService(db)
-        order_book = order_service.get_order_book_snapshot()
+        order_service = OrderBookService(db, symbol)
+        order_book = await engine_shard_pool.run(
+            order_service.get_order_book_snapshot
+        )
         return order_book
 
     except Exception as e:
@@ -140,21 +362,51 @@ async def get_order_book(db: Session = Depends(get_db_session)):
         )
 
 
+@router.get("/quote", response_model=QuoteResponse)
+async def get_quote(
+    side: Side,
+    qty: float = Query(gt=0, description="Quantity to fill"),
+    symbol: str = symbol_query,
+    db: Session = Depends(get_db_session),
+):
+    """
+    Quote a market order against the current book of an instrument
+
+    - **side**: side of the market order, a buy is filled by the asks
+    - **qty**: quantity to fill
+    - **symbol**: instrument to quote
+
+    Returns the fillable quantity, average and worst price, notional
+    and slippage from the best price
+    """
+    try:
+        order_service = OrderBookService(db, symbol)
+        return await engine_shard_pool.run(order_service.get_quote, side, qty)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to get quote: {str(e)}",
+        )
+
+
 @router.get("/recent-trades", response_model=List[TradeResponse])
 async def get_recent_trades(
     limit: int = 50,
-    current_admin: UserModel = Depends(get_current_admin_user),
+    symbol: str = symbol_query,
+    current_admin: AuthenticatedUserSchema = Depends(get_current_admin_user),
     db_session: Session = Depends(get_db_session),
 ):
     """
     Get recent trades for market data (Admin only)
 
     - **limit**: Maximum number of trades to return (default: 50)
+    - **symbol**: instrument of the trades
 
     Requires admin privileges to access.
     """
     try:
-        order_service = OrderBookService(db_session)
+        order_service = OrderBookService(db_session, symbol)
         trades = order_service.get_recent_trades(limit=limit)
         return trades
 
@@ -163,3 +415,43 @@ async def get_recent_trades(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to get recent trades: {str(e)}",
         )
+
+
+@router.put("/instruments/{symbol}/shard")
+async def move_instrument(
+    symbol: str,
+    shard: int,
+    current_admin: AuthenticatedUserSchema = Depends(get_current_admin_user),
+):
+    """
+    Move an instrument's book to another engine process (Admin only)
+
+    - **symbol**: instrument to move
+    - **shard**: engine process to move it to, 0 to ENGINE_SHARDS - 1
+
+    The resting orders keep their priority; commands for the instrument
+    that arrive during the move fail and can be retried.
+    """
+    if not engine_shard_pool.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Engine sharding is disabled",
+        )
+
+    try:
+        engine_registry.get(symbol)
+        previous_shard = await engine_shard_pool.run(
+            engine_shard_pool.move, symbol, shard
+        )
+        return {
+            "message": f"{symbol} is on engine shard {shard}",
+            "symbol": symbol,
+            "shard": shard,
+            "previous_shard": previous_shard,
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to move instrument: {str(e)}",
+        )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from fastapi import Query, Depends
 from sqlalchemy.orm import Session
+from app.config import config
 from app.database import get_db_session
 from app.database.models.price_models import PriceHistoryModel
 from app.schemas.price_schemas import PriceHistoryResponse, PriceHistory
@@ -16,10 +17,17 @@ async def get_price_data(
         le=1000,
         description="Number of price entries to return",
     ),
+    symbol: str = Query(
+        default=config.DEFAULT_SYMBOL,
+        min_length=1,
+        max_length=20,
+        description="Instrument symbol",
+    ),
     db: Session = Depends(get_db_session),
 ):
     prices = (
         db.query(PriceHistoryModel)
+        .filter(PriceHistoryModel.symbol == symbol)
         .order_by(PriceHistoryModel.timestamp.desc())
         .limit(limit)
         .all()
@@ -9,8 +9,13 @@ from fastapi import (
 from fastapi.security import HTTPBearer
 from typing import Optional
 
+from app.api.services.ws_order_service import (
+    ORDER_COMMANDS,
+    handle_order_command,
+)
 from app.api.services.ws_service import ws_manager
 from app.util.auth_util import decode_access_token
+from app.util.codec_util import negotiate_encoding
 
 router = APIRouter()
 security = HTTPBearer()
@@ -18,11 +23,28 @@ security = HTTPBearer()
 
 @router.websocket("/update")
 async def websocket_endpoint(
-    websocket: WebSocket, token: Optional[str] = None
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    encoding: Optional[str] = None,
 ):
     """
     WebSocket endpoint for real-time trading updates
     Requires access_token as query parameter: /update?token=your_access_token
+    Optional encoding query parameter selects the wire format of server
+    pushes (json or msgpack, default json): /update?token=...&encoding=msgpack
+    Market data is published per instrument on topics "book.<symbol>" and
+    "price.<symbol>"; send {"type": "subscribe", "symbols": ["BTC-USD"]}
+    to receive only some instruments (an empty list for all of them)
+    After a reconnect, send {"type": "resume", "last_seq":
+    {"book.BTC-USD": 41}} to receive the missed book/price events (or a
+    snapshot if too far behind)
+    The server sends {"type": "ping"} to quiet clients; any client message
+    (e.g. {"type": "pong"}) keeps the connection from being reaped as idle
+    Orders can be placed, cancelled and amended on the socket with a client
+    correlation id, e.g. {"type": "place", "id": "c1", "order": {...}},
+    {"type": "cancel", "id": "c2", "order_id": "..."} or {"type": "amend",
+    "id": "c3", "order_id": "...", "quantity": 5}; the ack or reject
+    echoes the id and executions arrive as "executions" events
     """
     try:
         await websocket.accept()
@@ -61,15 +83,18 @@ async def websocket_endpoint(
             return
 
         # Add client to manager
-        await ws_manager.connect(websocket, user_id)
+        encoding = negotiate_encoding(encoding)
+        await ws_manager.connect(websocket, user_id, encoding=encoding)
 
-        # Send connection success message
+        # Send connection success message, always as JSON text so the
+        # client can confirm the negotiated encoding
         await websocket.send_text(
             json.dumps(
                 {
                     "event": "connected",
                     "message": "Successfully connected to trading WebSocket",
                     "user_id": user_id,
+                    "encoding": encoding,
                 }
             )
         )
@@ -78,9 +103,28 @@ async def websocket_endpoint(
         try:
             while True:
                 data = await websocket.receive_text()
+                ws_manager.touch(websocket)
                 message = json.loads(data)
                 if message.get("type") == "ping":
                     await websocket.send_text(json.dumps({"type": "pong"}))
+                elif message.get("type") == "resume":
+                    # Catch up from the in-memory replay buffers
+                    # instead of re-querying /orders/book and /prices/
+                    try:
+                        await ws_manager.replay(
+                            websocket, message.get("last_seq") or {}
+                        )
+                    except ValueError as e:
+                        await ws_manager.send_to_connection(
+                            websocket, {"event": "error", "message": str(e)}
+                        )
+                elif message.get("type") == "subscribe":
+                    ws_manager.subscribe(
+                        websocket, message.get("symbols") or []
+                    )
+                elif message.get("type") in ORDER_COMMANDS:
+                    reply = await handle_order_command(user_id, message)
+                    await ws_manager.send_to_connection(websocket, reply)
 
         except WebSocketDisconnect:
             ws_manager.disconnect(websocket, user_id)
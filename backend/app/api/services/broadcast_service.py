@@ -0,0 +1,77 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.config import config
+
+
+class EventBroadcaster:
+    """
+    In-process event queue drained by a dedicated fan-out task, so request
+    handlers only enqueue WebSocket events and never await the sends
+    """
+
+    def __init__(self, max_queue_size: int = None):
+        self.max_queue_size = max_queue_size or config.WS_EVENT_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published_events = 0
+        self.dropped_events = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        """Start the fan-out task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is loop
+        ):
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """Deliver the events already queued, then stop the fan-out task"""
+        if self._task is None:
+            return
+
+        if not self._task.done():
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._queue = None
+
+    def publish(self, send: Callable[..., Awaitable], *args):
+        """
+        Queue a WebSocket send, e.g. publish(ws_manager.send_executions,
+        user_id, report). Never blocks; events are dropped when full
+        """
+        self.start()
+        try:
+            self._queue.put_nowait((send, args))
+        except asyncio.QueueFull:
+            self.dropped_events += 1
+            return
+        self.published_events += 1
+
+    async def _run(self):
+        while True:
+            send, args = await self._queue.get()
+            try:
+                await send(*args)
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+
+# Global broadcaster instance
+ws_broadcaster = EventBroadcaster()
@@ -0,0 +1,705 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, List, Optional
+
+from app.config import config
+from app.database.enums.oder_enums import Side
+from app.database.models.order_models import Order
+from app.api.services.order_matching_service import (
+    EngineRegistry,
+    OrderMatchingEngine,
+    TradeResult,
+    UnknownInstrumentError,
+    build_execution_reports,
+)
+from app.api.services.market_data_service import (
+    MarketDataPublisher,
+    market_data_reader,
+)
+from app.api.services.ws_service import ws_manager
+from app.api.services.broadcast_service import ws_broadcaster
+from app.util.depth_util import Quote
+from app.util.shard_util import ConsistentHashRing
+
+# Order columns the engine reads and writes, copied between processes
+ORDER_FIELDS = (
+    "order_id",
+    "user_id",
+    "symbol",
+    "side",
+    "order_type",
+    "price",
+    "quantity",
+    "remaining",
+    "status",
+    "active",
+    "time_in_force",
+    "stop_price",
+    "created_at",
+    "client_order_id",
+)
+
+# Engine methods whose arguments and results cross the socket as they are
+PLAIN_METHODS = frozenset(
+    {
+        "cancel_order",
+        "cancel_orders",
+        "cancel_user_orders",
+        "register_client_order_id",
+        "lookup_client_order_id",
+        "get_best_bid",
+        "get_best_ask",
+        "get_last_trade_price",
+        "set_last_trade_price",
+        "get_book_update",
+        "quote",
+    }
+)
+
+# Commands that can change a book, republished to shared memory after them
+BOOK_METHODS = frozenset(
+    {
+        "add_order",
+        "amend_order",
+        "cancel_order",
+        "cancel_orders",
+        "cancel_user_orders",
+        "set_last_trade_price",
+        "import_book",
+    }
+)
+
+
+class InstrumentMovedError(Exception):
+    """A shard was asked for an instrument it does not own"""
+
+    def __init__(self, symbol: str, shard: Optional[int] = None):
+        super().__init__(
+            f"Instrument {symbol} is being moved between engines, retry"
+        )
+        self.symbol = symbol
+        self.shard = shard  # New owner, if known
+
+
+def order_state(order: Order) -> dict:
+    return {field: getattr(order, field) for field in ORDER_FIELDS}
+
+
+def order_from_state(state: dict) -> Order:
+    return Order(**state)
+
+
+def _apply_state(order: Order, state: dict):
+    for field, value in state.items():
+        setattr(order, field, value)
+
+
+def _schedule(callback, *args):
+    """Run a sync callback, or start an async one as a task"""
+    if asyncio.iscoroutinefunction(callback):
+        asyncio.create_task(callback(*args))
+    else:
+        callback(*args)
+
+
+def _authkey() -> bytes:
+    # Every process of the deployment shares the JWT secret
+    return hashlib.sha256(
+        f"engine-shards:{config.JWT_SECRET_KEY}".encode()
+    ).digest()
+
+
+class EngineShard:
+    """
+    The books of the instruments one engine process owns. Commands from
+    all HTTP workers run one at a time, so every book keeps a single writer,
+    which also publishes the book's top levels to shared memory
+    """
+
+    def __init__(self, shard_id: int):
+        self.shard_id = shard_id
+        self.registry = EngineRegistry()
+        # symbol -> shard the book was moved to
+        self.moved: Dict[str, int] = {}
+        self.publishers: Dict[str, MarketDataPublisher] = {}
+        # symbol -> book top last published
+        self._published: Dict[str, dict] = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    def handle(self, request: tuple) -> tuple:
+        """
+        Run (method, symbol, args), replying ("ok", result), ("moved",
+        new shard or None) or ("error", exception)
+        """
+        method, symbol, args = request
+        with self._lock:
+            self.commands += 1
+            try:
+                result = self._run(method, symbol, args)
+            except InstrumentMovedError as e:
+                return "moved", e.shard
+            except Exception as e:
+                return "error", e
+            if method in BOOK_METHODS:
+                self.publish(symbol)
+            return "ok", result
+
+    def publish(self, symbol: str):
+        """
+        Publish the current top of the book of symbol, if it changed. The
+        top comes from the engine's depth ladders, so a command costs
+        O(depth) here, not a scan of the book
+        """
+        try:
+            publisher = self.publishers.get(symbol)
+            if publisher is None:
+                publisher = MarketDataPublisher(symbol)
+                self.publishers[symbol] = publisher
+            book_top = self.registry.get(symbol).get_book_top(
+                publisher.depth
+            )
+            if self._published.get(symbol) == book_top:
+                return
+            publisher.publish(book_top)
+            self._published[symbol] = book_top
+        except Exception:
+            pass
+
+    def close(self):
+        """Remove the shared memory of the books still owned"""
+        for publisher in self.publishers.values():
+            publisher.unlink()
+        self.publishers = {}
+        self._published = {}
+
+    def _engine(self, symbol: str) -> OrderMatchingEngine:
+        try:
+            return self.registry.get(symbol)
+        except UnknownInstrumentError:
+            raise InstrumentMovedError(symbol, self.moved.get(symbol))
+
+    def _run(self, method: str, symbol: str, args: tuple):
+        if method == "import_book":
+            return self.import_book(symbol, *args)
+
+        engine = self._engine(symbol)
+        if method == "export_book":
+            return self.export_book(symbol, *args)
+        if method == "add_order":
+            order = order_from_state(args[0])
+            trades = engine.add_order(order)
+            return trades, order_state(order), self._triggered(engine)
+        if method == "amend_order":
+            order = engine.get_order(args[0])
+            trades = engine.amend_order(*args)
+            if trades is None:
+                return None
+            return trades, order_state(order), self._triggered(engine)
+        if method == "get_user_order":
+            order = engine.get_user_order(*args)
+            return order_state(order) if order is not None else None
+        if method == "get_user_open_orders":
+            return [
+                order_state(order)
+                for order in engine.get_user_open_orders(*args)
+            ]
+        if method in PLAIN_METHODS:
+            return getattr(engine, method)(*args)
+        raise ValueError(f"Unsupported engine command: {method}")
+
+    def _triggered(self, engine: OrderMatchingEngine) -> List[dict]:
+        """States of the stop orders the last command triggered"""
+        return [order_state(order) for order in engine.pop_triggered_orders()]
+
+    def export_book(self, symbol: str, target_shard: int) -> dict:
+        """
+        Hand the book of symbol over to target_shard: it is removed here
+        and later commands are redirected
+        """
+        engine = self.registry.remove(symbol)
+        self.moved[symbol] = target_shard
+        # The new owner takes over the shared memory region
+        publisher = self.publishers.pop(symbol, None)
+        if publisher is not None:
+            publisher.close()
+        self._published.pop(symbol, None)
+        return {
+            "orders": [order_state(o) for o in engine.resting_orders()],
+            "last_trade_price": engine.get_last_trade_price(),
+        }
+
+    def import_book(self, symbol: str, book: dict):
+        """Take over the book of symbol exported by another shard"""
+        if symbol in self.registry.symbols():
+            raise ValueError(f"Instrument {symbol} is already on this shard")
+        engine = self.registry.register(symbol)
+        engine.set_last_trade_price(book["last_trade_price"])
+        engine.load_resting_orders(
+            [order_from_state(state) for state in book["orders"]]
+        )
+        self.moved.pop(symbol, None)
+
+
+def _serve_connection(shard: EngineShard, connection: Connection):
+    try:
+        while True:
+            connection.send(shard.handle(connection.recv()))
+    except (EOFError, OSError):
+        pass
+    finally:
+        connection.close()
+
+
+def run_shard(
+    shard_id: int, shard_count: int, address: str, restore: bool = True
+):
+    """
+    Entry point of an engine process: restore and publish the books the
+    ring assigns to this shard, then serve the HTTP workers, one thread
+    per connection
+    """
+    shard = EngineShard(shard_id)
+    # terminate() exits through the finally below
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if restore:
+        # Import here to avoid circular imports
+        from app.api.services.startup_service import restore_engines
+
+        ring = ConsistentHashRing(list(range(shard_count)))
+        restore_engines(
+            shard.registry,
+            owns=lambda symbol: ring.shard_for(symbol) == shard_id,
+        )
+    for symbol in shard.registry.symbols():
+        shard.publish(symbol)
+
+    listener = Listener(address, family="AF_UNIX", authkey=_authkey())
+    print(f"Engine shard {shard_id} serving {shard.registry.symbols()}")
+    try:
+        while True:
+            try:
+                connection = listener.accept()
+            except (EOFError, OSError, multiprocessing.AuthenticationError):
+                continue
+            threading.Thread(
+                target=_serve_connection,
+                args=(shard, connection),
+                daemon=True,
+            ).start()
+    finally:
+        shard.close()
+
+
+class EngineShardPool:
+    """
+    ENGINE_SHARDS engine processes owning the instrument books, and this
+    process's connections to them. Whoever starts the pool (the gunicorn
+    master) owns the processes; every worker connects over Unix sockets
+    and sends each command to the shard owning the symbol on the
+    consistent-hash ring. Their sockets block, so the service work that
+    sends commands runs on one engine thread of the worker (see run)
+    """
+
+    def __init__(
+        self, shard_count: int = None, socket_dir: Optional[str] = None
+    ):
+        self.shard_count = (
+            config.ENGINE_SHARDS if shard_count is None else shard_count
+        )
+        self.socket_dir = socket_dir or config.ENGINE_SHARD_SOCKET_DIR
+        self.ring = ConsistentHashRing(list(range(self.shard_count)))
+        self._processes: List[multiprocessing.Process] = []
+        self._connections: Dict[int, Connection] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._pid = os.getpid()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = None
+        # Loop work deferred by the engine thread's current run
+        self._deferred = threading.local()
+        self.calls = 0
+        self.redirects = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.shard_count > 0
+
+    def address(self, shard: int) -> str:
+        return os.path.join(self.socket_dir, f"shard-{shard}.sock")
+
+    def start(self, restore: bool = True, timeout: float = 60):
+        """Start the engine processes and wait until all of them serve"""
+        os.makedirs(self.socket_dir, exist_ok=True)
+        context = multiprocessing.get_context("spawn")
+        for shard in range(self.shard_count):
+            address = self.address(shard)
+            if os.path.exists(address):
+                os.unlink(address)
+            process = context.Process(
+                target=run_shard,
+                args=(shard, self.shard_count, address, restore),
+                name=f"engine-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        deadline = time.monotonic() + timeout
+        while not self.reachable():
+            if not all(process.is_alive() for process in self._processes):
+                self.stop()
+                raise RuntimeError("An engine shard exited on startup")
+            if time.monotonic() > deadline:
+                raise RuntimeError("Engine shards did not start")
+            time.sleep(0.05)
+        # Connections must not be inherited by forked workers
+        self.close()
+
+    def ensure_started(self):
+        """Start the engine processes unless another process already did"""
+        if not self.reachable():
+            self.start()
+
+    def reachable(self) -> bool:
+        try:
+            for shard in range(self.shard_count):
+                self._connection(shard)
+        except (OSError, EOFError):
+            return False
+        return True
+
+    def stop(self):
+        self.close()
+        for process in self._processes:
+            process.terminate()
+            process.join(timeout=5)
+        self._processes = []
+        for shard in range(self.shard_count):
+            if os.path.exists(self.address(shard)):
+                os.unlink(self.address(shard))
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+    def _connection(self, shard: int) -> Connection:
+        if self._pid != os.getpid():
+            # Forked: the parent's sockets and locks are not ours
+            self._pid = os.getpid()
+            self._connections = {}
+            self._locks = {}
+        connection = self._connections.get(shard)
+        if connection is None:
+            connection = self._connections[shard] = Client(
+                self.address(shard), family="AF_UNIX", authkey=_authkey()
+            )
+        return connection
+
+    def _request(self, shard: int, request: tuple) -> tuple:
+        lock = self._locks.setdefault(shard, threading.Lock())
+        with lock:
+            connection = self._connection(shard)
+            try:
+                connection.send(request)
+                return connection.recv()
+            except (EOFError, OSError):
+                self._connections.pop(shard, None)
+                raise
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run func, service work that may command the engine processes, e.g.
+        run(service.place_user_orders, entries). With ENGINE_SHARDS it
+        runs on the engine thread, off the event loop; one thread keeps
+        the work serialized as it was on the loop. What it defers to the
+        loop (price callbacks, fan-out) runs there once it returns
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="engine"
+            )
+            self._executor_pid = os.getpid()
+        loop = asyncio.get_running_loop()
+        result, error, deferred = await loop.run_in_executor(
+            self._executor, partial(self._run_deferring, func, args, kwargs)
+        )
+        for deferred_func, deferred_args in deferred:
+            deferred_func(*deferred_args)
+        if error is not None:
+            raise error
+        return result
+
+    def _run_deferring(self, func, args: tuple, kwargs: dict) -> tuple:
+        self._deferred.calls = deferred = []
+        try:
+            return func(*args, **kwargs), None, deferred
+        except Exception as e:
+            return None, e, deferred
+        finally:
+            self._deferred.calls = None
+
+    def defer(self, func, *args):
+        """
+        Call func on the event loop: at once from the loop, or after the
+        current run when called from the engine thread
+        """
+        deferred = getattr(self._deferred, "calls", None)
+        if deferred is None:
+            func(*args)
+        else:
+            deferred.append((func, args))
+
+    def call(self, symbol: str, method: str, *args):
+        """
+        Run an engine method on the shard owning symbol. A shard that no
+        longer owns it names the new owner, which is then remembered
+        """
+        self.calls += 1
+        shard = self.ring.shard_for(symbol)
+        for _ in range(self.shard_count + 1):
+            status, result = self._request(shard, (method, symbol, args))
+            if status == "ok":
+                return result
+            if status == "error":
+                raise result
+
+            self.redirects += 1
+            if result is None:
+                # Not moved from there: fall back to the ring's owner
+                self.ring.assignments.pop(symbol, None)
+                result = self.ring.shard_for(symbol)
+                if result == shard:
+                    break
+            else:
+                self.ring.assign(symbol, result)
+            shard = result
+        raise InstrumentMovedError(symbol)
+
+    def move(self, symbol: str, shard: int) -> int:
+        """
+        Move the book of symbol to another shard without losing it, returns
+        the shard it was on
+        """
+        if shard not in range(self.shard_count):
+            raise ValueError(f"Unknown engine shard: {shard}")
+
+        # Resolve the current owner, following earlier moves
+        self.call(symbol, "get_last_trade_price")
+        source = self.ring.shard_for(symbol)
+        if source == shard:
+            return source
+
+        book = self.call(symbol, "export_book", shard)
+        status, result = self._request(shard, ("import_book", symbol, (book,)))
+        if status == "error":
+            # Put the book back where it was
+            self._request(source, ("import_book", symbol, (book,)))
+            raise result
+        self.ring.assign(symbol, shard)
+        return source
+
+    def engine(self, symbol: str) -> "ShardedEngine":
+        return ShardedEngine(self, symbol)
+
+    def metrics(self) -> dict:
+        return {
+            "shards": self.shard_count,
+            "calls": self.calls,
+            "redirects": self.redirects,
+            "assignments": dict(self.ring.assignments),
+        }
+
+
+class ShardedEngine:
+    """
+    Stands in for the OrderMatchingEngine of an instrument whose book is
+    in an engine process. Orders cross as copies: the state the engine
+    gives an order is written back to the order passed to add_order, or
+    to the copy get_user_order handed out
+    """
+
+    def __init__(self, pool: EngineShardPool, symbol: str):
+        self.pool = pool
+        self.symbol = symbol
+        self._on_price_change = None
+        # order_id -> copy returned by get_user_order, while referenced
+        self._copies = weakref.WeakValueDictionary()
+        # Copies of the stop orders triggered, until pop_triggered_orders
+        self._triggered: List[Order] = []
+
+    def _call(self, method: str, *args):
+        return self.pool.call(self.symbol, method, *args)
+
+    def add_order(self, order: Order) -> List[TradeResult]:
+        trades, state, triggered = self._call("add_order", order_state(order))
+        _apply_state(order, state)
+        self._triggered += [order_from_state(s) for s in triggered]
+        self._price_changed(trades)
+        return trades
+
+    def amend_order(
+        self,
+        order_id: str,
+        quantity: Optional[float] = None,
+        price: Optional[float] = None,
+    ) -> Optional[List[TradeResult]]:
+        result = self._call("amend_order", order_id, quantity, price)
+        if result is None:
+            return None
+        trades, state, triggered = result
+        order = self._copies.get(order_id)
+        if order is not None:
+            _apply_state(order, state)
+        self._triggered += [order_from_state(s) for s in triggered]
+        self._price_changed(trades)
+        return trades
+
+    def pop_triggered_orders(self) -> List[Order]:
+        triggered, self._triggered = self._triggered, []
+        return triggered
+
+    def get_user_order(self, user_id: str, order_id: str) -> Optional[Order]:
+        state = self._call("get_user_order", str(user_id), order_id)
+        if state is None:
+            return None
+        order = order_from_state(state)
+        self._copies[order_id] = order
+        return order
+
+    def get_user_open_orders(
+        self, user_id: str, side: Optional[Side] = None
+    ) -> List[Order]:
+        return [
+            order_from_state(state)
+            for state in self._call("get_user_open_orders", str(user_id), side)
+        ]
+
+    def cancel_order(self, order_id: str) -> bool:
+        return self._call("cancel_order", order_id)
+
+    def cancel_orders(self, order_ids: List[str]) -> List[str]:
+        return self._call("cancel_orders", order_ids)
+
+    def cancel_user_orders(
+        self, user_id: str, side: Optional[Side] = None
+    ) -> List[str]:
+        return self._call("cancel_user_orders", str(user_id), side)
+
+    def register_client_order_id(
+        self, user_id: str, client_order_id: str, order_id: str
+    ):
+        self._call(
+            "register_client_order_id", str(user_id), client_order_id, order_id
+        )
+
+    def lookup_client_order_id(
+        self, user_id: str, client_order_id: str
+    ) -> Optional[str]:
+        return self._call(
+            "lookup_client_order_id", str(user_id), client_order_id
+        )
+
+    def get_market_data(self) -> Optional[Dict]:
+        """Book top published by the engine process, read without IPC"""
+        return market_data_reader.read(self.symbol)
+
+    def _read(self, field: str):
+        # Falls back to asking the engine process until it has published
+        market_data = self.get_market_data()
+        if market_data is None:
+            return self._call(f"get_{field}")
+        return market_data[field]
+
+    def get_best_bid(self) -> Optional[float]:
+        return self._read("best_bid")
+
+    def get_best_ask(self) -> Optional[float]:
+        return self._read("best_ask")
+
+    def get_last_trade_price(self) -> float:
+        return self._read("last_trade_price")
+
+    def quote(
+        self,
+        side: Side,
+        quantity: float,
+        limit_price: Optional[float] = None,
+    ) -> Quote:
+        # Needs the full depth, not just the published top of the book
+        return self._call("quote", side, quantity, limit_price)
+
+    def get_book_update(self) -> Dict:
+        market_data = self.get_market_data()
+        if market_data is None:
+            return self._call("get_book_update")
+        return {
+            "bids": market_data["bids"],
+            "asks": market_data["asks"],
+            "last_trade_price": market_data["last_trade_price"],
+        }
+
+    def set_last_trade_price(self, price: float):
+        self._call("set_last_trade_price", price)
+
+    def set_price_change_callback(self, callback):
+        self._on_price_change = callback
+
+    def _price_changed(self, trades: List[TradeResult]):
+        """Run the price callback per trade, as the engine does in-process"""
+        callback = self._on_price_change
+        if not callback:
+            return
+        for trade in trades:
+            self.pool.defer(_schedule, callback, trade.price)
+
+    def notify_trades_and_book_update(self, trades: List[TradeResult]):
+        """Queue executed trades and the updated order book for fan-out"""
+        try:
+            self.notify_executions(trades)
+            self.notify_book_update()
+        except Exception:
+            pass
+
+    def notify_book_update(self):
+        """Queue an order book update published by the engine process"""
+        try:
+            self.pool.defer(
+                ws_broadcaster.publish,
+                ws_manager.broadcast_book_update,
+                self.get_book_update(),
+                self.symbol,
+            )
+        except Exception:
+            pass
+
+    def notify_executions(self, trades: List[TradeResult]):
+        """Queue one executions message per user for the matching pass"""
+        try:
+            reports = build_execution_reports(self.symbol, trades)
+            for user_id, report in reports.items():
+                self.pool.defer(
+                    ws_broadcaster.publish,
+                    ws_manager.send_executions,
+                    user_id,
+                    report,
+                )
+        except Exception:
+            pass
+
+
+# Global instance, only used when ENGINE_SHARDS > 0
+engine_shard_pool = EngineShardPool()
@@ -0,0 +1,143 @@
+import math
+import struct
+from typing import Dict, List, Optional
+
+from app.config import config
+from app.util.shm_util import SeqlockReader, SeqlockWriter, TornReadError
+
+# Publish sequence, best bid, best ask, last trade price (NaN for none),
+# depth, bid and ask level counts; then depth (price, qty) bid levels
+# and depth ask levels
+_HEADER = struct.Struct("<QdddIII")
+
+
+def region_name(symbol: str) -> str:
+    return f"{config.MARKET_DATA_SHM_PREFIX}-{symbol}"
+
+
+def _levels_struct(depth: int) -> struct.Struct:
+    return struct.Struct(f"<{4 * depth}d")
+
+
+def _price(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class MarketDataPublisher:
+    """
+    Publishes the top of one instrument's book into shared memory, from
+    the process owning its matching engine
+    """
+
+    def __init__(self, symbol: str, depth: int = config.MARKET_DATA_DEPTH):
+        self.symbol = symbol
+        self.depth = depth
+        self._levels = _levels_struct(depth)
+        self._writer = SeqlockWriter(
+            region_name(symbol), _HEADER.size + self._levels.size
+        )
+
+    @property
+    def sequence(self) -> int:
+        """Snapshots published to the region so far, by any owner"""
+        return self._writer.sequence // 2
+
+    def publish(self, book_update: Dict):
+        """Publish a book update as built by the engine's get_book_update"""
+        bids = book_update["bids"][: self.depth]
+        asks = book_update["asks"][: self.depth]
+        levels = [0.0] * (4 * self.depth)
+        for offset, side in ((0, bids), (2 * self.depth, asks)):
+            for i, level in enumerate(side):
+                levels[offset + 2 * i] = level["price"]
+                levels[offset + 2 * i + 1] = level["total_qty"]
+
+        header = _HEADER.pack(
+            self.sequence + 1,
+            _price(bids[0]["price"] if bids else None),
+            _price(asks[0]["price"] if asks else None),
+            _price(book_update.get("last_trade_price")),
+            self.depth,
+            len(bids),
+            len(asks),
+        )
+        self._writer.write(header + self._levels.pack(*levels))
+
+    def close(self):
+        self._writer.close()
+
+    def unlink(self):
+        self._writer.unlink()
+
+
+def _decode(payload: bytes) -> Dict:
+    sequence, best_bid, best_ask, last_price, depth, n_bids, n_asks = (
+        _HEADER.unpack_from(payload)
+    )
+    levels = _levels_struct(depth).unpack_from(payload, _HEADER.size)
+
+    def side(offset: int, count: int) -> List[Dict]:
+        return [
+            {
+                "price": levels[offset + 2 * i],
+                "total_qty": levels[offset + 2 * i + 1],
+            }
+            for i in range(count)
+        ]
+
+    return {
+        "sequence": sequence,
+        "best_bid": _optional(best_bid),
+        "best_ask": _optional(best_ask),
+        "last_trade_price": _optional(last_price),
+        "bids": side(0, n_bids),
+        "asks": side(2 * depth, n_asks),
+    }
+
+
+class MarketDataReader:
+    """
+    Reads the published books from any process without locks, IPC or
+    database queries, attaching to each instrument's region once
+    """
+
+    def __init__(self):
+        self._readers: Dict[str, SeqlockReader] = {}
+        self.reads = 0
+        self.misses = 0
+
+    def read(self, symbol: str) -> Optional[Dict]:
+        """
+        Latest snapshot of the book of symbol, None if nothing was
+        published for it or no consistent copy could be read
+        """
+        reader = self._readers.get(symbol)
+        try:
+            if reader is None:
+                reader = SeqlockReader(region_name(symbol))
+                self._readers[symbol] = reader
+            snapshot = _decode(reader.read())
+        except (FileNotFoundError, TornReadError):
+            self.misses += 1
+            return None
+        self.reads += 1
+        return snapshot
+
+    def metrics(self) -> dict:
+        return {
+            "reads": self.reads,
+            "misses": self.misses,
+            "retries": sum(r.retries for r in self._readers.values()),
+        }
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = {}
+
+
+market_data_reader = MarketDataReader()
@@ -1,22 +1,37 @@
-from typing import List
+from typing import Collection, List, Optional, Tuple
 from collections import defaultdict
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, or_
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
+from app.config import config
 from app.database.models.order_models import Order
 from app.database.models.trade_models import Trade
 from app.database.models.price_models import PriceHistoryModel
-from app.database.enums.oder_enums import OrderStatus, Side, OrderType
+from app.database.enums.oder_enums import (
+    OrderStatus,
+    Side,
+    OrderType,
+    TimeInForce,
+    STOP_ORDER_TYPES,
+)
 from app.schemas.order_schemas import (
     PlaceOrderRequest,
     OrderResponse,
     BookSnapshotResponse,
     BookLevel,
+    QuoteResponse,
 )
 from app.schemas.trade_scehmas import TradeResponse
-from app.api.services.order_matching_service import matching_engine
+from app.api.services.order_matching_service import (
+    OrderMatchingEngine,
+    engine_registry,
+)
+from app.api.services.engine_shard_service import engine_shard_pool
 from app.api.services.ws_service import ws_manager
+from app.api.services.broadcast_service import ws_broadcaster
+from app.api.services.order_queue_service import order_entry_queue
 
 
 class PlaceOrderResponse:
@@ -26,50 +41,68 @@ class PlaceOrderResponse:
 
 
 class OrderBookService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, symbol: str = config.DEFAULT_SYMBOL):
         self.db = db
-
-        # Initialize last trade price from DB
-        self._initialize_last_trade_price_from_price_history()
+        # Instrument whose book this service trades and reads
+        self.symbol = symbol
 
         async def save_and_broadcast_price(price):
             now = datetime.now(timezone.utc)
-            price_entry = PriceHistoryModel(price=price, timestamp=now)
+            price_entry = PriceHistoryModel(
+                symbol=symbol, price=price, timestamp=now
+            )
             self.db.add(price_entry)
             self.db.commit()
-            # Broadcast price change event
-            await ws_manager.broadcast_price_change(price, now)
+            # Queue price change event for fan-out
+            ws_broadcaster.publish(
+                ws_manager.broadcast_price_change, price, now, symbol
+            )
 
         # Register the async callback
-        matching_engine.set_price_change_callback(save_and_broadcast_price)
+        self.engine.set_price_change_callback(save_and_broadcast_price)
+
+    @property
+    def engine(self) -> OrderMatchingEngine:
+        """Matching engine of the service's instrument"""
+        return engine_registry.get(self.symbol)
 
     def _initialize_last_trade_price_from_price_history(self):
         """
         Initialize last trade price from the most recent price
-        in price_history table
+        in price_history table, when the book is restored: the live price
+        belongs to the engine
         """
         last_price = (
             self.db.query(PriceHistoryModel)
+            .filter(PriceHistoryModel.symbol == self.symbol)
             .order_by(PriceHistoryModel.timestamp.desc())
             .first()
         )
         if last_price:
-            matching_engine.set_last_trade_price(last_price.price)
+            self.engine.set_last_trade_price(last_price.price)
         else:
             # Fallback to last trade if no price history
-            last_trade = self.db.query(Trade).order_by(desc(Trade.ts)).first()
+            last_trade = (
+                self.db.query(Trade)
+                .filter(Trade.symbol == self.symbol)
+                .order_by(desc(Trade.ts))
+                .first()
+            )
             if last_trade:
-                matching_engine.set_last_trade_price(last_trade.price)
+                self.engine.set_last_trade_price(last_trade.price)
             else:
-                matching_engine.set_last_trade_price(100.0)
+                self.engine.set_last_trade_price(100.0)
 
     def _restore_order_book_from_db(self):
         """Restore the matching engine order book from database"""
+        self._initialize_last_trade_price_from_price_history()
+
         # Get all active orders with remaining quantity
         active_orders = (
             self.db.query(Order)
             .filter(
                 and_(
+                    Order.symbol == self.symbol,
                     Order.active,
                     Order.remaining > 0,
                     Order.status.in_(
@@ -85,136 +118,215 @@ class OrderBookService:
         )
 
         # Restore the matching engine state
-        matching_engine.restore_from_database(active_orders)
+        self.engine.restore_from_database(active_orders)
 
     async def place_order(
         self, user_id: str, order_request: PlaceOrderRequest
     ) -> dict:
         """
         Place a new order and return any resulting trades
-        plus the order details
+        plus the order details. With ORDER_QUEUE_MAX_BATCH the order is
+        placed by the order entry queue, in a micro-batch with the orders
+        of other requests
         """
+        if order_entry_queue.enabled:
+            # Hold no pooled connection while waiting on the queue, which
+            # needs one for the batch
+            self.db.close()
+            return await order_entry_queue.place(
+                self.symbol, user_id, order_request
+            )
 
-        # For market orders, check if there are any matching orders available
-        if order_request.order_type == OrderType.MARKET:
-            if order_request.side == Side.BUY:
-                # Buy market order: check if there are any sell orders
-                best_ask = matching_engine.get_best_ask()
-                if best_ask is None:
-                    # No sellers available, cancel the market order
-                    order = Order(
-                        user_id=user_id,
-                        side=order_request.side,
-                        order_type=order_request.order_type,
-                        price=None,  # No price for cancelled market order
-                        quantity=order_request.quantity,
-                        remaining=0,  # No remaining since it's cancelled
-                        status=OrderStatus.CANCELED,
-                        active=False,
-                    )
-                    self.db.add(order)
-                    self.db.commit()
-                    self.db.refresh(order)
-
-                    order_response = OrderResponse(
-                        id=order.order_id,
-                        side=order.side,
-                        order_type=order.order_type,
-                        price=None,
-                        quantity=order.quantity,
-                        remaining=order.remaining,
-                        status=order.status,
-                        active=order.active,
-                        created_at=order.created_at,
-                    )
+        (result,) = await self.place_orders(user_id, [order_request])
+        if isinstance(result, Exception):
+            raise result
+        return result
 
-                    return {
-                        "trades": [],
-                        "order": order_response,
-                        "order_executed": False,
-                    }
-            else:
-                # Sell market order: check if there are any buy orders
-                best_bid = matching_engine.get_best_bid()
-                if best_bid is None:
-                    # No buyers available, cancel the market order
-                    order = Order(
-                        user_id=user_id,
-                        side=order_request.side,
-                        order_type=order_request.order_type,
-                        price=None,  # No price for cancelled market order
-                        quantity=order_request.quantity,
-                        remaining=0,  # No remaining since it's cancelled
-                        status=OrderStatus.CANCELED,
-                        active=False,
-                    )
-                    self.db.add(order)
-                    self.db.commit()
-                    self.db.refresh(order)
-
-                    order_response = OrderResponse(
-                        id=order.order_id,
-                        side=order.side,
-                        order_type=order.order_type,
-                        price=None,
-                        quantity=order.quantity,
-                        remaining=order.remaining,
-                        status=order.status,
-                        active=order.active,
-                        created_at=order.created_at,
+    async def place_orders(
+        self, user_id: str, order_requests: List[PlaceOrderRequest]
+    ) -> List[dict]:
+        """
+        Run orders through the instrument's matching engine in request
+        order, persist them and their trades in one transaction and queue
+        one coalesced set of notifications. Returns the result of each
+        order, as place_order does, or the exception of an order that
+        could not be placed
+        """
+        return await engine_shard_pool.run(
+            self.place_user_orders,
+            [(user_id, order_request) for order_request in order_requests],
+        )
+
+    def place_user_orders(
+        self, entries: List[Tuple[str, PlaceOrderRequest]]
+    ) -> List[dict]:
+        """
+        place_orders for (user_id, order_request) entries of any users,
+        e.g. a micro-batch of the order entry queue. Each order is added in
+        its own savepoint and only reaches the engine once its row is
+        flushed, so an order that fails is rolled back alone and the book
+        and the database keep agreeing on the others
+        """
+        placed = []  # (order or exception, trades), trades None for retries
+        trade_results = []
+        new_client_orders = []
+        rested = False  # Whether an order went on the book
+        closed_ids = []  # Orders whose unfilled part was cancelled
+        triggered = []  # Stop orders the new orders triggered
+
+        for user_id, order_request in entries:
+            client_order_id = order_request.client_order_id
+            try:
+                with self.db.begin_nested():
+                    order = client_order_id and self._get_client_order(
+                        user_id, client_order_id
                     )
+                    # Retry of an order that was already placed: no
+                    # re-matching
+                    results = None
+                    if not order:
+                        order, results = self._match_order(
+                            user_id, order_request
+                        )
+            except Exception as e:
+                placed.append((e, None))
+                continue
+            if results is None:
+                placed.append((order, None))
+                continue
+
+            trades = [self._add_trade(result) for result in results]
+            stops = self.engine.pop_triggered_orders()
+            triggered.extend(stops)
+            placed.append(
+                (order, self._own_trades(order, results, trades, stops))
+            )
+            trade_results.extend(results)
+            if client_order_id:
+                new_client_orders.append((user_id, order))
+            if order.active and order.remaining > 0:
+                # Pending stop orders are not on the book
+                rested = rested or order.order_type not in STOP_ORDER_TYPES
+            elif order.status == OrderStatus.CANCELED:
+                closed_ids.append(str(order.order_id))
+
+        # Update all affected orders in the database, the cancelled ones
+        # and the triggered stop orders are already in their final state
+        self._update_traded_orders(
+            trade_results,
+            skip_order_ids=closed_ids
+            + [str(order.order_id) for order in triggered],
+        )
+        self._update_triggered_orders(triggered)
 
-                    return {
-                        "trades": [],
-                        "order": order_response,
-                        "order_executed": False,
-                    }
+        # Commit all changes
+        self.db.commit()
 
-        # Create order object
-        order = Order(
-            user_id=user_id,
-            side=order_request.side,
-            order_type=order_request.order_type,
-            price=order_request.price,  # Will be None for market orders
-            quantity=order_request.quantity,
-            remaining=order_request.quantity,
-            status=OrderStatus.OPEN,
-            active=True,
-        )
+        for user_id, order in new_client_orders:
+            self.engine.register_client_order_id(
+                user_id, order.client_order_id, order.order_id
+            )
 
-        # Add to database
-        self.db.add(order)
-        self.db.flush()  # Get the order ID
+        # Queue WebSocket notifications once the changes are persisted,
+        # fan-out runs on the broadcaster task, not in this request. Orders
+        # that neither traded nor rested left the book as it was
+        if trade_results or rested:
+            self._notify(trade_results)
+
+        results = []
+        for order, trades in placed:
+            if isinstance(order, Exception):
+                results.append(order)
+                continue
+            # Refresh the order to get updated values
+            self.db.refresh(order)
+            if trades is None:
+                trades = self._get_order_trades(order.order_id)
+            results.append(self._order_result(order, trades))
+
+        # The book keeps the active orders: later commits of this session,
+        # e.g. of the price history, must not expire them. A retry in the
+        # same batch is the same order
+        for order in {
+            order
+            for order, _ in placed
+            if not isinstance(order, Exception) and order.active
+        }:
+            self.db.expunge(order)
+
+        return results
+
+    async def run_priority_command(self, method: str, **kwargs):
+        """
+        Run a cancel or amend method of this service, e.g.
+        run_priority_command("cancel_order", user_id=..., order_id=...).
+        With ORDER_QUEUE_MAX_BATCH it goes through the order entry queue's
+        cancel lane, ahead of the new orders queued before it
+        """
+        if order_entry_queue.enabled:
+            self.db.close()
+            return await order_entry_queue.run_priority(
+                self.symbol, method, **kwargs
+            )
 
-        # Process through matching engine
-        trade_results = matching_engine.add_order(order)
+        return await engine_shard_pool.run(getattr(self, method), **kwargs)
 
-        # Handle WebSocket notifications for trades
-        if trade_results:
-            await matching_engine.notify_trades_and_book_update(trade_results)
-        else:
-            # Just send order book update if no trades
-            await matching_engine._notify_book_update()
+    def amend_order(
+        self,
+        user_id: str,
+        order_id: str,
+        quantity: Optional[float] = None,
+        price: Optional[float] = None,
+    ) -> Optional[dict]:
+        """
+        Amend the quantity and/or price of one of the user's live orders.
+        The order row is persisted with a single update; if the new price
+        crosses the book, the trades are persisted as for place_order.
+        Returns the same result as place_order, or None if the order is
+        not live
+        """
+        order = self.engine.get_user_order(user_id, order_id)
+        if order is None:
+            return None
 
-        # Save trades to database and update affected orders
-        trades = []
-        updated_orders = {}  # order_id -> (remaining, status)
+        trade_results = self.engine.amend_order(
+            order_id, quantity=quantity, price=price
+        )
+        trades = [self._add_trade(result) for result in trade_results]
+        triggered = self.engine.pop_triggered_orders()
+
+        self.db.query(Order).filter(Order.order_id == order_id).update(
+            {
+                Order.quantity: order.quantity,
+                Order.remaining: order.remaining,
+                Order.price: order.price,
+                Order.status: order.status,
+                Order.active: order.remaining > 0,
+                Order.created_at: order.created_at,
+            },
+            synchronize_session=False,
+        )
+        # The amended order's row is already up to date
+        self._update_traded_orders(
+            trade_results,
+            skip_order_ids=[order_id]
+            + [str(order.order_id) for order in triggered],
+        )
+        self._update_triggered_orders(triggered)
+        self.db.commit()
 
-        for trade_result in trade_results:
-            trade = Trade(
-                engine_trade_id=int(trade_result.timestamp.timestamp()),
-                price=trade_result.price,
-                quantity=trade_result.quantity,
-                buy_order_id=trade_result.buy_order_id,
-                sell_order_id=trade_result.sell_order_id,
-                buy_user_id=trade_result.buy_user_id,
-                sell_user_id=trade_result.sell_user_id,
-                ts=trade_result.timestamp,
-            )
-            self.db.add(trade)
-            trades.append(trade)
+        self._notify(trade_results)
+        return self._order_result(
+            order, self._own_trades(order, trade_results, trades, triggered)
+        )
 
-            # Store order updates
+    def _update_traded_orders(
+        self, trade_results, skip_order_ids: Collection[str] = ()
+    ):
+        """Write the final remaining/status of orders that traded"""
+        updated_orders = {}  # order_id -> (remaining, status)
+        for trade_result in trade_results:
+            # Store order updates, the latest state of an order wins
             updated_orders[str(trade_result.buy_order_id)] = (
                 trade_result.buy_order_remaining,
                 trade_result.buy_order_status,
@@ -223,31 +335,96 @@ class OrderBookService:
                 trade_result.sell_order_remaining,
                 trade_result.sell_order_status,
             )
+        for order_id in skip_order_ids:
+            updated_orders.pop(order_id, None)
+        if not updated_orders:
+            return
 
-        # Update all affected orders in the database
-        for order_id, (remaining, status) in updated_orders.items():
-            db_order = (
-                self.db.query(Order).filter(Order.order_id == order_id).first()
+        db_orders = (
+            self.db.query(Order)
+            .filter(Order.order_id.in_(list(updated_orders)))
+            .all()
+        )
+        for db_order in db_orders:
+            remaining, status = updated_orders[str(db_order.order_id)]
+            db_order.remaining = remaining
+            db_order.status = status
+            # Set active to False when order is filled
+            # keep True for partially filled
+            if status == OrderStatus.FILLED:
+                db_order.active = False
+            elif status == OrderStatus.PARTIALLY_FILLED:
+                db_order.active = True  # active for partially filled orders
+            # OPEN orders remain active = True by default
+
+    def _update_triggered_orders(self, orders: List[Order]):
+        """
+        Write the state of stop orders the engine triggered: the type they
+        became and where their matching left them
+        """
+        for order in orders:
+            self.db.query(Order).filter(
+                Order.order_id == order.order_id
+            ).update(
+                {
+                    Order.order_type: order.order_type,
+                    Order.remaining: order.remaining,
+                    Order.status: order.status,
+                    Order.active: order.active,
+                },
+                synchronize_session=False,
             )
-            if db_order:
-                db_order.remaining = remaining
-                db_order.status = status
-                # Set active to False when order is filled
-                # keep True for partially filled
-                if status == OrderStatus.FILLED:
-                    db_order.active = False
-                elif status == OrderStatus.PARTIALLY_FILLED:
-                    db_order.active = (
-                        True  # active for partially filled orders
-                    )
-                # OPEN orders remain active = True by default
 
-        # Commit all changes
-        self.db.commit()
+    def _own_trades(
+        self,
+        order: Order,
+        trade_results,
+        trades: List[Trade],
+        triggered: List[Order],
+    ) -> List[Trade]:
+        """
+        The trades of an order's matching pass without those of the stop
+        orders it triggered, unless the order took part in them
+        """
+        order_id = str(order.order_id)
+        stop_ids = {str(stop.order_id) for stop in triggered} - {order_id}
+        own_trades = []
+        for trade, result in zip(trades, trade_results):
+            parties = {str(result.buy_order_id), str(result.sell_order_id)}
+            if order_id in parties or not parties & stop_ids:
+                own_trades.append(trade)
+        return own_trades
+
+    def _notify(self, trade_results):
+        if trade_results:
+            self.engine.notify_trades_and_book_update(trade_results)
+        else:
+            # Just send order book update if no trades
+            self.engine.notify_book_update()
 
-        # Refresh the order to get updated values
-        self.db.refresh(order)
+    def _order_response(self, order: Order) -> OrderResponse:
+        return OrderResponse(
+            id=order.order_id,
+            symbol=order.symbol,
+            side=order.side,
+            order_type=order.order_type,
+            price=(
+                order.price
+                if order.order_type in (OrderType.LIMIT, OrderType.STOP_LIMIT)
+                else None
+            ),  # Don't return price for market orders
+            quantity=order.quantity,
+            remaining=order.remaining,
+            status=order.status,
+            active=order.active,
+            created_at=order.created_at,
+            time_in_force=order.time_in_force,
+            stop_price=order.stop_price,
+            client_order_id=order.client_order_id,
+        )
 
+    def _order_result(self, order: Order, trades: List[Trade]) -> dict:
+        """Build the place/amend result of an order and its trades"""
         # Create trade responses
         trade_responses = [
             TradeResponse(
@@ -265,19 +442,7 @@ class OrderBookService:
         ]
 
         # Create order response
-        order_response = OrderResponse(
-            id=order.order_id,
-            side=order.side,
-            order_type=order.order_type,
-            price=(
-                order.price if order.order_type == OrderType.LIMIT else None
-            ),  # Don't return price for market orders
-            quantity=order.quantity,
-            remaining=order.remaining,
-            status=order.status,
-            active=order.active,
-            created_at=order.created_at,
-        )
+        order_response = self._order_response(order)
 
         # Return both trades and order information
         return {
@@ -286,6 +451,152 @@ class OrderBookService:
             "order_executed": len(trade_responses) > 0,
         }
 
+    def _match_order(self, user_id: str, order_request: PlaceOrderRequest):
+        """
+        Add the order to the session and run it through the matching
+        engine, without committing. Returns the order and its trade results
+        """
+        # For market orders, check what the resting orders can fill
+        # before matching
+        if order_request.order_type == OrderType.MARKET:
+            quote = self.engine.quote(
+                order_request.side, order_request.quantity
+            )
+            if order_request.time_in_force == TimeInForce.FOK:
+                has_liquidity = quote.fully_available
+            else:
+                has_liquidity = quote.filled_quantity > 0
+
+            if not has_liquidity:
+                # No counterparty available, cancel the market order
+                order = Order(
+                    user_id=user_id,
+                    symbol=self.symbol,
+                    side=order_request.side,
+                    order_type=order_request.order_type,
+                    price=None,  # No price for cancelled market order
+                    quantity=order_request.quantity,
+                    remaining=0,  # No remaining since it's cancelled
+                    status=OrderStatus.CANCELED,
+                    active=False,
+                    time_in_force=order_request.time_in_force,
+                    client_order_id=order_request.client_order_id,
+                )
+                if not self._insert_order(order):
+                    return self._duplicate_of(user_id, order_request)
+                return order, []
+
+        # Create order object
+        order = Order(
+            user_id=user_id,
+            symbol=self.symbol,
+            side=order_request.side,
+            order_type=order_request.order_type,
+            price=order_request.price,  # Will be None for market orders
+            stop_price=order_request.stop_price,
+            quantity=order_request.quantity,
+            remaining=order_request.quantity,
+            status=OrderStatus.OPEN,
+            active=True,
+            time_in_force=order_request.time_in_force,
+            client_order_id=order_request.client_order_id,
+        )
+
+        # Add to database, which also gets the order ID
+        if not self._insert_order(order):
+            return self._duplicate_of(user_id, order_request)
+
+        # Process through matching engine
+        return order, self.engine.add_order(order)
+
+    def _insert_order(self, order: Order) -> bool:
+        """
+        Add and flush a new order. Orders with a client_order_id are
+        flushed in a savepoint so a duplicate only rolls back this order;
+        returns False for a duplicate
+        """
+        if not order.client_order_id:
+            self.db.add(order)
+            self.db.flush()
+            return True
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(order)
+                self.db.flush()
+        except IntegrityError:
+            return False
+        return True
+
+    def _duplicate_of(self, user_id: str, order_request: PlaceOrderRequest):
+        """The order already placed with the request's client_order_id"""
+        order = self._get_client_order(user_id, order_request.client_order_id)
+        if order is None:
+            raise ValueError("Order could not be placed")
+        return order, None
+
+    def _get_client_order(
+        self, user_id: str, client_order_id: str
+    ) -> Optional[Order]:
+        """
+        Find a user's order by client_order_id, through the engine's index
+        of recent ids (a primary key lookup) or the unique constraint
+        """
+        order_id = self.engine.lookup_client_order_id(user_id, client_order_id)
+        if order_id is not None:
+            order = self.db.get(Order, order_id)
+            if order is not None:
+                return order
+
+        return (
+            self.db.query(Order)
+            .filter(
+                and_(
+                    Order.user_id == user_id,
+                    Order.client_order_id == client_order_id,
+                )
+            )
+            .first()
+        )
+
+    def _get_order_trades(self, order_id) -> List[Trade]:
+        return (
+            self.db.query(Trade)
+            .filter(
+                or_(
+                    Trade.buy_order_id == order_id,
+                    Trade.sell_order_id == order_id,
+                )
+            )
+            .order_by(Trade.ts)
+            .all()
+        )
+
+    def get_order_by_client_order_id(
+        self, user_id: str, client_order_id: str
+    ) -> Optional[OrderResponse]:
+        """Get one of the user's orders by its client_order_id"""
+        order = self._get_client_order(user_id, client_order_id)
+        if order is None:
+            return None
+        return self._order_response(order)
+
+    def _add_trade(self, trade_result) -> Trade:
+        """Add the trade of a matching engine result to the session"""
+        trade = Trade(
+            symbol=self.symbol,
+            engine_trade_id=int(trade_result.timestamp.timestamp()),
+            price=trade_result.price,
+            quantity=trade_result.quantity,
+            buy_order_id=trade_result.buy_order_id,
+            sell_order_id=trade_result.sell_order_id,
+            buy_user_id=trade_result.buy_user_id,
+            sell_user_id=trade_result.sell_user_id,
+            ts=trade_result.timestamp,
+        )
+        self.db.add(trade)
+        return trade
+
     def cancel_order(self, user_id: str, order_id: str) -> bool:
         """Cancel an order"""
         # Find order in database
@@ -295,6 +606,7 @@ class OrderBookService:
                 and_(
                     Order.order_id == order_id,
                     Order.user_id == user_id,
+                    Order.symbol == self.symbol,
                     Order.active,
                 )
             )
@@ -305,7 +617,7 @@ class OrderBookService:
             return False
 
         # Cancel in matching engine
-        success = matching_engine.cancel_order(str(order_id))
+        success = self.engine.cancel_order(str(order_id))
 
         if success:
             # Update in database
@@ -313,8 +625,56 @@ class OrderBookService:
             order.status = OrderStatus.CANCELED
             self.db.commit()
 
+            self.engine.notify_book_update()
+
         return success
 
+    def cancel_orders(self, user_id: str, order_ids: List[str]) -> List[str]:
+        """
+        Cancel several of the user's live orders with one update statement
+        and one book update. Returns the IDs cancelled; unknown, filled or
+        other users' orders are skipped
+        """
+        own_orders = {
+            str(order.order_id)
+            for order in self.engine.get_user_open_orders(user_id)
+        }
+        return self._cancel_in_engine_and_db(
+            user_id,
+            self.engine.cancel_orders(
+                [order_id for order_id in order_ids if order_id in own_orders]
+            ),
+        )
+
+    def cancel_all_orders(
+        self, user_id: str, side: Optional[Side] = None
+    ) -> List[str]:
+        """Cancel all live orders of the user, optionally only one side"""
+        return self._cancel_in_engine_and_db(
+            user_id, self.engine.cancel_user_orders(user_id, side)
+        )
+
+    def _cancel_in_engine_and_db(
+        self, user_id: str, cancelled_ids: List[str]
+    ) -> List[str]:
+        if not cancelled_ids:
+            return []
+
+        self.db.query(Order).filter(
+            and_(
+                Order.order_id.in_(cancelled_ids),
+                Order.user_id == user_id,
+                Order.active,
+            )
+        ).update(
+            {Order.active: False, Order.status: OrderStatus.CANCELED},
+            synchronize_session=False,
+        )
+        self.db.commit()
+
+        self.engine.notify_book_update()
+        return cancelled_ids
+
     def get_user_orders(
         self, user_id: str, active_only: bool = False
     ) -> List[OrderResponse]:
@@ -329,6 +689,7 @@ class OrderBookService:
         return [
             OrderResponse(
                 id=order.order_id,
+                symbol=order.symbol,
                 side=order.side,
                 order_type=order.order_type,
                 price=order.price,
@@ -337,6 +698,9 @@ class OrderBookService:
                 status=order.status,
                 active=order.active,
                 created_at=order.created_at,
+                time_in_force=order.time_in_force,
+                stop_price=order.stop_price,
+                client_order_id=order.client_order_id,
             )
             for order in orders
         ]
@@ -372,12 +736,24 @@ class OrderBookService:
         ]
 
     def get_order_book_snapshot(self) -> BookSnapshotResponse:
-        """Get current order book snapshot from database"""
+        """
+        Get current order book snapshot, from the engine's shared memory
+        when it publishes one, else from database
+        """
+        market_data = self.engine.get_market_data()
+        if market_data is not None:
+            return BookSnapshotResponse(
+                bids=[BookLevel(**level) for level in market_data["bids"]],
+                asks=[BookLevel(**level) for level in market_data["asks"]],
+                last_trade_price=market_data["last_trade_price"],
+            )
+
         # Get active orders from database - only LIMIT orders with valid prices
         active_orders = (
             self.db.query(Order)
             .filter(
                 and_(
+                    Order.symbol == self.symbol,
                     Order.active,
                     Order.remaining > 0,
                     Order.status.in_(
@@ -421,13 +797,22 @@ class OrderBookService:
 
     def _get_last_trade_price_from_db(self) -> float:
         """Get last trade price from database"""
-        last_trade = self.db.query(Trade).order_by(desc(Trade.ts)).first()
+        last_trade = (
+            self.db.query(Trade)
+            .filter(Trade.symbol == self.symbol)
+            .order_by(desc(Trade.ts))
+            .first()
+        )
         return last_trade.price if last_trade else 100.0
 
     def get_recent_trades(self, limit: int = 50) -> List[TradeResponse]:
         """Get recent trades for market data"""
         trades = (
-            self.db.query(Trade).order_by(desc(Trade.ts)).limit(limit).all()
+            self.db.query(Trade)
+            .filter(Trade.symbol == self.symbol)
+            .order_by(desc(Trade.ts))
+            .limit(limit)
+            .all()
         )
 
         return [
@@ -445,10 +830,29 @@ class OrderBookService:
             for trade in trades
         ]
 
+    def get_quote(self, side: Side, quantity: float) -> QuoteResponse:
+        """
+        What a market order of side for quantity would fill and cost
+        against the current book, without placing it
+        """
+        quote = self.engine.quote(side, quantity)
+        return QuoteResponse(
+            symbol=self.symbol,
+            side=side,
+            quantity=quote.quantity,
+            filled_quantity=quote.filled_quantity,
+            fully_available=quote.fully_available,
+            average_price=quote.average_price,
+            best_price=quote.best_price,
+            worst_price=quote.worst_price,
+            notional=quote.notional,
+            slippage=quote.slippage,
+        )
+
     def get_market_stats(self) -> dict:
         """Get basic market statistics"""
-        best_bid = matching_engine.get_best_bid()
-        best_ask = matching_engine.get_best_ask()
+        best_bid = self.engine.get_best_bid()
+        best_ask = self.engine.get_best_ask()
 
         # Calculate spread
         spread = None
@@ -459,5 +863,5 @@ class OrderBookService:
             "best_bid": best_bid,
             "best_ask": best_ask,
             "spread": spread,
-            "last_trade_price": matching_engine.get_last_trade_price(),
+            "last_trade_price": self.engine.get_last_trade_price(),
         }
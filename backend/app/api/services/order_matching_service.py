@@ -6,9 +6,19 @@ from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
 
-from app.database.enums.oder_enums import Side, OrderType, OrderStatus
+from app.config import config
+from app.database.enums.oder_enums import (
+    Side,
+    OrderType,
+    OrderStatus,
+    TimeInForce,
+    STOP_ORDER_TYPES,
+)
 from app.database.models.order_models import Order
 from app.api.services.ws_service import ws_manager
+from app.api.services.broadcast_service import ws_broadcaster
+from app.util.cache_util import TTLCache
+from app.util.depth_util import DepthLadder, Quote, QUANTITY_EPSILON
 
 
 @dataclass
@@ -26,8 +36,71 @@ class TradeResult:
     sell_order_status: OrderStatus
 
 
+def build_execution_reports(
+    symbol: str, trades: List[TradeResult]
+) -> Dict[str, dict]:
+    """
+    Group the fills of one matching pass per user, together with the
+    final state of every order of theirs that traded
+    """
+    reports: Dict[str, dict] = {}
+    for trade in trades:
+        for side, order_id, user_id, remaining, order_status in (
+            (
+                Side.BUY,
+                trade.buy_order_id,
+                trade.buy_user_id,
+                trade.buy_order_remaining,
+                trade.buy_order_status,
+            ),
+            (
+                Side.SELL,
+                trade.sell_order_id,
+                trade.sell_user_id,
+                trade.sell_order_remaining,
+                trade.sell_order_status,
+            ),
+        ):
+            report = reports.setdefault(
+                str(user_id),
+                {"symbol": symbol, "fills": [], "orders": {}},
+            )
+            report["fills"].append(
+                {
+                    "order_id": str(order_id),
+                    "side": side.value,
+                    "price": trade.price,
+                    "quantity": trade.quantity,
+                    "timestamp": trade.timestamp.isoformat(),
+                }
+            )
+
+            # Trades are in execution order, so the last one wins
+            order = report["orders"].setdefault(
+                str(order_id),
+                {"order_id": str(order_id), "filled_quantity": 0.0},
+            )
+            order["filled_quantity"] += trade.quantity
+            order["remaining_quantity"] = remaining
+            order["status"] = (
+                "filled"
+                if order_status == OrderStatus.FILLED
+                else "partially_filled"
+            )
+
+    return {
+        user_id: {
+            "symbol": report["symbol"],
+            "fills": report["fills"],
+            "orders": list(report["orders"].values()),
+        }
+        for user_id, report in reports.items()
+    }
+
+
 class OrderMatchingEngine:
-    def __init__(self):
+    def __init__(self, symbol: str = config.DEFAULT_SYMBOL):
+        self.symbol = symbol  # Instrument traded on this book
         self._buy_orders: List[Tuple[float, datetime, Order]] = (
             []
         )  # Buy orders: max heap (negative prices for max behavior)
@@ -35,6 +108,22 @@ class OrderMatchingEngine:
             []
         )  # Sell orders: min heap (positive prices for min behavior)
         self._orders: Dict[str, Order] = {}  # Order lookup for quick access
+        # Resting quantity per price level of each side
+        self._bid_depth = DepthLadder(best_is_highest=True)
+        self._ask_depth = DepthLadder(best_is_highest=False)
+        # Pending stop orders by trigger price: buy stops trigger at or
+        # above theirs (min heap), sell stops at or below (max heap)
+        self._buy_stops: List[Tuple[float, datetime, Order]] = []
+        self._sell_stops: List[Tuple[float, datetime, Order]] = []
+        self._cancelled_stops = 0  # Cancelled entries left on the heaps
+        self._triggered: List[Order] = []  # Until pop_triggered_orders
+        # Live orders per user: user_id -> {order_id: order}
+        self._user_orders: Dict[str, Dict[str, Order]] = defaultdict(dict)
+        # (user_id, client_order_id) -> order_id of recently placed orders
+        self._client_order_ids = TTLCache(
+            maxsize=config.CLIENT_ORDER_INDEX_SIZE,
+            ttl=config.CLIENT_ORDER_INDEX_TTL_SECONDS,
+        )
         self._trade_counter = 0  # Trade counter for engine trade IDs
         self._last_trade_price = (
             100.0  # Last trade price - persistent across all trades
@@ -42,46 +131,206 @@ class OrderMatchingEngine:
         self._on_price_change = None  # Callback for price change
 
     def add_order(self, order: Order) -> List[TradeResult]:
-        """Add order to the engine and return any resulting trades"""
-        trades = []
+        """
+        Add order to the engine and return any resulting trades. Its time
+        in force decides what happens to the part that does not fill at
+        once: it rests on the book for GTC and POST_ONLY limit orders and
+        is cancelled otherwise. FOK orders that cannot fill completely and
+        POST_ONLY orders that would trade are cancelled without matching.
+        Stop orders wait off the book until a trade reaches their stop
+        price; the trades returned include those of the stop orders the
+        order's trades trigger
+        """
+        if order.order_type in STOP_ORDER_TYPES:
+            if not self._stop_reached(order, self._last_trade_price):
+                self._add_stop(order)
+                return []
+            self._activate_stop(order)
+
+        trades = self._match(order)
+        return trades + self._trigger_stops(trades)
+
+    def _match(self, order: Order) -> List[TradeResult]:
+        """Match an order and rest or cancel what is left of it"""
+        if not self._accepts(order):
+            self._cancel_remainder(order)
+            return []
 
         if order.side == Side.BUY:
             trades = self._process_buy_order(order)
         else:
             trades = self._process_sell_order(order)
 
-        # Add remaining quantity to order book
-        # if not fully filled and is a limit order
-        if (
-            order.remaining > 0
-            and order.status == OrderStatus.OPEN
-            and order.order_type == OrderType.LIMIT
-        ):
-            self._add_to_book(order)
+        # Rest or cancel the remaining quantity if not fully filled
+        if order.remaining > 0 and order.active:
+            if self._rests(order):
+                self._add_to_book(order)
+            else:
+                self._cancel_remainder(order)
 
         return trades
 
-    async def notify_trades_and_book_update(self, trades: List[TradeResult]):
-        """Notify about executed trades and updated order book"""
+    def _accepts(self, order: Order) -> bool:
+        """Whether the order's time in force lets it match at all"""
+        if order.time_in_force == TimeInForce.POST_ONLY:
+            return order.order_type == OrderType.LIMIT and not self._crosses(
+                order.side, order.price
+            )
+        if order.time_in_force == TimeInForce.FOK:
+            limit_price = (
+                order.price if order.order_type == OrderType.LIMIT else None
+            )
+            return self.quote(
+                order.side, order.remaining, limit_price
+            ).fully_available
+        return True
+
+    def _crosses(self, side: Side, price: float) -> bool:
+        """Whether a limit order of side at price would trade at once"""
+        opposite = Side.SELL if side == Side.BUY else Side.BUY
+        best = self._depth(opposite).best_price
+        if best is None:
+            return False
+        if side == Side.BUY:
+            return price >= best
+        return price <= best
+
+    def _rests(self, order: Order) -> bool:
+        """Whether the unfilled part of the order goes on the book"""
+        return order.order_type == OrderType.LIMIT and (
+            order.time_in_force
+            in (None, TimeInForce.GTC, TimeInForce.POST_ONLY)
+        )
+
+    def _cancel_remainder(self, order: Order):
+        """Cancel the unfilled part of an order that does not rest"""
+        order.status = OrderStatus.CANCELED
+        order.active = False
+
+    def _stop_reached(self, order: Order, price: float) -> bool:
+        """Whether a trade at price triggers a stop order"""
+        if order.side == Side.BUY:
+            return price >= order.stop_price
+        return price <= order.stop_price
+
+    def _add_stop(self, order: Order):
+        """Hold a stop order until its stop price trades"""
+        self._orders[str(order.order_id)] = order
+        self._user_orders[str(order.user_id)][str(order.order_id)] = order
+        if order.side == Side.BUY:
+            heapq.heappush(
+                self._buy_stops, (order.stop_price, order.created_at, order)
+            )
+        else:
+            heapq.heappush(
+                self._sell_stops, (-order.stop_price, order.created_at, order)
+            )
+
+    def _activate_stop(self, order: Order):
+        """A triggered stop order becomes the order it stands for"""
+        order.order_type = (
+            OrderType.MARKET
+            if order.order_type == OrderType.STOP
+            else OrderType.LIMIT
+        )
+        self._triggered.append(order)
+
+    def _pop_stops(self, stops: list, key: float) -> List[Order]:
+        """Pop the pending stop orders of a heap up to key"""
+        orders = []
+        while stops and stops[0][0] <= key:
+            _, _, order = heapq.heappop(stops)
+            if order.active:
+                orders.append(order)
+            else:
+                self._cancelled_stops -= 1
+        return orders
+
+    def _trigger_stops(self, trades: List[TradeResult]) -> List[TradeResult]:
+        """
+        Activate and match the stop orders whose stop price the trades
+        reached, then those reached by their own trades, and return all
+        their trades. Only the heap entries in the traded price range are
+        looked at
+        """
+        stop_trades = []
+        while trades:
+            low = min(trade.price for trade in trades)
+            high = max(trade.price for trade in trades)
+            orders = self._pop_stops(self._buy_stops, high)
+            orders += self._pop_stops(self._sell_stops, -low)
+
+            trades = []
+            # Triggered together, the oldest stop order goes first
+            for order in sorted(orders, key=lambda o: o.created_at):
+                self._remove_live_order(order)
+                self._activate_stop(order)
+                trades.extend(self._match(order))
+            stop_trades.extend(trades)
+        return stop_trades
+
+    def pop_triggered_orders(self) -> List[Order]:
+        """Stop orders triggered since the last call, to be persisted"""
+        triggered, self._triggered = self._triggered, []
+        return triggered
+
+    def _compact_stops(self):
+        """Drop cancelled stop orders once they are most of the heaps"""
+        if 2 * self._cancelled_stops <= len(self._buy_stops) + len(
+            self._sell_stops
+        ):
+            return
+        for stops in (self._buy_stops, self._sell_stops):
+            stops[:] = [entry for entry in stops if entry[2].active]
+            heapq.heapify(stops)
+        self._cancelled_stops = 0
+
+    def notify_trades_and_book_update(self, trades: List[TradeResult]):
+        """Queue executed trades and the updated order book for fan-out"""
         try:
-            for trade in trades:
-                await self.notify_trade_executed(trade)
+            self.notify_executions(trades)
 
             # After all trades, send updated order book
-            await self._notify_book_update()
+            self.notify_book_update()
         except Exception:
             pass
 
-    async def _notify_book_update(self):
-        """Send order book update notification"""
+    def get_book_update(self) -> Dict:
+        """Order book snapshot with the last trade price, as broadcast"""
+        order_book_data = self.get_order_book_snapshot()
+        order_book_data["last_trade_price"] = self._last_trade_price
+        return order_book_data
+
+    def get_book_top(self, depth: int) -> Dict:
+        """
+        get_book_update limited to the best depth levels, read from the
+        depth ladders instead of scanning the resting orders
+        """
+        return {
+            "bids": [
+                {"price": price, "total_qty": quantity}
+                for price, quantity in self._bid_depth.top(depth)
+            ],
+            "asks": [
+                {"price": price, "total_qty": quantity}
+                for price, quantity in self._ask_depth.top(depth)
+            ],
+            "last_trade_price": self._last_trade_price,
+        }
+
+    def get_market_data(self) -> Optional[Dict]:
+        """
+        Book top shared by every worker, None as this book is only in this
+        worker (see engine_shard_service)
+        """
+        return None
+
+    def notify_book_update(self):
+        """Queue an order book update built from the in-memory book"""
         try:
-            order_book_data = self.get_order_book_snapshot()
-            await ws_manager.send_order_book_update(
-                "BTC-USD",
-                {
-                    "latest_price": self._last_trade_price,
-                    "order_book": order_book_data,
-                },
+            order_book_data = self.get_book_update()
+            ws_broadcaster.publish(
+                ws_manager.broadcast_book_update, order_book_data, self.symbol
             )
         except Exception:
             pass
@@ -185,9 +434,15 @@ class OrderMatchingEngine:
             else:
                 trade_price = sell_order.price
 
-        # Update order quantities
-        buy_order.remaining -= trade_quantity
-        sell_order.remaining -= trade_quantity
+        # Update order quantities, the float dust decimal quantities leave
+        # behind (0.8 - 0.7 - 0.1) is filled too
+        reduced = []
+        for order in (buy_order, sell_order):
+            remaining = order.remaining - trade_quantity
+            if remaining <= QUANTITY_EPSILON:
+                remaining = 0.0
+            reduced.append(order.remaining - remaining)
+            order.remaining = remaining
 
         # Update order status and active flag
         if buy_order.remaining == 0:
@@ -204,6 +459,16 @@ class OrderMatchingEngine:
             sell_order.status = OrderStatus.PARTIALLY_FILLED
             sell_order.active = True  # Keep active for partially filled orders
 
+        for order, quantity in zip((buy_order, sell_order), reduced):
+            if self._orders.get(str(order.order_id)) is order:
+                # The resting side of the trade
+                self._depth(order.side).reduce(order.price, quantity)
+
+        # Filled orders are no longer live
+        for order in (buy_order, sell_order):
+            if order.remaining == 0:
+                self._remove_live_order(order)
+
         # Update last trade price in the engine
         self._last_trade_price = trade_price
 
@@ -233,37 +498,20 @@ class OrderMatchingEngine:
 
         return trade_result
 
-    async def notify_trade_executed(self, trade_result: TradeResult):
-        """Notify clients about the executed trade via WebSocket"""
-        try:
-            # Send order status updates to individual users
-            await ws_manager.send_order_status_update(
-                str(trade_result.buy_user_id),
-                {
-                    "order_id": str(trade_result.buy_order_id),
-                    "status": (
-                        "partially_filled"
-                        if trade_result.buy_order_remaining > 0
-                        else "filled"
-                    ),
-                    "filled_quantity": trade_result.quantity,
-                    "remaining_quantity": trade_result.buy_order_remaining,
-                },
-            )
+    def build_execution_reports(
+        self, trades: List[TradeResult]
+    ) -> Dict[str, dict]:
+        """Execution reports of a matching pass on this book"""
+        return build_execution_reports(self.symbol, trades)
 
-            await ws_manager.send_order_status_update(
-                str(trade_result.sell_user_id),
-                {
-                    "order_id": str(trade_result.sell_order_id),
-                    "status": (
-                        "partially_filled"
-                        if trade_result.sell_order_remaining > 0
-                        else "filled"
-                    ),
-                    "filled_quantity": trade_result.quantity,
-                    "remaining_quantity": trade_result.sell_order_remaining,
-                },
-            )
+    def notify_executions(self, trades: List[TradeResult]):
+        """Queue one executions message per user for the matching pass"""
+        try:
+            reports = self.build_execution_reports(trades)
+            for user_id, report in reports.items():
+                ws_broadcaster.publish(
+                    ws_manager.send_executions, user_id, report
+                )
         except Exception:
             pass
 
@@ -273,11 +521,146 @@ class OrderMatchingEngine:
             order = self._orders[order_id]
             order.active = False
             order.status = OrderStatus.CANCELED
-            del self._orders[order_id]
+            self._remove_live_order(order)
 
             return True
         return False
 
+    def cancel_orders(self, order_ids: List[str]) -> List[str]:
+        """Cancel several orders by ID, returns the IDs cancelled"""
+        return [
+            order_id for order_id in order_ids if self.cancel_order(order_id)
+        ]
+
+    def get_user_open_orders(
+        self, user_id: str, side: Optional[Side] = None
+    ) -> List[Order]:
+        """Live orders of a user, optionally only one side"""
+        orders = self._user_orders.get(str(user_id), {}).values()
+        return [
+            order for order in orders if side is None or order.side == side
+        ]
+
+    def cancel_user_orders(
+        self, user_id: str, side: Optional[Side] = None
+    ) -> List[str]:
+        """
+        Cancel all live orders of a user (optionally only one side) in
+        O(user's orders), returns the IDs cancelled
+        """
+        return self.cancel_orders(
+            [
+                str(order.order_id)
+                for order in self.get_user_open_orders(user_id, side)
+            ]
+        )
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        """A live order by ID"""
+        return self._orders.get(order_id)
+
+    def get_user_order(self, user_id: str, order_id: str) -> Optional[Order]:
+        """A live order of the user by ID"""
+        return self._user_orders.get(str(user_id), {}).get(order_id)
+
+    def register_client_order_id(
+        self, user_id: str, client_order_id: str, order_id: str
+    ):
+        """Remember which order a user's client_order_id was placed as"""
+        self._client_order_ids.set(
+            (str(user_id), client_order_id), str(order_id)
+        )
+
+    def lookup_client_order_id(
+        self, user_id: str, client_order_id: str
+    ) -> Optional[str]:
+        """Order id of a recent client_order_id of the user, if known"""
+        return self._client_order_ids.get((str(user_id), client_order_id))
+
+    def amend_order(
+        self,
+        order_id: str,
+        quantity: Optional[float] = None,
+        price: Optional[float] = None,
+    ) -> Optional[List[TradeResult]]:
+        """
+        Amend a live limit order's total quantity and/or price. Reducing
+        the quantity at the same price keeps the order's place in the
+        queue; a price change or a quantity increase re-queues it behind
+        its level (created_at is the time priority) and matches it again
+        under its time in force, as add_order does. Repricing a POST_ONLY
+        order across the spread is rejected and leaves it as it was.
+        Returns the resulting trades, or None if the order is not live
+        """
+        order = self._orders.get(order_id)
+        if order is None:
+            return None
+        if order.order_type in STOP_ORDER_TYPES:
+            raise ValueError(
+                "Stop orders cannot be amended before they trigger"
+            )
+
+        new_quantity = order.quantity if quantity is None else quantity
+        new_price = order.price if price is None else price
+        filled = order.quantity - order.remaining
+        if new_quantity <= filled:
+            raise ValueError(
+                "Quantity must be greater than the filled quantity"
+            )
+
+        if new_price == order.price and new_quantity <= order.quantity:
+            # Reduce in place, the heap entry and its priority are unchanged
+            self._depth(order.side).reduce(
+                order.price, order.remaining - (new_quantity - filled)
+            )
+            order.quantity = new_quantity
+            order.remaining = new_quantity - filled
+            return []
+
+        if order.time_in_force == TimeInForce.POST_ONLY and self._crosses(
+            order.side, new_price
+        ):
+            raise ValueError("Post-only order would trade at the new price")
+
+        self._remove_from_book(order)
+        order.quantity = new_quantity
+        order.remaining = new_quantity - filled
+        order.price = new_price
+        order.created_at = datetime.utcnow()
+
+        trades = self._match(order)
+        return trades + self._trigger_stops(trades)
+
+    def _remove_from_book(self, order: Order):
+        """Take a resting order off its heap and out of the indexes"""
+        book = (
+            self._buy_orders if order.side == Side.BUY else self._sell_orders
+        )
+        for index, (_, _, book_order) in enumerate(book):
+            if book_order is order:
+                book[index] = book[-1]
+                book.pop()
+                heapq.heapify(book)
+                break
+        self._remove_live_order(order)
+
+    def _remove_live_order(self, order: Order):
+        """Drop an order that left the book from the lookup indexes"""
+        order_id = str(order.order_id)
+        if self._orders.pop(order_id, None) is not None:
+            if order.order_type not in STOP_ORDER_TYPES:
+                self._depth(order.side).remove(order.price, order.remaining)
+            elif not order.active:
+                # A pending stop order was cancelled, its heap entry stays
+                self._cancelled_stops += 1
+                self._compact_stops()
+
+        user_orders = self._user_orders.get(str(order.user_id))
+        if user_orders is not None:
+            user_orders.pop(order_id, None)
+            if not user_orders:
+                del self._user_orders[str(order.user_id)]
+
     def get_last_trade_price(self) -> float:
         """Get the last trade price"""
         return self._last_trade_price
@@ -292,6 +675,8 @@ class OrderMatchingEngine:
     def _add_to_book(self, order: Order):
         """Add order to the appropriate order book"""
         self._orders[str(order.order_id)] = order
+        self._user_orders[str(order.user_id)][str(order.order_id)] = order
+        self._depth(order.side).add(order.price, order.remaining)
 
         if order.side == Side.BUY:
             heapq.heappush(
@@ -302,6 +687,24 @@ class OrderMatchingEngine:
                 self._sell_orders, (order.price, order.created_at, order)
             )
 
+    def _depth(self, side: Side) -> DepthLadder:
+        """Depth of the resting orders of side"""
+        return self._bid_depth if side == Side.BUY else self._ask_depth
+
+    def quote(
+        self,
+        side: Side,
+        quantity: float,
+        limit_price: Optional[float] = None,
+    ) -> Quote:
+        """
+        Fill, average and worst price of an order of side for quantity
+        against the resting orders, without matching it. Without a
+        limit_price it is a market order
+        """
+        opposite = Side.SELL if side == Side.BUY else Side.BUY
+        return self._depth(opposite).quote(quantity, limit_price)
+
     def get_order_book_snapshot(self) -> Dict:
         """Get current order book snapshot"""
         # Aggregate buy orders by price only include
@@ -373,6 +776,21 @@ class OrderMatchingEngine:
             heapq.heappop(self._sell_orders)
         return None
 
+    def resting_orders(self) -> List[Order]:
+        """Orders on the book and pending stop orders, oldest first"""
+        return sorted(self._orders.values(), key=lambda o: o.created_at)
+
+    def load_resting_orders(self, orders: List[Order]):
+        """
+        Put orders taken from another book (resting_orders) on this empty
+        book as they are, without matching them again
+        """
+        for order in sorted(orders, key=lambda o: o.created_at):
+            if order.order_type in STOP_ORDER_TYPES:
+                self._add_stop(order)
+            else:
+                self._add_to_book(order)
+
     def restore_from_database(self, db_orders: List[Order], db_session=None):
         """
         Restore matching engine state from database orders and
@@ -384,6 +802,13 @@ class OrderMatchingEngine:
         self._buy_orders = []
         self._sell_orders = []
         self._orders = {}
+        self._user_orders = defaultdict(dict)
+        self._bid_depth.clear()
+        self._ask_depth.clear()
+        self._buy_stops = []
+        self._sell_stops = []
+        self._cancelled_stops = 0
+        self._triggered = []
 
         # Sort orders by creation time to process them in chronological order
         sorted_orders = sorted(db_orders, key=lambda x: x.created_at)
@@ -412,8 +837,14 @@ class OrderMatchingEngine:
                             trade.sell_order_status,
                         )
 
+        # Restored orders belong to db_session: the stop orders triggered
+        # are saved as the engine left them, not from their trades
+        triggered = self.pop_triggered_orders() if db_session else []
+        for order in triggered:
+            updated_orders.pop(str(order.order_id), None)
+
         # Save all trades and order updates to database if session provided
-        if db_session and all_trades:
+        if db_session and (all_trades or triggered):
             print(f"Saving {len(all_trades)} trades to database...")
 
             # Import here to avoid circular imports
@@ -422,6 +853,7 @@ class OrderMatchingEngine:
             # Save trades
             for trade_result in all_trades:
                 trade = Trade(
+                    symbol=self.symbol,
                     engine_trade_id=int(trade_result.timestamp.timestamp()),
                     price=trade_result.price,
                     quantity=trade_result.quantity,
@@ -455,11 +887,66 @@ class OrderMatchingEngine:
                 "and {len(updated_orders)} order updates"
             )
 
+        if db_session is not None:
+            # The book keeps the restored orders once this session is
+            # closed: reload what the commit expired and detach them, so
+            # later commits of the session cannot expire them again
+            for order in self._orders.values():
+                if all_trades or triggered:
+                    db_session.refresh(order)
+                db_session.expunge(order)
+
         print(
             f"Final state: {len(self._buy_orders)} buy orders, "
             "{len(self._sell_orders)} sell orders"
         )
 
 
-# Global instance
-matching_engine = OrderMatchingEngine()
+class UnknownInstrumentError(ValueError):
+    """Raised for a symbol that has no order book"""
+
+
+class EngineRegistry:
+    """
+    One independent OrderMatchingEngine per instrument symbol. Books share
+    no heaps, indexes or prices, so activity on one instrument never
+    touches another's structures
+    """
+
+    def __init__(self):
+        self._engines: Dict[str, OrderMatchingEngine] = {}
+
+    def register(self, symbol: str) -> OrderMatchingEngine:
+        """Get the engine of symbol, creating an empty book if needed"""
+        engine = self._engines.get(symbol)
+        if engine is None:
+            engine = self._engines[symbol] = OrderMatchingEngine(symbol)
+        return engine
+
+    def attach(self, symbol: str, engine):
+        """
+        Serve symbol from the given engine, e.g. a proxy to the engine
+        process that owns the instrument's book
+        """
+        self._engines[symbol] = engine
+
+    def get(self, symbol: str) -> OrderMatchingEngine:
+        """Get the engine of a registered symbol"""
+        engine = self._engines.get(symbol)
+        if engine is None:
+            raise UnknownInstrumentError(f"Unknown instrument: {symbol}")
+        return engine
+
+    def symbols(self) -> List[str]:
+        return list(self._engines)
+
+    def engines(self) -> List[OrderMatchingEngine]:
+        return list(self._engines.values())
+
+    def remove(self, symbol: str) -> Optional[OrderMatchingEngine]:
+        return self._engines.pop(symbol, None)
+
+
+# Global instances, matching_engine is the book of the default instrument
+engine_registry = EngineRegistry()
+matching_engine = engine_registry.register(config.DEFAULT_SYMBOL)
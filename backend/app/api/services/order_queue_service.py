@@ -0,0 +1,294 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import config
+from app.database import get_db_session
+from app.api.services.engine_shard_service import engine_shard_pool
+
+# Lanes of the order entry queue, drained in this order within each batch
+CANCEL_LANE = "cancel"  # Cancels and amends
+PLACE_LANE = "place"  # New orders
+LANES = (CANCEL_LANE, PLACE_LANE)
+
+# OrderBookService methods run through the cancel lane
+PRIORITY_METHODS = frozenset(
+    {"cancel_order", "cancel_orders", "cancel_all_orders", "amend_order"}
+)
+
+
+@dataclass
+class QueuedCommand:
+    symbol: str
+    method: str  # OrderBookService method, "place" for new orders
+    kwargs: Dict[str, Any]
+    future: Optional[asyncio.Future] = None
+    queued_at: float = 0.0
+
+
+class LaneStats:
+    """Commands taken from one lane and how long they waited"""
+
+    def __init__(self):
+        self.commands = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.commands += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def metrics(self, depth: int) -> dict:
+        return {
+            "depth": depth,
+            "commands": self.commands,
+            "avg_wait_ms": (
+                1000 * self.total_wait / self.commands if self.commands else 0
+            ),
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+
+
+class OrderEntryQueue:
+    """
+    Queue in front of the matching engines for the order commands of this
+    worker, with a lane for cancels/amends and one for new orders. A drain
+    task takes them in micro-batches, bounded by max_batch commands and
+    max_delay_ms of waiting for more orders. Each batch runs its cancels
+    and amends first, then places its orders of one instrument back to
+    back with one commit and one book update. Every caller still gets its
+    own result
+    """
+
+    def __init__(
+        self,
+        max_batch: Optional[int] = None,
+        max_delay_ms: Optional[float] = None,
+    ):
+        self.max_batch = (
+            config.ORDER_QUEUE_MAX_BATCH if max_batch is None else max_batch
+        )
+        self.max_delay = (
+            config.ORDER_QUEUE_MAX_DELAY_MS
+            if max_delay_ms is None
+            else max_delay_ms
+        ) / 1000
+        self._lanes: Dict[str, asyncio.Queue] = {}
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.lane_stats = {lane: LaneStats() for lane in LANES}
+        self.batches = 0
+        self.largest_batch = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 0
+
+    def lane_depth(self, lane: str) -> int:
+        queue = self._lanes.get(lane)
+        return queue.qsize() if queue else 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self.lane_depth(lane) for lane in LANES)
+
+    def start(self):
+        """Start the drain task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is loop
+        ):
+            return
+
+        self._lanes = {lane: asyncio.Queue() for lane in LANES}
+        self._ready = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """Run the commands already queued, then stop the drain task"""
+        if self._task is None:
+            return
+
+        if not self._task.done():
+            for queue in self._lanes.values():
+                await queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._lanes = {}
+        self._ready = None
+
+    async def _submit(self, lane: str, command: QueuedCommand):
+        self.start()
+        loop = asyncio.get_running_loop()
+        command.future = loop.create_future()
+        command.queued_at = loop.time()
+        self._lanes[lane].put_nowait(command)
+        self._ready.set()
+        return await command.future
+
+    async def place(self, symbol: str, user_id: str, order_request) -> dict:
+        """Queue a new order and wait for its place_order result"""
+        return await self._submit(
+            PLACE_LANE,
+            QueuedCommand(
+                symbol,
+                "place",
+                {"user_id": user_id, "order_request": order_request},
+            ),
+        )
+
+    async def run_priority(self, symbol: str, method: str, **kwargs):
+        """
+        Queue a cancel or amend (an OrderBookService method in
+        PRIORITY_METHODS) ahead of new orders and wait for its result
+        """
+        if method not in PRIORITY_METHODS:
+            raise ValueError(f"Not a cancel or amend: {method}")
+        return await self._submit(
+            CANCEL_LANE, QueuedCommand(symbol, method, kwargs)
+        )
+
+    def _take(self, lane: str, limit: int) -> List[QueuedCommand]:
+        queue = self._lanes[lane]
+        now = asyncio.get_running_loop().time()
+        commands = []
+        while len(commands) < limit and not queue.empty():
+            command = queue.get_nowait()
+            self.lane_stats[lane].record(now - command.queued_at)
+            commands.append(command)
+        return commands
+
+    async def _next_batch(self) -> Tuple[List[QueuedCommand], ...]:
+        """Cancels first, then new orders up to max_batch commands"""
+        while not self.queue_depth:
+            self._ready.clear()
+            await self._ready.wait()
+
+        if (
+            self.max_delay > 0
+            and not self.lane_depth(CANCEL_LANE)
+            and self.queue_depth < self.max_batch
+        ):
+            # Give the rest of a burst of orders a moment to arrive;
+            # cancels never wait
+            await asyncio.sleep(self.max_delay)
+
+        cancels = self._take(CANCEL_LANE, self.max_batch)
+        places = self._take(PLACE_LANE, self.max_batch - len(cancels))
+        return cancels, places
+
+    async def _run(self):
+        while True:
+            cancels, places = await self._next_batch()
+            try:
+                await engine_shard_pool.run(self._run_batch, cancels, places)
+            except Exception as e:
+                for command in cancels + places:
+                    if not command.future.done():
+                        command.future.set_exception(e)
+            finally:
+                for lane, commands in (
+                    (CANCEL_LANE, cancels),
+                    (PLACE_LANE, places),
+                ):
+                    for _ in commands:
+                        self._lanes[lane].task_done()
+
+    def _run_batch(
+        self, cancels: List[QueuedCommand], places: List[QueuedCommand]
+    ):
+        """
+        Run a batch: each cancel/amend on its own, then one transaction
+        per instrument for the new orders. An order that cannot be placed
+        is rolled back alone before it reaches the engine and fails only
+        its caller (see place_user_orders); the instrument's orders fail
+        together only if their transaction cannot be committed
+        """
+        # Import here to avoid circular imports
+        from app.api.services.order_book_service import OrderBookService
+
+        self.batches += 1
+        self.largest_batch = max(
+            self.largest_batch, len(cancels) + len(places)
+        )
+
+        places_by_symbol: Dict[str, List[QueuedCommand]] = defaultdict(list)
+        for command in places:
+            places_by_symbol[command.symbol].append(command)
+
+        db_session = next(get_db_session())
+        services: Dict[str, OrderBookService] = {}
+
+        def service_for(symbol: str) -> OrderBookService:
+            if symbol not in services:
+                services[symbol] = OrderBookService(db_session, symbol)
+            return services[symbol]
+
+        try:
+            for command in cancels:
+                try:
+                    service = service_for(command.symbol)
+                    result = getattr(service, command.method)(**command.kwargs)
+                except Exception as e:
+                    db_session.rollback()
+                    result = e
+                _resolve(command, result)
+
+            for symbol, commands in places_by_symbol.items():
+                try:
+                    results = service_for(symbol).place_user_orders(
+                        [
+                            (
+                                command.kwargs["user_id"],
+                                command.kwargs["order_request"],
+                            )
+                            for command in commands
+                        ]
+                    )
+                except Exception as e:
+                    # Nothing of the instrument's orders was committed
+                    db_session.rollback()
+                    results = [e] * len(commands)
+
+                for command, result in zip(commands, results):
+                    _resolve(command, result)
+        finally:
+            db_session.close()
+
+    def metrics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "lanes": {
+                lane: self.lane_stats[lane].metrics(self.lane_depth(lane))
+                for lane in LANES
+            },
+        }
+
+
+def _resolve(command: QueuedCommand, result):
+    # Futures belong to the event loop, not to the engine thread
+    engine_shard_pool.defer(_set_result, command, result)
+
+
+def _set_result(command: QueuedCommand, result):
+    if command.future.done():
+        return  # The caller went away
+    if isinstance(result, Exception):
+        command.future.set_exception(result)
+    else:
+        command.future.set_result(result)
+
+
+# Global order entry queue instance
+order_entry_queue = OrderEntryQueue()
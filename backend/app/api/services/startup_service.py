@@ -1,44 +1,111 @@
+from typing import Callable, List
+
 from sqlalchemy import and_, desc
 
 from app.database import get_db_session
+from app.database.models.instrument_models import InstrumentModel
 from app.database.models.order_models import Order
 from app.database.models.trade_models import Trade
+from app.database.models.price_models import PriceHistoryModel
 from app.database.enums.oder_enums import OrderStatus
-from app.api.services.order_matching_service import matching_engine
+from app.api.services.order_matching_service import (
+    EngineRegistry,
+    OrderMatchingEngine,
+    engine_registry,
+)
+from app.api.services.engine_shard_service import engine_shard_pool
 
 
 def restore_matching_engine_from_database():
-    """Restore matching engine state from database on startup"""
+    """
+    Set up the matching engine of every active instrument on startup:
+    restored from the database in this process, or, with ENGINE_SHARDS,
+    served by the engine processes that restore their own books
+    """
+    if engine_shard_pool.enabled:
+        attach_engine_shards()
+        return
+
+    restore_engines(engine_registry)
+
+
+def restore_engines(
+    registry: EngineRegistry, owns: Callable[[str], bool] = lambda _: True
+):
+    """
+    Register and restore from the database the engines of the active
+    instruments that owns accepts
+    """
     print("🚀 Starting order book restoration...")
 
     # Get a database session
     db_session = next(get_db_session())
 
     try:
-        # Initialize last trade price
-        print("setting last trade price........")
-        last_trade = db_session.query(Trade).order_by(desc(Trade.ts)).first()
-        if last_trade:
-            matching_engine.set_last_trade_price(last_trade.price)
-
-        # Get all active orders
-        active_orders = (
-            db_session.query(Order)
-            .filter(
-                and_(
-                    Order.active,
-                    Order.remaining > 0,
-                    Order.status.in_(
-                        [OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]
-                    ),
-                )
-            )
-            .order_by(Order.created_at)
-            .all()
-        )
-
-        matching_engine.restore_from_database(active_orders, db_session)
+        for symbol in _active_symbols(db_session):
+            if not owns(symbol):
+                continue
+            print(f"Restoring {symbol} order book...")
+            _restore_engine(registry.register(symbol), db_session)
 
         print("Order book restoration complete............")
     finally:
         db_session.close()
+
+
+def attach_engine_shards():
+    """Serve every active instrument from its engine process"""
+    engine_shard_pool.ensure_started()
+
+    db_session = next(get_db_session())
+    try:
+        for symbol in _active_symbols(db_session):
+            engine_registry.attach(symbol, engine_shard_pool.engine(symbol))
+    finally:
+        db_session.close()
+
+
+def _active_symbols(db_session) -> List[str]:
+    instruments = (
+        db_session.query(InstrumentModel).filter(InstrumentModel.active).all()
+    )
+    return [instrument.symbol for instrument in instruments]
+
+
+def _restore_engine(engine: OrderMatchingEngine, db_session):
+    """Restore one instrument's last trade price and active orders"""
+    # Initialize last trade price, from the price history or else the
+    # last trade. Only here: afterwards the engine keeps it live
+    print("setting last trade price........")
+    last_price = (
+        db_session.query(PriceHistoryModel)
+        .filter(PriceHistoryModel.symbol == engine.symbol)
+        .order_by(PriceHistoryModel.timestamp.desc())
+        .first()
+    ) or (
+        db_session.query(Trade)
+        .filter(Trade.symbol == engine.symbol)
+        .order_by(desc(Trade.ts))
+        .first()
+    )
+    if last_price:
+        engine.set_last_trade_price(last_price.price)
+
+    # Get all active orders
+    active_orders = (
+        db_session.query(Order)
+        .filter(
+            and_(
+                Order.symbol == engine.symbol,
+                Order.active,
+                Order.remaining > 0,
+                Order.status.in_(
+                    [OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]
+                ),
+            )
+        )
+        .order_by(Order.created_at)
+        .all()
+    )
+
+    engine.restore_from_database(active_orders, db_session)
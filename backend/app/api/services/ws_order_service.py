@@ -0,0 +1,127 @@
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.api.services.order_book_service import OrderBookService
+from app.config import config
+from app.core.admission_dependencies import order_admission
+from app.core.rate_limit_dependencies import rate_limiters
+from app.database import SessionLocal
+from app.schemas.order_schemas import AmendOrderRequest, PlaceOrderRequest
+
+# Commands accepted on the trading WebSocket, see handle_order_command
+ORDER_COMMANDS = ("place", "cancel", "amend")
+
+
+def _ack(command: str, correlation_id, data: dict) -> dict:
+    return {
+        "type": "ack",
+        "command": command,
+        "id": correlation_id,
+        "data": jsonable_encoder(data),
+    }
+
+
+def _reject(command: str, correlation_id, error) -> dict:
+    return {
+        "type": "reject",
+        "command": command,
+        "id": correlation_id,
+        "error": error,
+    }
+
+
+def _service_for(db_session: Session, message: dict) -> OrderBookService:
+    """Service of the instrument named by the command's symbol"""
+    return OrderBookService(
+        db_session, message.get("symbol") or config.DEFAULT_SYMBOL
+    )
+
+
+async def _place(db_session: Session, user_id: str, message: dict):
+    order_request = PlaceOrderRequest.model_validate(message.get("order"))
+    service = OrderBookService(db_session, order_request.symbol)
+    return await service.place_order(
+        user_id=user_id, order_request=order_request
+    )
+
+
+async def _cancel(db_session: Session, user_id: str, message: dict):
+    order_id = message.get("order_id")
+    service = _service_for(db_session, message)
+    if not order_id or not await service.run_priority_command(
+        "cancel_order", user_id=user_id, order_id=str(order_id)
+    ):
+        raise LookupError("Order not found or cannot be cancelled")
+    return {"order_id": order_id}
+
+
+async def _amend(db_session: Session, user_id: str, message: dict):
+    amend_request = AmendOrderRequest.model_validate(message)
+    result = await _service_for(db_session, message).run_priority_command(
+        "amend_order",
+        user_id=user_id,
+        order_id=str(message.get("order_id")),
+        quantity=amend_request.quantity,
+        price=amend_request.price,
+    )
+    if result is None:
+        raise LookupError("Order not found or cannot be amended")
+    return result
+
+
+_HANDLERS = {"place": _place, "cancel": _cancel, "amend": _amend}
+
+
+async def handle_order_command(user_id: str, message: dict) -> dict:
+    """
+    Run an order command received on the WebSocket through the same
+    OrderBookService path as the REST routes and build the reply.
+
+    {"type": "place", "id": "c1", "order": {PlaceOrderRequest fields}}
+    {"type": "cancel", "id": "c2", "order_id": "...", "symbol": "BTC-USD"}
+    {"type": "amend", "id": "c3", "order_id": "...", "quantity": 5}
+
+    Cancel and amend act on the book of "symbol", the default instrument
+    when it is omitted.
+
+    The reply echoes the client's correlation id: {"type": "ack", "id",
+    "command", "data"} with the same data as the REST route, or
+    {"type": "reject", "id", "command", "error"}. Executions follow on the
+    socket as "executions" events
+    """
+    command = message.get("type")
+    correlation_id = message.get("id")
+
+    # Order entry shares the per-user budget of the REST routes
+    if command in ("place", "amend") and rate_limiters["orders"].acquire(
+        user_id
+    ):
+        return _reject(command, correlation_id, "Too many requests")
+
+    # New orders are shed like on the REST routes, cancels never are
+    admitted = command == "place"
+    if admitted and order_admission.admit():
+        return _reject(command, correlation_id, "Server busy, retry later")
+
+    started = time.monotonic()
+    try:
+        with SessionLocal() as db_session:
+            data = await _HANDLERS[command](db_session, user_id, message)
+    except ValidationError as e:
+        return _reject(
+            command,
+            correlation_id,
+            jsonable_encoder(
+                e.errors(include_url=False, include_context=False)
+            ),
+        )
+    except Exception as e:
+        return _reject(command, correlation_id, str(e))
+    finally:
+        if admitted:
+            order_admission.done(time.monotonic() - started)
+
+    return _ack(command, correlation_id, data)
@@ -1,85 +1,458 @@
-from fastapi import WebSocket
-from typing import Dict, List
-import json
+from fastapi import WebSocket, status
+from typing import Dict, List, Optional, Set, Union
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
-from decimal import Decimal
-from uuid import UUID
+from itertools import islice
+
+from app.config import config
+from app.util.codec_util import (
+    JSON_ENCODING,
+    encode_message,
+    serialize_default,
+)
+
+
+@dataclass(eq=False)
+class ConnectionState:
+    """Per-socket bookkeeping kept by the WebSocketManager"""
+
+    websocket: WebSocket
+    user_id: str
+    encoding: str = JSON_ENCODING
+    subscriptions: Set[str] = field(default_factory=set)
+    # Outbound (payload, future or None) pairs, written by the writer task
+    queue: Optional[asyncio.Queue] = None
+    writer: Optional[asyncio.Task] = None
+    connected_at: datetime = field(default_factory=datetime.utcnow)
+    # Monotonic time of the last message received from the client
+    last_activity: float = field(default_factory=time.monotonic)
+    messages_sent: int = 0
+    send_failures: int = 0
+
+
+def _is_seq(value) -> bool:
+    """Whether value is a sequence number (an int, not a bool) or None"""
+    return value is None or (
+        isinstance(value, int) and not isinstance(value, bool)
+    )
+
+
+class TopicBuffer:
+    """
+    Bounded ring of recent sequenced events for one market-data topic.
+    Every event on a topic carries the full topic state, so the newest
+    event doubles as the snapshot for clients that are too far behind.
+    """
+
+    def __init__(self, topic: str, size: int):
+        self.topic = topic
+        self.seq = 0
+        self.events: deque = deque(maxlen=size)
+
+    def append(self, message: dict) -> dict:
+        """Stamp message with topic and next sequence number and keep it"""
+        self.seq += 1
+        sequenced = {**message, "topic": self.topic, "seq": self.seq}
+        self.events.append(sequenced)
+        return sequenced
+
+    def snapshot(self) -> Optional[dict]:
+        """Latest event of the topic marked as a snapshot"""
+        if not self.events:
+            return None
+        return {**self.events[-1], "snapshot": True}
+
+    def since(self, last_seq: Optional[int]) -> List[dict]:
+        """
+        Events a client that last saw last_seq is missing, or the snapshot
+        if they are no longer in the ring (or last_seq is unknown)
+        """
+        if last_seq == self.seq:
+            return []
+
+        oldest = self.events[0]["seq"] if self.events else self.seq + 1
+        if last_seq is None or not oldest - 1 <= last_seq < self.seq:
+            snapshot = self.snapshot()
+            return [snapshot] if snapshot else []
+
+        # Sequence numbers in the ring are contiguous
+        return list(islice(self.events, last_seq + 1 - oldest, None))
 
 
 class WebSocketManager:
-    def __init__(self):
+    """
+    Registry of the connected sockets. Each socket has a bounded outbound
+    queue written by its own writer task, so a broadcast only enqueues and
+    a slow client cannot hold up the others: one that lets its queue fill
+    up is disconnected, and can resume from the replay buffers
+    """
+
+    def __init__(
+        self, replay_buffer_size: int = None, send_queue_size: int = None
+    ):
         # Store active connections by user_id
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.active_connections: Dict[str, Set[WebSocket]] = {}
         # Store all connections for broadcasting
-        self.all_connections: List[WebSocket] = []
+        self.all_connections: Set[WebSocket] = set()
+        # Socket -> connection state, gives O(1) owner lookup
+        self.connection_states: Dict[WebSocket, ConnectionState] = {}
+        # Topic -> recent sequenced events, for reconnect catch-up
+        self.replay_buffer_size = (
+            replay_buffer_size or config.WS_REPLAY_BUFFER_SIZE
+        )
+        self.topics: Dict[str, TopicBuffer] = {}
+        self.send_queue_size = send_queue_size or config.WS_SEND_QUEUE_SIZE
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Closes of slow sockets in flight
+        self._closing: Set[asyncio.Task] = set()
+        self.reaped_connections = 0
+        self.slow_disconnects = 0
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        encoding: str = JSON_ENCODING,
+    ):
         """Connect a new WebSocket client"""
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-
-        self.active_connections[user_id].append(websocket)
-        self.all_connections.append(websocket)
+        self.active_connections.setdefault(user_id, set()).add(websocket)
+        self.all_connections.add(websocket)
+        state = ConnectionState(
+            websocket=websocket,
+            user_id=user_id,
+            encoding=encoding,
+            queue=asyncio.Queue(maxsize=self.send_queue_size),
+        )
+        state.writer = asyncio.get_running_loop().create_task(
+            self._write(state)
+        )
+        self.connection_states[websocket] = state
 
-    def disconnect(self, websocket: WebSocket, user_id: str):
+    def disconnect(self, websocket: WebSocket, user_id: Optional[str] = None):
         """Disconnect a WebSocket client"""
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
+        state = self.connection_states.pop(websocket, None)
+        if state is not None:
+            user_id = state.user_id
+            self._stop_writer(state)
+
+        connections = self.active_connections.get(user_id)
+        if connections is not None:
+            connections.discard(websocket)
 
             # Remove user entry if no connections left
-            if not self.active_connections[user_id]:
+            if not connections:
                 del self.active_connections[user_id]
 
-        if websocket in self.all_connections:
-            self.all_connections.remove(websocket)
+        self.all_connections.discard(websocket)
 
-    async def send_personal_message(self, message: dict, user_id: str):
-        """Send message to specific user"""
-        if user_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_id][
-                :
-            ]:  # Create a copy to iterate
-                try:
-                    await connection.send_text(
-                        json.dumps(message, default=self._json_serializer)
-                    )
-                except Exception:
-                    disconnected.append(connection)
-
-            # Remove disconnected connections
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
+    def _stop_writer(self, state: ConnectionState):
+        """Stop writing to a socket, failing the sends still waited on"""
+        if state.writer is not None:
+            state.writer.cancel()
+        while state.queue is not None and not state.queue.empty():
+            _, sent = state.queue.get_nowait()
+            state.queue.task_done()
+            if sent is not None and not sent.done():
+                sent.set_result(False)
 
-    async def broadcast_message(self, message: dict):
-        """Broadcast message to all connected clients"""
-        if not self.all_connections:
-            return
+    async def _write(self, state: ConnectionState):
+        """Write the queued payloads of a socket in order until one fails"""
+        while True:
+            payload, sent = await state.queue.get()
+            ok = False
+            try:
+                ok = await self._send(state.websocket, payload)
+            finally:
+                state.queue.task_done()
+                if sent is not None and not sent.done():
+                    sent.set_result(ok)
+            if not ok:
+                self.disconnect(state.websocket)
+                return
 
-        disconnected = []
-        successful_sends = 0
+    def _enqueue(self, websocket: WebSocket, payload) -> bool:
+        """
+        Queue a payload without waiting. A socket whose queue is full is
+        too slow: it is disconnected and closed, and False is returned
+        """
+        state = self.connection_states.get(websocket)
+        if state is None:
+            return False
+        try:
+            state.queue.put_nowait((payload, None))
+        except asyncio.QueueFull:
+            self.slow_disconnects += 1
+            self.disconnect(websocket)
+            task = asyncio.get_running_loop().create_task(
+                self._close(websocket, status.WS_1013_TRY_AGAIN_LATER)
+            )
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+            return False
+        return True
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _send_and_wait(
+        self, websocket: WebSocket, payloads: List[Union[str, bytes]]
+    ) -> bool:
+        """
+        Queue payloads behind what the socket already has queued and wait
+        until they are written. Returns whether they all were
+        """
+        state = self.connection_states.get(websocket)
+        if state is None:
+            return False
+        sent = None
+        for payload in payloads:
+            sent = asyncio.get_running_loop().create_future()
+            await state.queue.put((payload, sent))
+        return sent is None or await sent
+
+    async def drain(self):
+        """Wait until every socket has written what is queued for it"""
+        for state in list(self.connection_states.values()):
+            if state.writer is None or state.writer.done():
+                continue
+            join = asyncio.ensure_future(state.queue.join())
+            await asyncio.wait(
+                {join, state.writer}, return_when=asyncio.FIRST_COMPLETED
+            )
+            join.cancel()
+
+    def get_connection_state(
+        self, websocket: WebSocket
+    ) -> Optional[ConnectionState]:
+        """Get the state tracked for a connected socket"""
+        return self.connection_states.get(websocket)
 
-        for connection in self.all_connections[:]:  # Create a copy to iterate
+    def touch(self, websocket: WebSocket):
+        """Record inbound activity on a socket"""
+        state = self.connection_states.get(websocket)
+        if state is not None:
+            state.last_activity = time.monotonic()
+
+    async def check_heartbeats(self, interval: float, timeout: float) -> int:
+        """
+        Ping connections silent for longer than interval and close those
+        silent for longer than timeout. Returns the number of reaped sockets
+        """
+        now = time.monotonic()
+        stale, quiet = [], []
+        for websocket, state in list(self.connection_states.items()):
+            idle = now - state.last_activity
+            if idle > timeout:
+                stale.append(websocket)
+            elif idle >= interval:
+                quiet.append(websocket)
+
+        for websocket in stale:
+            self.disconnect(websocket)
             try:
-                await connection.send_text(
-                    json.dumps(message, default=self._json_serializer)
-                )
-                successful_sends += 1
+                await websocket.close(code=status.WS_1001_GOING_AWAY)
             except Exception:
+                pass
+        self.reaped_connections += len(stale)
+
+        if quiet:
+            disconnected = await self._send_many({"type": "ping"}, quiet)
+            for conn in disconnected:
+                self.disconnect(conn)
+
+        return len(stale)
+
+    async def _run_heartbeats(self, interval: float, timeout: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check_heartbeats(interval, timeout)
+            except Exception:
+                pass
+
+    def start_heartbeats(self, interval: float = None, timeout: float = None):
+        """Start the heartbeat and idle-connection reaper task"""
+        if (
+            self._heartbeat_task is not None
+            and not self._heartbeat_task.done()
+        ):
+            return
+        self._heartbeat_task = asyncio.get_running_loop().create_task(
+            self._run_heartbeats(
+                interval or config.WS_HEARTBEAT_INTERVAL,
+                timeout or config.WS_IDLE_TIMEOUT,
+            )
+        )
+
+    async def stop_heartbeats(self):
+        """Stop the heartbeat and idle-connection reaper task"""
+        if self._heartbeat_task is None:
+            return
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+
+    def _encoding_for(self, connection: WebSocket) -> str:
+        state = self.connection_states.get(connection)
+        return state.encoding if state is not None else JSON_ENCODING
+
+    async def _send(
+        self, connection: WebSocket, payload: Union[str, bytes]
+    ) -> bool:
+        """Send a payload to a single socket, recording per-connection stats"""
+        state = self.connection_states.get(connection)
+        try:
+            if isinstance(payload, bytes):
+                await connection.send_bytes(payload)
+            else:
+                await connection.send_text(payload)
+        except Exception:
+            if state is not None:
+                state.send_failures += 1
+            return False
+
+        if state is not None:
+            state.messages_sent += 1
+        return True
+
+    async def _send_many(self, message: dict, connections) -> list:
+        """
+        Queue message for the given sockets, encoding it once per wire
+        encoding, and return the sockets that are gone or too slow
+        """
+        payloads: Dict[str, Union[str, bytes]] = {}
+        disconnected = []
+        for connection in list(connections):  # Copy to iterate
+            encoding = self._encoding_for(connection)
+            if encoding not in payloads:
+                payloads[encoding] = encode_message(message, encoding)
+            if not self._enqueue(connection, payloads[encoding]):
                 disconnected.append(connection)
+        return disconnected
+
+    async def send_to_connection(
+        self, websocket: WebSocket, message: dict
+    ) -> bool:
+        """
+        Send message to one socket in its negotiated encoding, after what
+        is already queued for it, and wait until it is written
+        """
+        encoding = self._encoding_for(websocket)
+        return await self._send_and_wait(
+            websocket, [encode_message(message, encoding)]
+        )
+
+    async def send_personal_message(self, message: dict, user_id: str):
+        """Send message to specific user"""
+        connections = self.active_connections.get(user_id)
+        if not connections:
+            return
+
+        disconnected = await self._send_many(message, connections)
 
         # Remove disconnected connections
         for conn in disconnected:
-            # Find user_id for this connection
-            user_to_disconnect = None
-            for user_id, connections in self.active_connections.items():
-                if conn in connections:
-                    user_to_disconnect = user_id
-                    break
+            self.disconnect(conn, user_id)
+
+    def _topic_buffer(self, topic: str) -> TopicBuffer:
+        if topic not in self.topics:
+            self.topics[topic] = TopicBuffer(topic, self.replay_buffer_size)
+        return self.topics[topic]
+
+    def subscribe(self, websocket: WebSocket, symbols: List[str]):
+        """
+        Limit the market data a socket receives to the given instruments,
+        an empty list subscribes it to all of them again
+        """
+        state = self.connection_states.get(websocket)
+        if state is not None:
+            state.subscriptions = set(symbols)
+
+    def _subscribers(self, symbol: Optional[str]) -> List[WebSocket]:
+        """Sockets that receive market data of symbol"""
+        subscribers = []
+        for connection in self.all_connections:
+            state = self.connection_states.get(connection)
+            if (
+                symbol is None
+                or state is None
+                or not state.subscriptions
+                or symbol in state.subscriptions
+            ):
+                subscribers.append(connection)
+        return subscribers
+
+    async def broadcast_message(
+        self,
+        message: dict,
+        topic: Optional[str] = None,
+        symbol: Optional[str] = None,
+    ):
+        """
+        Broadcast message to all connected clients, or only those subscribed
+        to symbol. Messages published on a topic are sequenced and kept in
+        its replay buffer
+        """
+        if topic is not None:
+            message = self._topic_buffer(topic).append(message)
+
+        connections = self._subscribers(symbol)
+        if not connections:
+            return
+
+        disconnected = await self._send_many(message, connections)
+
+        # Remove disconnected connections, owner is found via the state map
+        for conn in disconnected:
+            self.disconnect(conn)
+
+    async def replay(
+        self, websocket: WebSocket, last_seq: Dict[str, Optional[int]]
+    ):
+        """
+        Catch a reconnecting client up from the replay buffers. last_seq maps
+        topic to the last sequence the client saw (None for a snapshot).
+        Raises ValueError, before sending anything, when it does not
+        """
+        if not isinstance(last_seq, dict) or not all(
+            isinstance(topic, str) and _is_seq(seq)
+            for topic, seq in last_seq.items()
+        ):
+            raise ValueError(
+                "last_seq must map topics to sequence numbers or null"
+            )
 
-            if user_to_disconnect:
-                self.disconnect(conn, user_to_disconnect)
+        messages = []
+        for topic, seq in last_seq.items():
+            buffer = self.topics.get(topic)
+            if buffer is not None:
+                messages.extend(buffer.since(seq))
+
+        messages.append(
+            {
+                "type": "resume_complete",
+                "seq": {
+                    topic: buffer.seq for topic, buffer in self.topics.items()
+                },
+            }
+        )
+
+        # Waits for room in the queue: a long catch-up only holds up this
+        # client's own handler
+        encoding = self._encoding_for(websocket)
+        await self._send_and_wait(
+            websocket,
+            [encode_message(message, encoding) for message in messages],
+        )
 
     async def send_order_status_update(self, user_id: str, order_data: dict):
         """Send order status update to specific user"""
@@ -90,27 +463,48 @@ class WebSocketManager:
         }
         await self.send_personal_message(message, user_id)
 
-    async def broadcast_price_change(self, price: float, timestamp):
-        """Broadcast price change event to all clients"""
+    async def send_executions(self, user_id: str, executions: dict):
+        """Send the batched fills and order states of one matching pass"""
+        message = {
+            "event": "executions",
+            "timestamp": datetime.utcnow().isoformat(),
+            "data": executions,
+        }
+        await self.send_personal_message(message, user_id)
+
+    async def broadcast_book_update(
+        self, book: dict, symbol: str = config.DEFAULT_SYMBOL
+    ):
+        """
+        Broadcast an order book snapshot of an instrument to its
+        subscribers, on topic "book.<symbol>"
+        """
+        await self.broadcast_message(
+            {"type": "order_book_update", "symbol": symbol, "data": book},
+            topic=f"book.{symbol}",
+            symbol=symbol,
+        )
+
+    async def broadcast_price_change(
+        self, price: float, timestamp, symbol: str = config.DEFAULT_SYMBOL
+    ):
+        """
+        Broadcast a price change of an instrument to its subscribers, on
+        topic "price.<symbol>"
+        """
         message = {
             "event": "price_change",
+            "symbol": symbol,
             "timestamp": timestamp.isoformat(),
             "data": {"price": price, "timestamp": timestamp.isoformat()},
         }
-        await self.broadcast_message(message)
-
-    def _json_serializer(self, obj):
-        """JSON serializer for objects not serializable by default json code"""
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, datetime):
-            return obj.isoformat()
-        elif isinstance(obj, UUID):
-            return str(obj)
-        raise TypeError(
-            f"Object of type '{type(obj).__name__}' is not JSON serializable"
+        await self.broadcast_message(
+            message, topic=f"price.{symbol}", symbol=symbol
         )
 
+    # JSON serializer for objects not serializable by default json code
+    _json_serializer = staticmethod(serialize_default)
+
 
 # Global WebSocket manager instance
 ws_manager = WebSocketManager()
@@ -14,6 +14,70 @@ class Config:
     ACCESS_TOKEN_EXPIRE_MINUTES = int(
         os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60)
     )
+    # bcrypt runs on this many threads, with at most
+    # PASSWORD_HASH_MAX_QUEUE more operations waiting for a thread
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64))
+    # Verified access tokens cached per worker, until their exp
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    # Token buckets: sustained requests per second and burst size, per
+    # client IP for signup/login and per user for order entry
+    AUTH_RATE_LIMIT = float(os.getenv("AUTH_RATE_LIMIT", 1))
+    AUTH_RATE_BURST = int(os.getenv("AUTH_RATE_BURST", 10))
+    ORDER_RATE_LIMIT = float(os.getenv("ORDER_RATE_LIMIT", 50))
+    ORDER_RATE_BURST = int(os.getenv("ORDER_RATE_BURST", 100))
+    # Instrument used when a request names no symbol, seeded by migration
+    DEFAULT_SYMBOL = os.getenv("DEFAULT_SYMBOL", "BTC-USD")
+    # Engine processes owning the instrument books, shared by all workers
+    # and reached over Unix sockets; 0 keeps the books in each worker
+    ENGINE_SHARDS = int(os.getenv("ENGINE_SHARDS", 0))
+    ENGINE_SHARD_SOCKET_DIR = os.getenv(
+        "ENGINE_SHARD_SOCKET_DIR", "/tmp/engine-shards"
+    )
+    # Engine processes publish the top MARKET_DATA_DEPTH levels of each
+    # book to shared memory regions named <prefix>-<symbol>
+    MARKET_DATA_DEPTH = int(os.getenv("MARKET_DATA_DEPTH", 10))
+    MARKET_DATA_SHM_PREFIX = os.getenv("MARKET_DATA_SHM_PREFIX", "orderbook")
+    # Orders placed concurrently in a worker are matched and committed in
+    # micro-batches of up to ORDER_QUEUE_MAX_BATCH, collected for at most
+    # ORDER_QUEUE_MAX_DELAY_MS; 0 places each order on its own
+    ORDER_QUEUE_MAX_BATCH = int(os.getenv("ORDER_QUEUE_MAX_BATCH", 0))
+    ORDER_QUEUE_MAX_DELAY_MS = float(os.getenv("ORDER_QUEUE_MAX_DELAY_MS", 1))
+    # New orders get a 503 with Retry-After while a worker has
+    # ADMISSION_MAX_IN_FLIGHT of them in progress, ADMISSION_MAX_QUEUE_DEPTH
+    # queued, or a p99 latency above ADMISSION_MAX_P99_MS over the last
+    # ADMISSION_LATENCY_WINDOW_SECONDS; 0 disables a limit
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 500))
+    ADMISSION_MAX_QUEUE_DEPTH = int(
+        os.getenv("ADMISSION_MAX_QUEUE_DEPTH", 2000)
+    )
+    ADMISSION_MAX_P99_MS = float(os.getenv("ADMISSION_MAX_P99_MS", 5000))
+    ADMISSION_LATENCY_WINDOW_SECONDS = float(
+        os.getenv("ADMISSION_LATENCY_WINDOW_SECONDS", 10)
+    )
+    ADMISSION_RETRY_AFTER_SECONDS = int(
+        os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1)
+    )
+    # Most orders accepted by one POST /orders/batch
+    ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", 100))
+    # client_order_id -> order id entries kept per worker for retries,
+    # older ones are looked up in the DB
+    CLIENT_ORDER_INDEX_SIZE = int(os.getenv("CLIENT_ORDER_INDEX_SIZE", 100000))
+    CLIENT_ORDER_INDEX_TTL_SECONDS = int(
+        os.getenv("CLIENT_ORDER_INDEX_TTL_SECONDS", 86400)
+    )
+    # Users looked up for tokens without role claims are cached this long
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+    USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+
+    # WebSocket Config
+    WS_REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", 1000))
+    WS_EVENT_QUEUE_SIZE = int(os.getenv("WS_EVENT_QUEUE_SIZE", 10000))
+    # Messages queued per socket before a slow client is disconnected
+    WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 256))
+    # Seconds of client silence before a server ping, and before reaping
+    WS_HEARTBEAT_INTERVAL = int(os.getenv("WS_HEARTBEAT_INTERVAL", 15))
+    WS_IDLE_TIMEOUT = int(os.getenv("WS_IDLE_TIMEOUT", 45))
 
 
 config = Config()
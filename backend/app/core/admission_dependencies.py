@@ -0,0 +1,39 @@
+import math
+import time
+
+from fastapi import HTTPException, status
+
+from app.config import config
+from app.api.services.order_queue_service import PLACE_LANE, order_entry_queue
+from app.util.admission_util import AdmissionController
+
+# New order commands of this worker (REST and WebSocket), reported under
+# /metrics. Cancels and reads are never shed
+order_admission = AdmissionController(
+    max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+    max_queue_depth=config.ADMISSION_MAX_QUEUE_DEPTH,
+    max_p99=config.ADMISSION_MAX_P99_MS / 1000,
+    latency_window=config.ADMISSION_LATENCY_WINDOW_SECONDS,
+    retry_after=config.ADMISSION_RETRY_AFTER_SECONDS,
+    queue_depth=lambda: order_entry_queue.lane_depth(PLACE_LANE),
+)
+
+
+async def admit_order():
+    """
+    Dependency admitting a new order command, or rejecting it at once with
+    a retryable 503 while the worker is overloaded
+    """
+    retry_after = order_admission.admit()
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        order_admission.done(time.monotonic() - started)
@@ -1,46 +1,102 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from sqlalchemy import event
 import uuid
 
 from app.config import config
+from app.database import SessionLocal
+from app.database.enums.user_enums import UserTypeEnum
 from app.database.models.user_models import UserModel
+from app.schemas.auth_schemas import AuthenticatedUserSchema
+from app.util.auth_util import decode_access_token
+from app.util.cache_util import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Users loaded from the DB, checked against the claims of access tokens
+user_cache = TTLCache(
+    maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drop a cached user, e.g. after its role changed or it was deleted
+    """
+    user_cache.invalidate(str(user_id))
+
+
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Other workers see the change once their entry expires
+    invalidate_cached_user(target.user_id)
+
+
+def _user_from_claims(payload: dict) -> Optional[AuthenticatedUserSchema]:
+    """
+    Build the user from the signed claims of an access token, None for
+    other tokens (e.g. refresh tokens, which carry no role)
+    """
+    if not payload.get("user_id") or not payload.get("user_type"):
+        return None
+    return AuthenticatedUserSchema(
+        user_id=uuid.UUID(payload["user_id"]),
+        email=payload.get("sub"),
+        user_type=UserTypeEnum(payload["user_type"]),
+    )
+
+
+def _load_user(user_id: str) -> Optional[AuthenticatedUserSchema]:
+    """Look the user up in the DB, going through the user cache"""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    with SessionLocal() as db:
+        row = (
+            db.query(UserModel.user_id, UserModel.email, UserModel.user_type)
+            .filter(UserModel.user_id == uuid.UUID(user_id))
+            .first()
+        )
+    if not row:
+        return None
+
+    user = AuthenticatedUserSchema(
+        user_id=row.user_id, email=row.email, user_type=row.user_type
+    )
+    user_cache.set(user_id, user)
+    return user
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-) -> UserModel:
+) -> AuthenticatedUserSchema:
     """
-    Get the current user from the access token.
+    Get the current user from the access token. Only access tokens, which
+    carry the user_id and user_type claims, are accepted. The user must
+    still exist, and its role is the one in the DB, not the claim: both
+    come from the user cache, so the DB is queried at most once per user
+    per USER_CACHE_TTL_SECONDS. Shares the verified-token cache with the
+    WS path.
     """
     try:
-        payload = jwt.decode(
-            token, config.JWT_SECRET_KEY, algorithms=[config.ALGORITHM]
-        )
-        user_id = payload.get("user_id")
-        if not user_id:
+        claims = _user_from_claims(decode_access_token(token))
+        if claims is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token",
             )
-        from app.database import get_db_session
-
-        # Get a DB session (sync context, so use next())
-        db = next(get_db_session())
-        user = (
-            db.query(UserModel)
-            .filter(UserModel.user_id == uuid.UUID(user_id))
-            .first()
-        )
+        user = _load_user(str(claims.user_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
         return user
-    except JWTError:
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
@@ -48,8 +104,8 @@ async def get_current_user(
 
 
 async def get_current_admin_user(
-    current_user: UserModel = Depends(get_current_user),
-) -> UserModel:
+    current_user: AuthenticatedUserSchema = Depends(get_current_user),
+) -> AuthenticatedUserSchema:
     """
     Dependency to ensure current user is an admin
     """
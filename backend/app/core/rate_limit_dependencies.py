@@ -0,0 +1,76 @@
+import math
+from typing import Dict
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.config import config
+from app.core.auth_dependencies import get_current_user
+from app.schemas.auth_schemas import AuthenticatedUserSchema
+from app.util.rate_limit_util import TokenBucketLimiter
+
+# Limiters by route budget name, reported under /metrics
+rate_limiters: Dict[str, TokenBucketLimiter] = {}
+
+
+def _check_rate_limit(limiter: TokenBucketLimiter, key: str, tokens: int = 1):
+    try:
+        retry_after = limiter.acquire(key, tokens)
+    except ValueError as e:
+        # Waiting would not help: the bucket never holds that many tokens
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Request exceeds the rate limit: {str(e)}",
+        )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def limit_by_ip(name: str, rate: float, burst: int):
+    """
+    Dependency allowing rate requests per second (burst at once) per
+    client IP, for routes that run before the caller is authenticated
+    """
+    limiter = rate_limiters[name] = TokenBucketLimiter(rate, burst)
+
+    async def dependency(request: Request):
+        client_ip = request.client.host if request.client else "unknown"
+        _check_rate_limit(limiter, client_ip)
+
+    return dependency
+
+
+def limit_by_user(name: str, rate: float, burst: int):
+    """
+    Dependency allowing rate requests per second (burst at once) per
+    authenticated user
+    """
+    limiter = rate_limiters[name] = TokenBucketLimiter(rate, burst)
+
+    async def dependency(
+        current_user: AuthenticatedUserSchema = Depends(get_current_user),
+    ):
+        _check_rate_limit(limiter, str(current_user.user_id))
+
+    return dependency
+
+
+def charge_user(name: str, user_id, tokens: int):
+    """
+    Take tokens from a limit_by_user budget inside a route, e.g. one per
+    order of a batch, answering 429 like the dependency, or 422 for more
+    tokens than the budget's burst
+    """
+    _check_rate_limit(rate_limiters[name], str(user_id), tokens)
+
+
+# Per-route budgets
+auth_rate_limit = limit_by_ip(
+    "auth", config.AUTH_RATE_LIMIT, config.AUTH_RATE_BURST
+)
+order_rate_limit = limit_by_user(
+    "orders", config.ORDER_RATE_LIMIT, config.ORDER_RATE_BURST
+)
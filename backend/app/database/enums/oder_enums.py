@@ -9,6 +9,12 @@ class Side(str, enum.Enum):
 class OrderType(str, enum.Enum):
     LIMIT = "LIMIT"
     MARKET = "MARKET"
+    # Held until a trade reaches stop_price, then a MARKET or LIMIT order
+    STOP = "STOP"
+    STOP_LIMIT = "STOP_LIMIT"
+
+
+STOP_ORDER_TYPES = (OrderType.STOP, OrderType.STOP_LIMIT)
 
 
 class OrderStatus(str, enum.Enum):
@@ -16,3 +22,10 @@ class OrderStatus(str, enum.Enum):
     PARTIALLY_FILLED = "PARTIALLY_FILLED"
     FILLED = "FILLED"
     CANCELED = "CANCELED"
+
+
+class TimeInForce(str, enum.Enum):
+    GTC = "GTC"  # Good till cancelled: the unfilled part rests
+    IOC = "IOC"  # Immediate or cancel: the unfilled part is cancelled
+    FOK = "FOK"  # Fill or kill: fills completely at once or not at all
+    POST_ONLY = "POST_ONLY"  # Rests only, cancelled if it would trade
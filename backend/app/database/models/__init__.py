@@ -1,2 +1,3 @@
 from app.database import Base  # noqa: F401
 from .user_models import UserModel  # noqa: F401
+from .instrument_models import InstrumentModel  # noqa: F401
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Boolean, DateTime, String
+
+from app.database import Base
+
+
+class InstrumentModel(Base):
+    __tablename__ = "instruments"
+    # e.g. "BTC-USD", also the key of the instrument's matching engine
+    symbol = Column(String(20), primary_key=True)
+    active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
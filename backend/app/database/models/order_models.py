@@ -10,14 +10,29 @@ from sqlalchemy import (
     Float,
     Boolean,
     DateTime,
+    String,
+    UniqueConstraint,
 )
 
+from app.config import config
 from app.database import Base
-from app.database.enums.oder_enums import Side, OrderType, OrderStatus
+from app.database.enums.oder_enums import (
+    Side,
+    OrderType,
+    OrderStatus,
+    TimeInForce,
+)
 
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "client_order_id",
+            name="uq_orders_user_id_client_order_id",
+        ),
+    )
     order_id = Column(
         PG_UUID(as_uuid=True),
         primary_key=True,
@@ -27,16 +42,31 @@ class Order(Base):
     user_id = Column(
         PG_UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=False
     )
+    symbol = Column(
+        String(20),
+        ForeignKey("instruments.symbol"),
+        default=config.DEFAULT_SYMBOL,
+        nullable=False,
+        index=True,
+    )
 
     side = Column(Enum(Side), nullable=False)
     order_type = Column(Enum(OrderType), nullable=False)
     price = Column(Float, nullable=True)
+    # Trigger price of stop orders
+    stop_price = Column(Float, nullable=True)
     quantity = Column(Float, nullable=False)
     remaining = Column(Float, nullable=False)
     status = Column(
         Enum(OrderStatus), default=OrderStatus.OPEN, nullable=False
     )
     active = Column(Boolean, default=True, nullable=False)
+    # What happens to the part of the order that does not fill at once
+    time_in_force = Column(
+        Enum(TimeInForce), default=TimeInForce.GTC, nullable=False
+    )
+    # Optional id chosen by the client, unique per user, for safe retries
+    client_order_id = Column(String(64), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
@@ -1,11 +1,19 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Float, DateTime, Integer
+from sqlalchemy import Column, Float, DateTime, Integer, ForeignKey, String
+from app.config import config
 from app.database import Base
 
 
 class PriceHistoryModel(Base):
     __tablename__ = "price_history"
     id = Column(Integer, primary_key=True, autoincrement=True)
+    symbol = Column(
+        String(20),
+        ForeignKey("instruments.symbol"),
+        default=config.DEFAULT_SYMBOL,
+        nullable=False,
+        index=True,
+    )
     timestamp = Column(
         DateTime, default=datetime.now(timezone.utc), nullable=False
     )
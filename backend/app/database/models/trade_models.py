@@ -2,8 +2,9 @@ from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 import uuid
 
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Float, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Float, Integer, ForeignKey, DateTime, String
 
+from app.config import config
 from app.database import Base
 
 
@@ -13,6 +14,13 @@ class Trade(Base):
     trade_id = Column(
         PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
+    symbol = Column(
+        String(20),
+        ForeignKey("instruments.symbol"),
+        default=config.DEFAULT_SYMBOL,
+        nullable=False,
+        index=True,
+    )
     engine_trade_id = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
     quantity = Column(Float, nullable=False)
@@ -25,3 +25,18 @@ limit_request_field_size = 8190
 
 # PID
 pidfile = "./gunicorn.pid"
+
+
+# Engine processes (ENGINE_SHARDS) are shared by all workers, so the master
+# starts them before forking and stops them on exit
+def on_starting(server):
+    from app.api.services.engine_shard_service import engine_shard_pool
+
+    if engine_shard_pool.enabled:
+        engine_shard_pool.start()
+
+
+def on_exit(server):
+    from app.api.services.engine_shard_service import engine_shard_pool
+
+    engine_shard_pool.stop()
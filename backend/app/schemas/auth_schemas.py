@@ -1,6 +1,8 @@
 import uuid
 
 from fastapi import Form
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr
 
 from app.database.enums.user_enums import UserTypeEnum
@@ -44,3 +46,9 @@ class UserLoginRequestSchema(BaseModel):
 class UserLoginResponseSchema(BaseModel):
     access_token: str
     refresh_token: str
+
+
+class AuthenticatedUserSchema(BaseModel):
+    user_id: uuid.UUID
+    email: Optional[str] = None
+    user_type: UserTypeEnum
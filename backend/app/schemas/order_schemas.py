@@ -2,29 +2,111 @@ from datetime import datetime
 from uuid import UUID
 from typing import Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
-from app.database.enums.oder_enums import Side, OrderType, OrderStatus
+from app.config import config
+from app.database.enums.oder_enums import (
+    Side,
+    OrderType,
+    OrderStatus,
+    TimeInForce,
+    STOP_ORDER_TYPES,
+)
+
+LIMIT_ORDER_TYPES = (OrderType.LIMIT, OrderType.STOP_LIMIT)
+MARKET_ORDER_TYPES = (OrderType.MARKET, OrderType.STOP)
 
 
 class PlaceOrderRequest(BaseModel):
+    symbol: str = Field(
+        default=config.DEFAULT_SYMBOL, min_length=1, max_length=20
+    )
     side: Side
     order_type: OrderType
     quantity: float = Field(gt=0)
     price: Optional[float] = Field(default=None, gt=0)
+    # Stop orders wait for a trade at or through stop_price, then become
+    # a market (STOP) or limit (STOP_LIMIT) order
+    stop_price: Optional[float] = Field(default=None, gt=0)
+    # Defaults to GTC for limit orders; market orders never rest, so they
+    # are IOC unless FOK
+    time_in_force: Optional[TimeInForce] = None
+    # Retrying with the same client_order_id returns the original order
+    client_order_id: Optional[str] = Field(
+        default=None, min_length=1, max_length=64
+    )
 
     @field_validator("price")
     def validate_price(cls, v, info):
         order_type = info.data.get("order_type")
-        if order_type == OrderType.LIMIT and v is None:
+        if order_type in LIMIT_ORDER_TYPES and v is None:
             raise ValueError("Price is required for limit orders")
-        if order_type == OrderType.MARKET and v is not None:
+        if order_type in MARKET_ORDER_TYPES and v is not None:
             raise ValueError("Price should not be specified for market orders")
         return v
 
+    @model_validator(mode="after")
+    def validate_required_prices(self):
+        # Field validators do not run on omitted fields
+        if self.order_type in LIMIT_ORDER_TYPES and self.price is None:
+            raise ValueError("Price is required for limit orders")
+        if self.order_type in STOP_ORDER_TYPES and self.stop_price is None:
+            raise ValueError("Stop price is required for stop orders")
+        if (
+            self.order_type not in STOP_ORDER_TYPES
+            and self.stop_price is not None
+        ):
+            raise ValueError("Stop price is only valid for stop orders")
+        return self
+
+    @model_validator(mode="after")
+    def validate_time_in_force(self):
+        if self.order_type in MARKET_ORDER_TYPES:
+            if self.time_in_force in (TimeInForce.GTC, TimeInForce.POST_ONLY):
+                raise ValueError("Market orders must be IOC or FOK")
+            if self.time_in_force is None:
+                self.time_in_force = TimeInForce.IOC
+        elif self.time_in_force is None:
+            self.time_in_force = TimeInForce.GTC
+        return self
+
+
+class PlaceOrderBatchRequest(BaseModel):
+    orders: list[PlaceOrderRequest] = Field(
+        min_length=1, max_length=config.ORDER_BATCH_MAX_SIZE
+    )
+
+    @model_validator(mode="after")
+    def validate_symbol(self):
+        if len({order.symbol for order in self.orders}) > 1:
+            raise ValueError("All orders of a batch must have the same symbol")
+        return self
+
+    @property
+    def symbol(self) -> str:
+        return self.orders[0].symbol
+
+
+class CancelOrderBatchRequest(BaseModel):
+    order_ids: list[UUID] = Field(
+        min_length=1, max_length=config.ORDER_BATCH_MAX_SIZE
+    )
+
+
+class AmendOrderRequest(BaseModel):
+    quantity: Optional[float] = Field(default=None, gt=0)
+    price: Optional[float] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def validate_change(self):
+        if self.quantity is None and self.price is None:
+            raise ValueError("Quantity or price is required")
+        return self
+
 
 class OrderResponse(BaseModel):
     id: UUID
+    symbol: str
     side: Side
     order_type: OrderType
     price: Optional[float]
@@ -33,6 +115,9 @@ class OrderResponse(BaseModel):
     status: OrderStatus
     active: bool
     created_at: datetime
+    time_in_force: TimeInForce = TimeInForce.GTC
+    stop_price: Optional[float] = None
+    client_order_id: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -43,6 +128,19 @@ class BookLevel(BaseModel):
     total_qty: float
 
 
+class QuoteResponse(BaseModel):
+    symbol: str
+    side: Side
+    quantity: float
+    filled_quantity: float  # Part of quantity the book can fill now
+    fully_available: bool
+    average_price: Optional[float]
+    best_price: Optional[float]
+    worst_price: Optional[float]
+    notional: float
+    slippage: Optional[float]  # Average price distance from best price
+
+
 class BookSnapshotResponse(BaseModel):
     bids: list[BookLevel]
     asks: list[BookLevel]
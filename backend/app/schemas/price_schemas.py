@@ -3,6 +3,7 @@ from datetime import datetime
 
 
 class PriceHistory(BaseModel):
+    symbol: str
     timestamp: datetime
     price: float
 
@@ -21,6 +21,12 @@ class WSOrderStatusSchema(BaseModel):
     data: dict[str, Any]
 
 
+class WSExecutionsSchema(BaseModel):
+    event: str = "executions"
+    timestamp: datetime
+    data: dict[str, Any]
+
+
 class WSErrorSchema(BaseModel):
     event: str = "error"
     message: str
@@ -30,3 +36,4 @@ class WSConnectionSchema(BaseModel):
     event: str = "connected"
     message: str
     user_id: str
+    encoding: str = "json"
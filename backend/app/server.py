@@ -8,17 +8,41 @@ from app.api.routers.price_routers import router as price_router
 from app.api.services.startup_service import (
     restore_matching_engine_from_database,
 )
+from app.api.services.broadcast_service import ws_broadcaster
+from app.api.services.engine_shard_service import engine_shard_pool
+from app.api.services.market_data_service import market_data_reader
+from app.api.services.order_queue_service import order_entry_queue
+from app.api.services.ws_service import ws_manager
+from app.core.admission_dependencies import order_admission
+from app.core.auth_dependencies import user_cache
+from app.core.rate_limit_dependencies import rate_limiters
+from app.util.auth_util import password_hasher, verified_token_cache
 
 
 async def set_engine():
     restore_matching_engine_from_database()
 
 
+async def start_ws_tasks():
+    ws_broadcaster.start()
+    ws_manager.start_heartbeats()
+
+
+async def stop_order_queue():
+    await order_entry_queue.stop()
+
+
+async def stop_ws_tasks():
+    await ws_manager.stop_heartbeats()
+    await ws_broadcaster.stop()
+
+
 app = FastAPI(
     title="Realtime Trading Platform",
     description="Trading platform with real-time order matching",
     version="1.0.0",
-    on_startup=[set_engine],
+    on_startup=[set_engine, start_ws_tasks],
+    on_shutdown=[stop_order_queue, stop_ws_tasks],
 )
 
 app.add_middleware(
@@ -35,6 +59,31 @@ async def health_check():
     return {"message": "server up and running"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics of this worker"""
+    return {
+        "password_hashing": password_hasher.metrics(),
+        "user_cache": user_cache.metrics(),
+        "token_cache": verified_token_cache.metrics(),
+        "rate_limits": {
+            name: limiter.metrics() for name, limiter in rate_limiters.items()
+        },
+        "engine_shards": engine_shard_pool.metrics(),
+        "market_data": market_data_reader.metrics(),
+        "order_queue": order_entry_queue.metrics(),
+        "order_admission": order_admission.metrics(),
+        "websocket": {
+            "connections": len(ws_manager.all_connections),
+            "reaped_connections": ws_manager.reaped_connections,
+            "slow_disconnects": ws_manager.slow_disconnects,
+            "event_queue_depth": ws_broadcaster.queue_depth,
+            "published_events": ws_broadcaster.published_events,
+            "dropped_events": ws_broadcaster.dropped_events,
+        },
+    }
+
+
 # Include routers
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["Authentication"])
 
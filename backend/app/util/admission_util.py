@@ -0,0 +1,122 @@
+import math
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+class LatencyWindow:
+    """
+    Latencies recorded over the last window seconds. Percentiles are
+    recomputed at most every refresh seconds, not on every read
+    """
+
+    def __init__(
+        self,
+        window: float,
+        max_samples: int = 10000,
+        refresh: float = 0.1,
+    ):
+        self.window = window
+        self.refresh = refresh
+        self._samples: deque = deque(maxlen=max_samples)  # (time, latency)
+        self._cached: Dict[float, Optional[float]] = {}
+        self._cached_at = -math.inf
+
+    def record(self, latency: float):
+        self._samples.append((time.monotonic(), latency))
+
+    def __len__(self) -> int:
+        self._expire(time.monotonic())
+        return len(self._samples)
+
+    def _expire(self, now: float):
+        while self._samples and self._samples[0][0] < now - self.window:
+            self._samples.popleft()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q (0-1) latency percentile, None without samples"""
+        now = time.monotonic()
+        if now - self._cached_at >= self.refresh:
+            self._cached = {}
+            self._cached_at = now
+        if q not in self._cached:
+            self._expire(now)
+            latencies = sorted(latency for _, latency in self._samples)
+            self._cached[q] = (
+                latencies[max(0, math.ceil(q * len(latencies)) - 1)]
+                if latencies
+                else None
+            )
+        return self._cached[q]
+
+
+class AdmissionController:
+    """
+    Sheds new work when this worker is overloaded: too many commands in
+    flight, too deep a queue (queue_depth) or a p99 latency over the last
+    latency_window seconds above max_p99. A limit of 0 is not enforced.
+    The latency limit applies from min_samples recent samples on, and
+    recovers as slow samples age out of the window
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue_depth: int,
+        max_p99: float,
+        latency_window: float,
+        retry_after: float,
+        queue_depth: Callable[[], int] = lambda: 0,
+        min_samples: int = 20,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.max_p99 = max_p99
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow(latency_window)
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = {"in_flight": 0, "queue_depth": 0, "latency": 0}
+
+    def overload(self) -> Optional[str]:
+        """Which limit is exceeded, None when new work is welcome"""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_queue_depth and self.queue_depth() >= self.max_queue_depth:
+            return "queue_depth"
+        if self.max_p99 and len(self.latencies) >= self.min_samples:
+            p99 = self.latencies.percentile(0.99)
+            if p99 is not None and p99 > self.max_p99:
+                return "latency"
+        return None
+
+    def admit(self) -> float:
+        """
+        Admit a command, to be followed by done(). Returns 0 when admitted,
+        otherwise the seconds the client should wait before retrying
+        """
+        reason = self.overload()
+        if reason is not None:
+            self.rejected[reason] += 1
+            return self.retry_after
+
+        self.in_flight += 1
+        self.admitted += 1
+        return 0.0
+
+    def done(self, latency: float):
+        """An admitted command finished after latency seconds"""
+        self.in_flight -= 1
+        self.latencies.record(latency)
+
+    def metrics(self) -> dict:
+        p99 = self.latencies.percentile(0.99)
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "p99_ms": None if p99 is None else 1000 * p99,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
@@ -1,34 +1,121 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import partial
 
 import jwt
 from passlib.context import CryptContext
 
 from app.config import config
 from app.database.models import UserModel
+from app.util.cache_util import TTLCache
 
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+class PasswordHasherBusyError(RuntimeError):
+    """Raised when too many password operations are already queued"""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a bounded thread pool so bcrypt never blocks
+    the event loop (bcrypt releases the GIL while it works)
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self.in_flight = 0  # Running plus waiting for a thread
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, func, *args, **kwargs):
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError(
+                "Too many authentication requests, try again shortly"
+            )
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, partial(func, *args, **kwargs)
+            )
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_queue=config.PASSWORD_HASH_MAX_QUEUE,
+)
+
+
 async def hash_password(password: str) -> str:
-    return password_context.hash(secret=password)
+    return await password_hasher.run(password_context.hash, secret=password)
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return password_context.verify(secret=plain_password, hash=hashed_password)
+    return await password_hasher.run(
+        password_context.verify, secret=plain_password, hash=hashed_password
+    )
+
+
+# Payloads of tokens whose signature was already verified, keyed by the
+# token's digest and kept until the token's exp
+verified_token_cache = TTLCache(
+    maxsize=config.TOKEN_CACHE_SIZE,
+    ttl=config.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
 
 
 def decode_access_token(token: str) -> dict:
-    """Decode and validate access token"""
+    """
+    Decode and validate access token. The signature of a token is verified
+    once per worker; later calls are served from verified_token_cache
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = verified_token_cache.get(digest)
+    if payload is not None:
+        return dict(payload)
+
     try:
         payload = jwt.decode(
             token, config.JWT_SECRET_KEY, algorithms=[config.ALGORITHM]
         )
-        return payload
     except jwt.ExpiredSignatureError:
         raise ValueError("Token has expired")
     except jwt.exceptions.InvalidTokenError:
         raise ValueError("Invalid token")
 
+    # Tokens without exp are never cached, as they could not expire
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            verified_token_cache.set(digest, dict(payload), ttl=remaining)
+    return payload
+
 
 async def create_auth_token(user: UserModel) -> dict[str, str]:
 
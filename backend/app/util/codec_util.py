@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Union
+from uuid import UUID
+
+import msgpack
+
+JSON_ENCODING = "json"
+MSGPACK_ENCODING = "msgpack"
+SUPPORTED_ENCODINGS = (JSON_ENCODING, MSGPACK_ENCODING)
+
+# Book sides that are sent as [[price, qty], ...] in binary encodings
+_LEVEL_KEYS = ("bids", "asks")
+
+
+def negotiate_encoding(requested: Optional[str]) -> str:
+    """Pick the wire encoding for a client, JSON unless asked otherwise"""
+    if requested and requested.lower() in SUPPORTED_ENCODINGS:
+        return requested.lower()
+    return JSON_ENCODING
+
+
+def serialize_default(obj):
+    """Serializer for objects not handled natively by json/msgpack"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, datetime):
+        return obj.isoformat()
+    elif isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(
+        f"Object of type '{type(obj).__name__}' is not JSON serializable"
+    )
+
+
+def compact_levels(message: dict) -> dict:
+    """
+    Return a copy of message with every bids/asks list of
+    {"price", "total_qty"} dicts turned into [price, total_qty] pairs
+    """
+    compacted = {}
+    for key, value in message.items():
+        if key in _LEVEL_KEYS and isinstance(value, list):
+            compacted[key] = [
+                (
+                    [level["price"], level["total_qty"]]
+                    if isinstance(level, dict)
+                    else level
+                )
+                for level in value
+            ]
+        elif isinstance(value, dict):
+            compacted[key] = compact_levels(value)
+        else:
+            compacted[key] = value
+    return compacted
+
+
+def encode_message(message: dict, encoding: str) -> Union[str, bytes]:
+    """Encode a message for the wire, text for JSON and bytes for msgpack"""
+    if encoding == MSGPACK_ENCODING:
+        return msgpack.packb(
+            compact_levels(message),
+            default=serialize_default,
+            use_bin_type=True,
+        )
+    return json.dumps(message, default=serialize_default)
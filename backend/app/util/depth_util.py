@@ -0,0 +1,174 @@
+import bisect
+import math
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+# Quantities closer than this are equal, float sums of decimal fractions
+# like 0.1 + 0.2 are off by about 1e-17
+QUANTITY_EPSILON = 1e-9
+
+
+@dataclass
+class Quote:
+    quantity: float  # Quantity asked for
+    filled_quantity: float  # Part of it the resting orders can fill
+    notional: float  # Cost of the filled quantity
+    best_price: Optional[float]  # Best level, None on an empty side
+    worst_price: Optional[float]  # Deepest level reached
+
+    @property
+    def fully_available(self) -> bool:
+        return self.filled_quantity >= self.quantity - QUANTITY_EPSILON
+
+    @property
+    def average_price(self) -> Optional[float]:
+        if self.filled_quantity <= 0:
+            return None
+        return self.notional / self.filled_quantity
+
+    @property
+    def slippage(self) -> Optional[float]:
+        """How far the average price is from the best price"""
+        if self.average_price is None:
+            return None
+        return abs(self.average_price - self.best_price)
+
+
+class DepthLadder:
+    """
+    Resting quantity per price level of one side of a book. Levels are
+    kept worst to best with a running total of quantity from the worst
+    level, so the deepest level a quantity reaches is a binary search. A
+    change only invalidates the totals from its level to the best one,
+    which are recomputed on the next quote. The quoted amounts are summed
+    exactly over the levels reached, a difference of running totals
+    loses the low digits of the small quantities
+    """
+
+    def __init__(self, best_is_highest: bool):
+        # Sort key of a price, ascending keys run from worst to best
+        self._sign = 1.0 if best_is_highest else -1.0
+        self._keys: List[float] = []
+        self._levels: Dict[float, List[float]] = {}  # key -> [qty, orders]
+        # Running total over _keys, entry i covers the levels before i
+        self._quantities: List[float] = [0.0]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _index(self, key: float) -> int:
+        return bisect.bisect_left(self._keys, key)
+
+    def _invalidate(self, index: int):
+        del self._quantities[index + 1 :]
+
+    def add(self, price: float, quantity: float):
+        """An order rests at price with quantity"""
+        key = self._sign * price
+        index = self._index(key)
+        level = self._levels.get(key)
+        if level is None:
+            self._keys.insert(index, key)
+            level = self._levels[key] = [0.0, 0]
+        level[0] += quantity
+        level[1] += 1
+        self._invalidate(index)
+
+    def reduce(self, price: float, quantity: float):
+        """A resting order at price lost quantity, e.g. to a fill"""
+        key = self._sign * price
+        self._levels[key][0] -= quantity
+        self._invalidate(self._index(key))
+
+    def remove(self, price: float, quantity: float):
+        """A resting order at price left the book with quantity left"""
+        key = self._sign * price
+        index = self._index(key)
+        level = self._levels[key]
+        level[0] -= quantity
+        level[1] -= 1
+        if level[1] <= 0:
+            del self._levels[key]
+            del self._keys[index]
+        self._invalidate(index)
+
+    @property
+    def best_price(self) -> Optional[float]:
+        return self._sign * self._keys[-1] if self._keys else None
+
+    def top(self, depth: int) -> List[Tuple[float, float]]:
+        """(price, quantity) of the best depth levels, best first"""
+        return [
+            (self._sign * key, self._levels[key][0])
+            for key in islice(reversed(self._keys), depth)
+        ]
+
+    def clear(self):
+        self._keys = []
+        self._levels = {}
+        self._invalidate(0)
+
+    def _totals(self) -> List[float]:
+        quantities = self._quantities
+        for index in range(len(quantities) - 1, len(self._keys)):
+            quantities.append(
+                quantities[-1] + self._levels[self._keys[index]][0]
+            )
+        return quantities
+
+    def _sum(self, start: int) -> Tuple[float, float]:
+        """Quantity and notional of the levels from start to the best"""
+        levels = [self._levels[key][0] for key in self._keys[start:]]
+        return math.fsum(levels), math.fsum(
+            quantity * self._sign * key
+            for quantity, key in zip(levels, self._keys[start:])
+        )
+
+    def quote(
+        self, quantity: float, limit_price: Optional[float] = None
+    ) -> Quote:
+        """
+        What filling quantity from the best level down would cost, only
+        down to limit_price if given
+        """
+        # First level at or better than the limit price
+        start = (
+            0 if limit_price is None else self._index(self._sign * limit_price)
+        )
+        best = self.best_price
+        if start == len(self._keys):
+            return Quote(quantity, 0.0, 0.0, best, None)
+        total, total_notional = self._sum(start)
+        if total <= QUANTITY_EPSILON:
+            return Quote(quantity, 0.0, 0.0, best, None)
+        if quantity >= total - QUANTITY_EPSILON:
+            return Quote(
+                quantity,
+                total,
+                total_notional,
+                best,
+                self._sign * self._keys[start],
+            )
+
+        # Deepest level needed: the last one from which the levels up to
+        # the best hold quantity. The running totals only locate it
+        quantities = self._totals()
+        index = bisect.bisect_right(quantities, quantities[-1] - quantity) - 1
+        index = min(max(index, start), len(self._keys) - 1)
+        above, above_notional = self._sum(index + 1)
+        # Rounding of the running totals can be a level off either way
+        while index + 1 < len(self._keys) and (
+            above >= quantity - QUANTITY_EPSILON
+        ):
+            index += 1
+            above, above_notional = self._sum(index + 1)
+        while index > start and (
+            above + self._levels[self._keys[index]][0]
+            < quantity - QUANTITY_EPSILON
+        ):
+            index -= 1
+            above, above_notional = self._sum(index + 1)
+        price = self._sign * self._keys[index]
+        notional = above_notional + (quantity - above) * price
+        return Quote(quantity, quantity, notional, best, price)
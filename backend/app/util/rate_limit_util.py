@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets, one per key (user id or client IP). Each
+    bucket refills at rate tokens per second up to burst; the least
+    recently seen keys are dropped beyond max_keys
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, list[float]]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    def acquire(self, key: Hashable, tokens: int = 1) -> float:
+        """
+        Take tokens for key. Returns 0 when allowed, otherwise the seconds
+        until the bucket holds them again. Raises ValueError for more
+        tokens than the burst, which a bucket never holds
+        """
+        if tokens > self.burst:
+            raise ValueError(
+                f"{tokens} tokens exceed the burst of {self.burst}"
+            )
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            held, last = bucket
+            bucket[0] = min(self.burst, held + (now - last) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= tokens:
+            bucket[0] -= tokens
+            self.allowed += 1
+            return 0.0
+
+        self.rejected += 1
+        return (tokens - bucket[0]) / self.rate
+
+    def metrics(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "tracked_keys": len(self._buckets),
+        }
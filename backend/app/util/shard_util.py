@@ -0,0 +1,48 @@
+import bisect
+import hashlib
+from typing import Dict, List, Optional
+
+
+def _hash(key: str) -> int:
+    # Stable across processes, unlike the salted built-in hash()
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """
+    Consistent-hash map of keys (instrument symbols) to shards. Each shard
+    owns replicas points on the ring, so adding a shard only moves the keys
+    it takes over. Explicit assignments, e.g. after a rebalance, take
+    precedence over the ring
+    """
+
+    def __init__(self, shards: List[int], replicas: int = 100):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, int] = {}
+        self.assignments: Dict[str, int] = {}
+        for shard in shards:
+            self.add_shard(shard)
+
+    def add_shard(self, shard: int):
+        for replica in range(self.replicas):
+            point = _hash(f"shard-{shard}-{replica}")
+            bisect.insort(self._points, point)
+            self._owners[point] = shard
+
+    @property
+    def shards(self) -> List[int]:
+        return sorted(set(self._owners.values()))
+
+    def shard_for(self, key: str) -> Optional[int]:
+        """Shard owning key, None if the ring has no shards"""
+        if key in self.assignments:
+            return self.assignments[key]
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def assign(self, key: str, shard: int):
+        """Pin key to a shard, overriding the ring"""
+        self.assignments[key] = shard
@@ -0,0 +1,95 @@
+import struct
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+# Write counter in front of the payload, odd while a write is in progress
+_SEQUENCE = struct.Struct("<Q")
+
+
+class TornReadError(Exception):
+    """A seqlock region kept changing, or its writer died mid-write"""
+
+
+def _open(name: str, size: int = 0, create: bool = False) -> SharedMemory:
+    shm = SharedMemory(name, create=create, size=size)
+    # Regions outlive the processes that open them, and the resource
+    # tracker would unlink them as soon as any of those processes exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SeqlockWriter:
+    """
+    Single writer of a shared memory region guarded by a seqlock. The
+    sequence turns odd before the payload is written and even after it,
+    so readers never lock and can tell when a read raced a write
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        total = _SEQUENCE.size + size
+        try:
+            self.shm = _open(name, total, create=True)
+        except FileExistsError:
+            # Left by a previous owner: carry on with its sequence
+            self.shm = _open(name)
+            if self.shm.size < total:
+                self.unlink()
+                self.shm = _open(name, total, create=True)
+        (sequence,) = _SEQUENCE.unpack_from(self.shm.buf, 0)
+        # Round up past a write its previous owner never finished
+        self.sequence = sequence + sequence % 2
+
+    def write(self, payload: bytes):
+        if len(payload) > self.size:
+            raise ValueError("Payload larger than the region")
+        buf = self.shm.buf
+        _SEQUENCE.pack_into(buf, 0, self.sequence + 1)
+        buf[_SEQUENCE.size : _SEQUENCE.size + len(payload)] = payload
+        self.sequence += 2
+        _SEQUENCE.pack_into(buf, 0, self.sequence)
+
+    def close(self):
+        """Stop writing, leaving the region to readers and the next owner"""
+        self.shm.close()
+
+    def unlink(self):
+        """Remove the region"""
+        # Balances the unregister that SharedMemory.unlink sends
+        resource_tracker.register(self.shm._name, "shared_memory")
+        self.shm.unlink()
+        self.shm.close()
+
+
+class SeqlockReader:
+    """Lock-free reader of a region written by a SeqlockWriter"""
+
+    def __init__(self, name: str, max_retries: int = 1000):
+        self.name = name
+        self.max_retries = max_retries
+        self.retries = 0
+        self.shm = _open(name)
+
+    def read(self) -> bytes:
+        """
+        Consistent copy of the payload, retried while a write is in
+        progress. Raises TornReadError if none is seen in max_retries
+        """
+        buf = self.shm.buf
+        for attempt in range(self.max_retries):
+            (before,) = _SEQUENCE.unpack_from(buf, 0)
+            if before % 2 == 0:
+                payload = bytes(buf[_SEQUENCE.size :])
+                (after,) = _SEQUENCE.unpack_from(buf, 0)
+                if before == after:
+                    return payload
+            self.retries += 1
+            if attempt % 16 == 15:
+                # Let a descheduled writer finish
+                time.sleep(0)
+        raise TornReadError(f"No consistent read of {self.name}")
+
+    def close(self):
+        self.shm.close()
@@ -0,0 +1,432 @@
+"""
+WebSocket fan-out load harness
+
+Starts the app locally with uvicorn (or targets --url), opens N real
+WebSocket clients on /api/v1/ws/update, subscribed to the book topic
+("book.<symbol>") of one instrument (--symbol), drives limit orders on it
+through /api/v1/orders/place and reports:
+
+- event-to-client latency of book updates (order POST -> client receipt)
+- order entry (HTTP) latency
+- messages received and message rate
+- server CPU and memory, sampled from /proc (Linux)
+
+A fraction of the clients can be made slow consumers (--slow-fraction),
+they sleep --slow-delay seconds after every message they read, which
+exercises server-side backpressure during fan-out.
+
+Usage (from backend/, with DATABASE_URL etc. set as for the app):
+
+    python scripts/ws_fanout_load.py --clients 1000 --orders 500
+    python scripts/ws_fanout_load.py --clients 10000 --slow-fraction 0.01
+    python scripts/ws_fanout_load.py --url http://localhost:8000 \\
+        --clients 50000 --encoding msgpack
+
+Large client counts need a high open file limit (ulimit -n), the harness
+raises its own soft limit to the hard limit on start.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+import msgpack
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.config import config  # noqa: E402
+
+API_PREFIX = "/api/v1"
+
+
+@dataclass
+class ClientStats:
+    slow: bool
+    messages: int = 0
+    # Book sequence number -> monotonic receipt time
+    book_receipts: Dict[int, float] = field(default_factory=dict)
+
+
+@dataclass
+class ServerSample:
+    cpu_percent: float
+    rss_mb: float
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def format_ms(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value * 1000:.2f}ms"
+
+
+def raise_open_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Run the app with a single uvicorn worker on localhost"""
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.server:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+    )
+
+
+async def wait_for_server(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                response = await http.get(f"{base_url}/")
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+
+async def get_access_token(base_url: str) -> str:
+    """Sign up a throwaway load-test user and log in"""
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = uuid.uuid4().hex
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        response = await http.post(
+            f"{API_PREFIX}/auth/signup",
+            json={"email": email, "password": password, "name": "load"},
+        )
+        response.raise_for_status()
+        response = await http.post(
+            f"{API_PREFIX}/auth/login",
+            json={"email": email, "password": password},
+        )
+        response.raise_for_status()
+        return response.json()["data"]["access_token"]
+
+
+def book_topic(symbol: str) -> str:
+    return f"book.{symbol}"
+
+
+def decode(raw) -> dict:
+    if isinstance(raw, bytes):
+        return msgpack.unpackb(raw)
+    return json.loads(raw)
+
+
+class ServerMonitor:
+    """Samples CPU and RSS of a process from /proc once per interval"""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[ServerSample] = []
+        self._ticks = os.sysconf("SC_CLK_TCK")
+
+    def _cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def _rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def run(self):
+        last_cpu, last_time = self._cpu_seconds(), time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            cpu, now = self._cpu_seconds(), time.monotonic()
+            self.samples.append(
+                ServerSample(
+                    cpu_percent=100 * (cpu - last_cpu) / (now - last_time),
+                    rss_mb=self._rss_mb(),
+                )
+            )
+            last_cpu, last_time = cpu, now
+
+
+async def run_client(
+    ws_url: str,
+    symbol: str,
+    stats: ClientStats,
+    slow_delay: float,
+    connected: asyncio.Event,
+    baseline: Dict[str, int],
+    stop: asyncio.Event,
+):
+    # Slow clients buffer at most one frame so the kernel socket buffers
+    # fill up and the server sees real backpressure
+    max_queue = 1 if stats.slow else None
+    async with websockets.connect(ws_url, max_queue=max_queue) as websocket:
+        decode(await websocket.recv())  # connected handshake
+        topic = book_topic(symbol)
+        await websocket.send(
+            json.dumps({"type": "subscribe", "symbols": [symbol]})
+        )
+        await websocket.send(
+            json.dumps({"type": "resume", "last_seq": {topic: None}})
+        )
+        connected.set()
+
+        while not stop.is_set():
+            try:
+                raw = await asyncio.wait_for(websocket.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            received_at = time.monotonic()
+            message = decode(raw)
+            stats.messages += 1
+
+            message_type = message.get("type")
+            if message_type == "ping":
+                await websocket.send(json.dumps({"type": "pong"}))
+            elif message_type == "resume_complete":
+                baseline.setdefault(topic, message["seq"].get(topic, 0))
+            elif message.get("topic") == topic and "snapshot" not in message:
+                stats.book_receipts[message["seq"]] = received_at
+
+            if stats.slow:
+                await asyncio.sleep(slow_delay)
+
+
+async def open_clients(args, ws_url: str, stop: asyncio.Event):
+    clients, tasks = [], []
+    baseline: Dict[str, int] = {}
+    slow_count = int(args.clients * args.slow_fraction)
+
+    for start in range(0, args.clients, args.ramp_batch):
+        batch = []
+        for i in range(start, min(start + args.ramp_batch, args.clients)):
+            stats = ClientStats(slow=i < slow_count)
+            connected = asyncio.Event()
+            clients.append(stats)
+            tasks.append(
+                asyncio.create_task(
+                    run_client(
+                        ws_url,
+                        args.symbol,
+                        stats,
+                        args.slow_delay,
+                        connected,
+                        baseline,
+                        stop,
+                    )
+                )
+            )
+            batch.append(connected.wait())
+        await asyncio.wait_for(asyncio.gather(*batch), timeout=60)
+        print(f"  {len(clients)} clients connected")
+
+    return clients, tasks, baseline
+
+
+async def drive_orders(
+    base_url: str, token: str, symbol: str, orders: int, rate: float
+) -> List[tuple]:
+    """Place limit orders at a fixed rate, returning (sent_at, latency)"""
+    sent = []
+    interval = 1.0 / rate
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers) as http:
+        for _ in range(orders):
+            order = {
+                "symbol": symbol,
+                "side": random.choice(["BUY", "SELL"]),
+                "order_type": "LIMIT",
+                "price": round(random.uniform(95, 105), 2),
+                "quantity": round(random.uniform(0.1, 2), 2),
+            }
+            sent_at = time.monotonic()
+            response = await http.post(
+                f"{API_PREFIX}/orders/place", json=order
+            )
+            response.raise_for_status()
+            sent.append((sent_at, time.monotonic() - sent_at))
+            await asyncio.sleep(
+                max(0.0, interval - (time.monotonic() - sent_at))
+            )
+    return sent
+
+
+def report(args, clients, sent, baseline, monitor, elapsed):
+    first_seq = baseline.get(book_topic(args.symbol), 0) + 1
+    fast_latencies, slow_latencies, missing = [], [], 0
+    for stats in clients:
+        target = slow_latencies if stats.slow else fast_latencies
+        for index, (sent_at, _) in enumerate(sent):
+            received_at = stats.book_receipts.get(first_seq + index)
+            if received_at is None:
+                missing += 1
+            else:
+                target.append(received_at - sent_at)
+
+    http_latencies = [latency for _, latency in sent]
+    total_messages = sum(stats.messages for stats in clients)
+
+    print("\n=== WebSocket fan-out load report ===")
+    print(
+        f"clients: {len(clients)} "
+        f"({sum(s.slow for s in clients)} slow), encoding: {args.encoding}"
+    )
+    print(f"orders placed: {len(sent)} on {args.symbol} in {elapsed:.1f}s")
+    for label, values in (
+        ("order entry (HTTP)", http_latencies),
+        ("event-to-client (fast)", fast_latencies),
+        ("event-to-client (slow)", slow_latencies),
+    ):
+        print(
+            f"{label:>24}: p50 {format_ms(percentile(values, 50))} "
+            f"p90 {format_ms(percentile(values, 90))} "
+            f"p99 {format_ms(percentile(values, 99))} "
+            f"max {format_ms(max(values) if values else None)}"
+        )
+    print(f"book updates not received: {missing}")
+    print(
+        f"messages received: {total_messages} "
+        f"({total_messages / elapsed:.0f} msg/s)"
+    )
+    if monitor and monitor.samples:
+        cpu = [sample.cpu_percent for sample in monitor.samples]
+        print(
+            f"server cpu: avg {sum(cpu) / len(cpu):.0f}% "
+            f"max {max(cpu):.0f}%, "
+            f"max rss {max(s.rss_mb for s in monitor.samples):.0f}MB"
+        )
+
+
+async def main(args):
+    raise_open_file_limit()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = start_server(args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    monitor_task = None
+    stop = asyncio.Event()
+    try:
+        await wait_for_server(base_url)
+        token = await get_access_token(base_url)
+        ws_url = (
+            base_url.replace("http", "ws", 1)
+            + f"{API_PREFIX}/ws/update?token={token}&encoding={args.encoding}"
+        )
+
+        monitor = None
+        server_pid = server.pid if server else args.server_pid
+        if server_pid:
+            monitor = ServerMonitor(server_pid)
+            monitor_task = asyncio.create_task(monitor.run())
+
+        print(f"Opening {args.clients} WebSocket clients...")
+        clients, tasks, baseline = await open_clients(args, ws_url, stop)
+
+        print(f"Placing {args.orders} orders at {args.rate}/s...")
+        started = time.monotonic()
+        sent = await drive_orders(
+            base_url, token, args.symbol, args.orders, args.rate
+        )
+        await asyncio.sleep(args.drain)
+        elapsed = time.monotonic() - started
+
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        report(args, clients, sent, baseline, monitor, elapsed)
+    finally:
+        stop.set()
+        if monitor_task:
+            monitor_task.cancel()
+        if server:
+            server.terminate()
+            server.wait()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument(
+        "--symbol",
+        default=config.DEFAULT_SYMBOL,
+        help="Instrument to trade and watch",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=50.0, help="Orders per second"
+    )
+    parser.add_argument(
+        "--slow-fraction",
+        type=float,
+        default=0.0,
+        help="Fraction of clients that read slowly",
+    )
+    parser.add_argument(
+        "--slow-delay",
+        type=float,
+        default=0.5,
+        help="Seconds a slow client sleeps after each message",
+    )
+    parser.add_argument(
+        "--encoding", choices=["json", "msgpack"], default="json"
+    )
+    parser.add_argument(
+        "--ramp-batch",
+        type=int,
+        default=500,
+        help="Clients connected concurrently per ramp step",
+    )
+    parser.add_argument(
+        "--drain",
+        type=float,
+        default=2.0,
+        help="Seconds to wait for in-flight events after the last order",
+    )
+    parser.add_argument(
+        "--url", help="Target a running server instead of starting one"
+    )
+    parser.add_argument(
+        "--server-pid",
+        type=int,
+        help="PID to sample CPU/memory from when using --url",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from app.util.admission_util import AdmissionController, LatencyWindow
+
+
+def controller(**limits):
+    settings = dict(
+        max_in_flight=0,
+        max_queue_depth=0,
+        max_p99=0,
+        latency_window=10,
+        retry_after=2,
+        min_samples=5,
+    )
+    settings.update(limits)
+    return AdmissionController(**settings)
+
+
+def test_sheds_past_max_in_flight():
+    admission = controller(max_in_flight=2)
+    assert admission.admit() == 0.0
+    assert admission.admit() == 0.0
+    assert admission.admit() == 2
+
+    admission.done(0.01)
+    assert admission.admit() == 0.0
+    assert admission.metrics()["rejected"]["in_flight"] == 1
+
+
+def test_sheds_past_max_queue_depth():
+    depth = [0]
+    admission = controller(max_queue_depth=10, queue_depth=lambda: depth[0])
+    assert admission.admit() == 0.0
+    depth[0] = 10
+    assert admission.admit() == 2
+    assert admission.overload() == "queue_depth"
+
+
+def test_sheds_on_p99_latency_until_slow_samples_expire():
+    admission = controller(max_p99=0.5)
+    with patch("app.util.admission_util.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        for _ in range(4):
+            admission.admit()
+            admission.done(1.0)
+        # Too few samples to judge
+        assert admission.overload() is None
+
+        admission.admit()
+        admission.done(1.0)
+        assert admission.admit() == 2
+        assert admission.metrics()["p99_ms"] == 1000.0
+
+        monotonic.return_value = 11.0
+        assert admission.admit() == 0.0
+
+
+def test_unset_limits_are_not_enforced():
+    admission = controller()
+    for _ in range(100):
+        admission.admit()
+    assert admission.in_flight == 100
+
+
+def test_percentile_is_cached_between_refreshes():
+    window = LatencyWindow(window=10, refresh=1)
+    with patch("app.util.admission_util.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        for latency in range(1, 101):
+            window.record(latency / 100)
+        assert window.percentile(0.99) == 0.99
+        assert window.percentile(0.5) == 0.5
+
+        window.record(5.0)
+        assert window.percentile(0.99) == 0.99
+        monotonic.return_value = 1.0
+        assert window.percentile(0.99) == 1.0
@@ -2,15 +2,38 @@ import pytest
 from fastapi import FastAPI, Depends
 from fastapi.testclient import TestClient
 from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 from unittest.mock import patch, MagicMock
+import time
 import uuid
 
 from app.core import auth_dependencies
+from app.database.models import order_models, trade_models  # noqa: F401
+from app.database.enums.user_enums import UserTypeEnum
 from app.database.models.user_models import UserModel
+from app.util.auth_util import decode_access_token, verified_token_cache
 
 # --- Fixtures ---
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    auth_dependencies.user_cache.clear()
+    verified_token_cache.clear()
+    yield
+    auth_dependencies.user_cache.clear()
+    verified_token_cache.clear()
+
+
+def mock_session_local(user):
+    """Patch SessionLocal so the user lookup returns user"""
+    db = MagicMock()
+    db.__enter__.return_value = db
+    db.query.return_value.filter.return_value.first.return_value = user
+    return patch.object(auth_dependencies, "SessionLocal", return_value=db)
+
+
 @pytest.fixture
 def app():
     app = FastAPI()
@@ -37,7 +60,8 @@ def client(app):
 def fake_user():
     user = MagicMock(spec=UserModel)
     user.user_id = uuid.uuid4()
-    user.user_type.value = "user"
+    user.email = "user@example.com"
+    user.user_type = UserTypeEnum.trader
     return user
 
 
@@ -45,13 +69,22 @@ def fake_user():
 def fake_admin():
     user = MagicMock(spec=UserModel)
     user.user_id = uuid.uuid4()
-    user.user_type.value = "admin"
+    user.email = "admin@example.com"
+    user.user_type = UserTypeEnum.admin
     return user
 
 
+def access_claims(user) -> dict:
+    return {
+        "sub": user.email,
+        "user_id": str(user.user_id),
+        "user_type": user.user_type.value,
+    }
+
+
 @pytest.fixture
 def valid_token(fake_user):
-    payload = {"user_id": str(fake_user.user_id)}
+    payload = access_claims(fake_user)
     return jwt.encode(
         payload,
         auth_dependencies.config.JWT_SECRET_KEY,
@@ -61,7 +94,7 @@ def valid_token(fake_user):
 
 @pytest.fixture
 def admin_token(fake_admin):
-    payload = {"user_id": str(fake_admin.user_id)}
+    payload = access_claims(fake_admin)
     return jwt.encode(
         payload,
         auth_dependencies.config.JWT_SECRET_KEY,
@@ -73,18 +106,7 @@ def admin_token(fake_admin):
 
 
 def test_get_current_user_success(client, valid_token, fake_user):
-    with patch("app.database.get_db_session") as mock_db:
-        mock_db.return_value = iter(
-            [
-                MagicMock(
-                    query=lambda model: MagicMock(
-                        filter=lambda *a, **k: MagicMock(
-                            first=lambda: fake_user
-                        )
-                    )
-                )
-            ]
-        )
+    with mock_session_local(fake_user):
         response = client.get(
             "/user", headers={"Authorization": f"Bearer {valid_token}"}
         )
@@ -116,16 +138,7 @@ def test_get_current_user_missing_user_id(client, valid_token):
 
 
 def test_get_current_user_user_not_found(client, valid_token):
-    with patch("app.database.get_db_session") as mock_db:
-        mock_db.return_value = iter(
-            [
-                MagicMock(
-                    query=lambda model: MagicMock(
-                        filter=lambda *a, **k: MagicMock(first=lambda: None)
-                    )
-                )
-            ]
-        )
+    with mock_session_local(None):
         response = client.get(
             "/user", headers={"Authorization": f"Bearer {valid_token}"}
         )
@@ -134,18 +147,7 @@ def test_get_current_user_user_not_found(client, valid_token):
 
 
 def test_get_current_admin_user_success(client, admin_token, fake_admin):
-    with patch("app.database.get_db_session") as mock_db:
-        mock_db.return_value = iter(
-            [
-                MagicMock(
-                    query=lambda model: MagicMock(
-                        filter=lambda *a, **k: MagicMock(
-                            first=lambda: fake_admin
-                        )
-                    )
-                )
-            ]
-        )
+    with mock_session_local(fake_admin):
         response = client.get(
             "/admin", headers={"Authorization": f"Bearer {admin_token}"}
         )
@@ -154,20 +156,114 @@ def test_get_current_admin_user_success(client, admin_token, fake_admin):
 
 
 def test_get_current_admin_user_forbidden(client, valid_token, fake_user):
-    with patch("app.database.get_db_session") as mock_db:
-        mock_db.return_value = iter(
-            [
-                MagicMock(
-                    query=lambda model: MagicMock(
-                        filter=lambda *a, **k: MagicMock(
-                            first=lambda: fake_user
-                        )
-                    )
-                )
-            ]
-        )
+    with mock_session_local(fake_user):
         response = client.get(
             "/admin", headers={"Authorization": f"Bearer {valid_token}"}
         )
         assert response.status_code == 403
         assert response.json()["detail"] == "Admin access required"
+
+
+def test_get_current_user_rejects_tokens_without_role_claim(client, fake_user):
+    # e.g. a refresh token
+    payload = {"sub": fake_user.email, "user_id": str(fake_user.user_id)}
+    token = jwt.encode(
+        payload,
+        auth_dependencies.config.JWT_SECRET_KEY,
+        algorithm=auth_dependencies.config.ALGORITHM,
+    )
+    with patch.object(auth_dependencies, "SessionLocal") as mock_session:
+        response = client.get(
+            "/user", headers={"Authorization": f"Bearer {token}"}
+        )
+    assert response.status_code == 401
+    mock_session.assert_not_called()
+
+
+def test_get_current_user_role_comes_from_the_db(
+    client, admin_token, fake_admin
+):
+    # Demoted after the token was issued
+    fake_admin.user_type = UserTypeEnum.trader
+    with mock_session_local(fake_admin):
+        response = client.get(
+            "/admin", headers={"Authorization": f"Bearer {admin_token}"}
+        )
+    assert response.status_code == 403
+
+
+def test_get_current_user_invalid_user_type_claim(client, fake_user):
+    payload = {"user_id": str(fake_user.user_id), "user_type": "root"}
+    token = jwt.encode(
+        payload,
+        auth_dependencies.config.JWT_SECRET_KEY,
+        algorithm=auth_dependencies.config.ALGORITHM,
+    )
+    response = client.get(
+        "/user", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 401
+
+
+def test_get_current_user_lookup_is_cached(client, valid_token, fake_user):
+    headers = {"Authorization": f"Bearer {valid_token}"}
+    with mock_session_local(fake_user) as mock_session:
+        assert client.get("/user", headers=headers).status_code == 200
+        assert client.get("/user", headers=headers).status_code == 200
+
+    assert mock_session.call_count == 1
+    # The session is used as a context manager, so it is always closed
+    mock_session.return_value.__exit__.assert_called_once()
+
+
+def test_invalidate_cached_user(client, valid_token, fake_user):
+    headers = {"Authorization": f"Bearer {valid_token}"}
+    with mock_session_local(fake_user):
+        client.get("/user", headers=headers)
+    auth_dependencies.invalidate_cached_user(fake_user.user_id)
+
+    with mock_session_local(None):
+        response = client.get("/user", headers=headers)
+    assert response.status_code == 404
+
+
+def test_get_current_user_shares_verified_token_cache(client, fake_admin):
+    payload = {
+        "user_id": str(fake_admin.user_id),
+        "user_type": "admin",
+        "exp": int(time.time()) + 60,
+    }
+    token = jwt.encode(
+        payload,
+        auth_dependencies.config.JWT_SECRET_KEY,
+        algorithm=auth_dependencies.config.ALGORITHM,
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    with mock_session_local(fake_admin):
+        assert client.get("/user", headers=headers).status_code == 200
+
+        with patch("app.util.auth_util.jwt.decode") as mock_decode:
+            assert client.get("/user", headers=headers).status_code == 200
+            assert decode_access_token(token)["user_id"] == payload["user_id"]
+    mock_decode.assert_not_called()
+
+
+def test_user_changes_invalidate_the_cache():
+    engine = create_engine("sqlite://")
+    UserModel.__table__.create(engine)
+    with Session(engine) as db:
+        user = UserModel(
+            email="user@example.com",
+            password="hashed",
+            name="user",
+            user_type=UserTypeEnum.admin,
+        )
+        db.add(user)
+        db.commit()
+        user_id = str(user.user_id)
+        auth_dependencies.user_cache.set(user_id, "cached")
+
+        user.user_type = UserTypeEnum.trader
+        db.commit()
+
+    assert auth_dependencies.user_cache.get(user_id) is None
@@ -9,6 +9,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app.api.routers.auth_routers import router as auth_router
 from app.database.enums.user_enums import UserTypeEnum
+from app.util.auth_util import PasswordHasherBusyError
 from app.schemas.auth_schemas import (
     UserSignupResponseSchema,
     UserLoginResponseSchema,
@@ -116,3 +117,20 @@ class TestAuthRouters:
 
         # Assert
         assert response.status_code == 401
+
+    @patch("app.api.routers.auth_routers.AuthService.login")
+    @patch("app.api.routers.auth_routers.get_db_session")
+    def test_login_password_hasher_busy(self, mock_db, mock_login):
+        # Arrange
+        mock_db.return_value = Mock()
+        mock_login.side_effect = PasswordHasherBusyError("busy")
+
+        # Act
+        response = client.post(
+            "/login",
+            json={"email": "test@example.com", "password": "password123"},
+        )
+
+        # Assert
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
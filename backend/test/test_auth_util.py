@@ -1,11 +1,22 @@
+import asyncio
+import threading
+import time
+
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from app.database.models import UserModel
 from app.util import auth_util
 from jwt.exceptions import InvalidTokenError
 
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    auth_util.verified_token_cache.clear()
+    yield
+    auth_util.verified_token_cache.clear()
+
+
 @pytest.fixture
 def sample_user():
     user = MagicMock(spec=UserModel)
@@ -71,6 +82,33 @@ def test_decode_access_token_invalid(monkeypatch):
         auth_util.decode_access_token("token")
 
 
+def test_decode_access_token_verifies_once_until_exp(monkeypatch):
+    payload = {"sub": "test", "exp": time.time() + 60}
+    decode = MagicMock(return_value=payload)
+    monkeypatch.setattr(auth_util.jwt, "decode", decode)
+
+    assert auth_util.decode_access_token("token") == payload
+    assert auth_util.decode_access_token("token") == payload
+    assert decode.call_count == 1
+
+    # Past the token's exp the cached entry is gone and the token is
+    # verified (and rejected) again
+    later = time.monotonic() + 61
+    with patch("app.util.cache_util.time.monotonic", return_value=later):
+        auth_util.decode_access_token("token")
+    assert decode.call_count == 2
+
+
+def test_decode_access_token_does_not_cache_failures(monkeypatch):
+    decode = MagicMock(side_effect=InvalidTokenError())
+    monkeypatch.setattr(auth_util.jwt, "decode", decode)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            auth_util.decode_access_token("token")
+    assert decode.call_count == 2
+    assert len(auth_util.verified_token_cache) == 0
+
+
 @pytest.mark.asyncio
 async def test_create_auth_token_returns_tokens(sample_user, monkeypatch):
     monkeypatch.setattr(
@@ -81,3 +119,29 @@ async def test_create_auth_token_returns_tokens(sample_user, monkeypatch):
     tokens = await auth_util.create_auth_token(sample_user)
     assert "access_token" in tokens and "refresh_token" in tokens
     assert tokens["access_token"].startswith("token-")
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_runs_off_event_loop():
+    hasher = auth_util.PasswordHasher(max_workers=1, max_queue=1)
+    thread_name = await hasher.run(lambda: threading.current_thread().name)
+    assert thread_name.startswith("password-hash")
+    assert hasher.metrics()["completed"] == 1
+    assert hasher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_queue_full():
+    hasher = auth_util.PasswordHasher(max_workers=1, max_queue=1)
+    release = threading.Event()
+    running = [asyncio.create_task(hasher.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    assert hasher.queue_depth == 1
+
+    with pytest.raises(auth_util.PasswordHasherBusyError):
+        await hasher.run(release.wait)
+    assert hasher.rejected == 1
+
+    release.set()
+    await asyncio.gather(*running)
+    assert hasher.metrics()["in_flight"] == 0
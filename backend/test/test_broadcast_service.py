@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock
+
+from app.api.services.broadcast_service import EventBroadcaster
+
+
+@pytest.fixture
+def broadcaster():
+    return EventBroadcaster(max_queue_size=2)
+
+
+@pytest.mark.asyncio
+async def test_publish_returns_before_send_runs(broadcaster):
+    send = AsyncMock()
+    broadcaster.publish(send, "user1", {"event": "test"})
+    send.assert_not_awaited()
+    assert broadcaster.queue_depth == 1
+
+    await broadcaster.stop()
+    send.assert_awaited_once_with("user1", {"event": "test"})
+    assert broadcaster.published_events == 1
+
+
+@pytest.mark.asyncio
+async def test_events_are_sent_in_order(broadcaster):
+    received = []
+
+    async def send(value):
+        received.append(value)
+
+    broadcaster.publish(send, 1)
+    broadcaster.publish(send, 2)
+    await broadcaster.stop()
+    assert received == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_publish_drops_when_queue_full(broadcaster):
+    send = AsyncMock()
+    for i in range(3):
+        broadcaster.publish(send, i)
+    assert broadcaster.dropped_events == 1
+    await broadcaster.stop()
+    assert send.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failing_send_does_not_stop_fan_out(broadcaster):
+    failing = AsyncMock(side_effect=Exception("fail"))
+    send = AsyncMock()
+    broadcaster.publish(failing)
+    broadcaster.publish(send)
+    await broadcaster.stop()
+    send.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_start_is_idempotent(broadcaster):
+    broadcaster.start()
+    task = broadcaster._task
+    broadcaster.start()
+    assert broadcaster._task is task
+    await asyncio.sleep(0)
+    await broadcaster.stop()
+    assert broadcaster._task is None
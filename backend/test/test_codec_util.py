@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+import msgpack
+import pytest
+
+from app.util import codec_util
+
+
+def test_negotiate_encoding_defaults_to_json():
+    assert codec_util.negotiate_encoding(None) == "json"
+    assert codec_util.negotiate_encoding("xml") == "json"
+
+
+def test_negotiate_encoding_msgpack():
+    assert codec_util.negotiate_encoding("MsgPack") == "msgpack"
+
+
+def test_serialize_default_types():
+    now = datetime.utcnow()
+    uid = uuid4()
+    assert codec_util.serialize_default(Decimal("1.5")) == 1.5
+    assert codec_util.serialize_default(now) == now.isoformat()
+    assert codec_util.serialize_default(uid) == str(uid)
+    with pytest.raises(TypeError):
+        codec_util.serialize_default(object())
+
+
+def test_compact_levels_nested_book():
+    message = {
+        "type": "order_book_update",
+        "data": {
+            "bids": [{"price": 100.0, "total_qty": 2.0}],
+            "asks": [{"price": 101.0, "total_qty": 1.5}],
+            "last_trade_price": 100.5,
+        },
+    }
+    compacted = codec_util.compact_levels(message)
+    assert compacted["data"]["bids"] == [[100.0, 2.0]]
+    assert compacted["data"]["asks"] == [[101.0, 1.5]]
+    # Original message is left untouched
+    assert message["data"]["bids"][0]["price"] == 100.0
+
+
+def test_encode_message_json_is_text():
+    payload = codec_util.encode_message({"price": Decimal("1.5")}, "json")
+    assert isinstance(payload, str)
+    assert json.loads(payload) == {"price": 1.5}
+
+
+def test_encode_message_msgpack_round_trip():
+    uid = uuid4()
+    message = {
+        "event": "book",
+        "order_id": uid,
+        "data": {"bids": [{"price": 100.0, "total_qty": 2.0}], "asks": []},
+    }
+    payload = codec_util.encode_message(message, "msgpack")
+    assert isinstance(payload, bytes)
+    decoded = msgpack.unpackb(payload)
+    assert decoded["order_id"] == str(uid)
+    assert decoded["data"]["bids"] == [[100.0, 2.0]]
+    assert len(payload) < len(codec_util.encode_message(message, "json"))
@@ -0,0 +1,145 @@
+import random
+
+import pytest
+
+from app.util.depth_util import DepthLadder
+
+
+@pytest.fixture
+def asks():
+    ladder = DepthLadder(best_is_highest=False)
+    ladder.add(101.0, 2.0)
+    ladder.add(100.0, 1.0)
+    ladder.add(102.0, 5.0)
+    return ladder
+
+
+def test_quote_walks_levels_from_best(asks):
+    quote = asks.quote(2.5)
+
+    assert quote.fully_available
+    assert quote.best_price == 100.0
+    assert quote.worst_price == 101.0
+    assert quote.notional == pytest.approx(100.0 + 1.5 * 101.0)
+    assert quote.average_price == pytest.approx(251.5 / 2.5)
+    assert quote.slippage == pytest.approx(251.5 / 2.5 - 100.0)
+
+
+def test_quote_of_exact_levels(asks):
+    quote = asks.quote(3.0)
+
+    assert quote.worst_price == 101.0
+    assert quote.notional == pytest.approx(302.0)
+
+
+def test_quote_beyond_depth_is_partial(asks):
+    quote = asks.quote(10.0)
+
+    assert not quote.fully_available
+    assert quote.filled_quantity == 8.0
+    assert quote.worst_price == 102.0
+    assert quote.notional == pytest.approx(100.0 + 202.0 + 510.0)
+
+
+def test_bids_are_best_highest():
+    bids = DepthLadder(best_is_highest=True)
+    bids.add(99.0, 1.0)
+    bids.add(98.0, 1.0)
+
+    quote = bids.quote(1.5)
+
+    assert quote.best_price == 99.0
+    assert quote.worst_price == 98.0
+    assert quote.notional == pytest.approx(99.0 + 0.5 * 98.0)
+
+
+def test_empty_side():
+    quote = DepthLadder(best_is_highest=False).quote(1.0)
+
+    assert quote.filled_quantity == 0.0
+    assert quote.average_price is None
+    assert quote.slippage is None
+
+
+def test_changes_update_the_totals(asks):
+    assert asks.quote(1.0).worst_price == 100.0
+
+    asks.reduce(100.0, 0.5)
+    assert asks.quote(1.0).worst_price == 101.0
+
+    # The last order of a level takes the level with it
+    asks.remove(100.0, 0.5)
+    assert len(asks) == 2
+    assert asks.quote(1.0).best_price == 101.0
+
+    asks.add(99.0, 1.0)
+    asks.add(99.0, 1.0)
+    asks.remove(99.0, 1.0)
+    assert len(asks) == 3
+    assert asks.quote(1.0).notional == pytest.approx(99.0)
+
+    asks.clear()
+    assert asks.quote(1.0).filled_quantity == 0.0
+
+
+def test_quote_down_to_limit_price(asks):
+    quote = asks.quote(4.0, limit_price=101.0)
+
+    assert not quote.fully_available
+    assert quote.filled_quantity == 3.0
+    assert quote.worst_price == 101.0
+    assert quote.best_price == 100.0
+
+    assert asks.quote(2.0, limit_price=101.5).fully_available
+    assert asks.quote(1.0, limit_price=99.0).filled_quantity == 0.0
+
+
+def test_top_levels_best_first(asks):
+    assert asks.top(2) == [(100.0, 1.0), (101.0, 2.0)]
+    assert asks.top(10) == [(100.0, 1.0), (101.0, 2.0), (102.0, 5.0)]
+
+    bids = DepthLadder(best_is_highest=True)
+    bids.add(98.0, 1.0)
+    bids.add(99.0, 2.0)
+    assert bids.top(1) == [(99.0, 2.0)]
+
+
+def test_quote_of_decimal_fraction_quantities():
+    asks = DepthLadder(best_is_highest=False)
+    asks.add(100.0, 0.1)
+    asks.add(101.0, 0.2)
+    asks.add(102.0, 0.7)
+
+    within_limit = asks.quote(0.3, limit_price=101.0)
+    assert within_limit.fully_available
+    assert within_limit.worst_price == 101.0
+    assert within_limit.average_price == pytest.approx(30.2 / 0.3)
+
+    assert asks.quote(1.0).fully_available
+    assert not asks.quote(0.3 + 1e-6, limit_price=101.0).fully_available
+
+
+def test_quote_matches_a_level_walk():
+    rng = random.Random(7)
+    for _ in range(2000):
+        asks = DepthLadder(best_is_highest=False)
+        levels = {}
+        for _ in range(rng.randint(1, 20)):
+            price = float(rng.randint(90, 110))
+            tenths = rng.randint(1, 50)
+            asks.add(price, tenths / 10)
+            levels[price] = levels.get(price, 0) + tenths
+        prices = sorted(levels)
+        limit = rng.choice(prices)
+        within = prices[: prices.index(limit) + 1]
+        # Exactly the quantity of the best levels, in tenths
+        walked = within[: rng.randint(1, len(within))]
+        tenths = sum(levels[price] for price in walked)
+
+        quote = asks.quote(tenths / 10, limit_price=limit)
+
+        assert quote.fully_available
+        assert quote.worst_price == walked[-1]
+        assert quote.average_price == pytest.approx(
+            sum(levels[price] * price for price in walked) / tenths
+        )
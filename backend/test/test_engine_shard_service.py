@@ -0,0 +1,283 @@
+import pickle
+import pytest
+import threading
+from uuid import uuid4
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from app.api.services.engine_shard_service import (
+    EngineShard,
+    EngineShardPool,
+    InstrumentMovedError,
+    order_state,
+)
+from app.api.services.market_data_service import (
+    MarketDataPublisher,
+    MarketDataReader,
+)
+from app.database.enums.oder_enums import Side, OrderType, OrderStatus
+from app.database.models.order_models import Order
+
+SYMBOL = "BTC-USD"
+
+
+@pytest.fixture(autouse=True)
+def shm_prefix():
+    """Publish the books of each test to its own shared memory"""
+    with patch(
+        "app.api.services.market_data_service.config."
+        "MARKET_DATA_SHM_PREFIX",
+        f"test-md-{uuid4().hex[:8]}",
+    ):
+        yield
+        MarketDataPublisher(SYMBOL).unlink()
+
+
+def make_order(side, price, quantity, created_at=None):
+    return Order(
+        order_id=str(uuid4()),
+        user_id=uuid4(),
+        symbol=SYMBOL,
+        side=side,
+        price=price,
+        quantity=quantity,
+        remaining=quantity,
+        order_type=OrderType.LIMIT,
+        status=OrderStatus.OPEN,
+        active=True,
+        created_at=created_at or datetime.utcnow(),
+        client_order_id=None,
+    )
+
+
+@pytest.fixture
+def pool():
+    """Pool of two in-process shards, BTC-USD on the one the ring picks"""
+    pool = EngineShardPool(shard_count=2, socket_dir="/nonexistent")
+    shards = [EngineShard(0), EngineShard(1)]
+    shards[pool.ring.shard_for(SYMBOL)].registry.register(SYMBOL)
+    pool._request = lambda shard, request: shards[shard].handle(request)
+    pool.shards = shards
+    return pool
+
+
+def test_shard_add_order_returns_trades_and_order_state():
+    shard = EngineShard(0)
+    shard.registry.register(SYMBOL)
+    sell = make_order(Side.SELL, 100.0, 1.0)
+    buy = make_order(Side.BUY, 100.0, 0.4)
+
+    status, (trades, state, _) = shard.handle(
+        ("add_order", SYMBOL, (order_state(sell),))
+    )
+    assert status == "ok" and trades == []
+    status, (trades, state, _) = shard.handle(
+        ("add_order", SYMBOL, (order_state(buy),))
+    )
+    assert len(trades) == 1
+    assert state["status"] == OrderStatus.FILLED
+    resting = shard.registry.get(SYMBOL).get_order(sell.order_id)
+    assert resting.remaining == pytest.approx(0.6)
+
+
+def test_shard_reports_errors_and_unknown_instruments():
+    shard = EngineShard(0)
+    shard.registry.register(SYMBOL)
+    status, error = shard.handle(("no_such_method", SYMBOL, ()))
+    assert status == "error" and isinstance(error, ValueError)
+    assert shard.handle(("get_best_bid", "ETH-USD", ())) == ("moved", None)
+
+
+def test_export_and_import_keep_time_priority():
+    source, target = EngineShard(0), EngineShard(1)
+    source.registry.register(SYMBOL)
+    now = datetime.utcnow()
+    first = make_order(Side.SELL, 100.0, 1.0, created_at=now)
+    second = make_order(Side.SELL, 100.0, 1.0, created_at=now + timedelta(1))
+    for order in (first, second):
+        source.handle(("add_order", SYMBOL, (order_state(order),)))
+    source.handle(("set_last_trade_price", SYMBOL, (99.0,)))
+
+    _, book = source.handle(("export_book", SYMBOL, (1,)))
+    assert source.handle(("get_best_ask", SYMBOL, ())) == ("moved", 1)
+    assert target.handle(("import_book", SYMBOL, (book,)))[0] == "ok"
+
+    engine = target.registry.get(SYMBOL)
+    assert engine.get_last_trade_price() == 99.0
+    trades = engine.add_order(make_order(Side.BUY, 100.0, 1.0))
+    assert trades[0].sell_order_id == first.order_id
+
+
+def test_pool_move_redirects_stale_rings(pool):
+    source = pool.ring.shard_for(SYMBOL)
+    target = 1 - source
+    pool.call(SYMBOL, "set_last_trade_price", 123.0)
+
+    assert pool.move(SYMBOL, target) == source
+    assert pool.ring.shard_for(SYMBOL) == target
+    assert SYMBOL in pool.shards[target].registry.symbols()
+
+    # Another worker still routes to the old shard and is redirected
+    stale = EngineShardPool(shard_count=2, socket_dir="/nonexistent")
+    stale._request = pool._request
+    assert stale.call(SYMBOL, "get_last_trade_price") == 123.0
+    assert stale.redirects == 1
+    assert stale.ring.shard_for(SYMBOL) == target
+
+
+def test_pool_move_to_unknown_shard(pool):
+    with pytest.raises(ValueError):
+        pool.move(SYMBOL, 5)
+
+
+def test_pool_call_unknown_instrument(pool):
+    with pytest.raises(InstrumentMovedError):
+        pool.call("ETH-USD", "get_best_bid")
+
+
+def test_sharded_engine_applies_state_and_fires_callback(pool):
+    engine = pool.engine(SYMBOL)
+    callback = MagicMock()
+    engine.set_price_change_callback(callback)
+    sell = make_order(Side.SELL, 100.0, 2.0)
+    buy = make_order(Side.BUY, 100.0, 1.0)
+
+    assert engine.add_order(sell) == []
+    trades = engine.add_order(buy)
+
+    assert len(trades) == 1
+    assert buy.status == OrderStatus.FILLED and buy.remaining == 0
+    callback.assert_called_once_with(100.0)
+
+    resting = engine.get_user_order(str(sell.user_id), sell.order_id)
+    assert resting.remaining == 1.0
+    assert engine.amend_order(sell.order_id, quantity=1.5) == []
+    assert resting.remaining == 0.5 and resting.quantity == 1.5
+
+
+async def test_pool_runs_engine_work_off_the_event_loop(pool):
+    engine = pool.engine(SYMBOL)
+    calls = []
+    engine.set_price_change_callback(
+        lambda price: calls.append((price, threading.get_ident()))
+    )
+    engine.add_order(make_order(Side.SELL, 100.0, 2.0))
+
+    def trade():
+        engine.add_order(make_order(Side.BUY, 100.0, 1.0))
+        # Price callbacks wait for the work to return to the loop
+        assert calls == []
+        return threading.get_ident()
+
+    def fail():
+        engine.add_order(make_order(Side.BUY, 100.0, 1.0))
+        raise ValueError("rejected")
+
+    assert await pool.run(trade) != threading.get_ident()
+    with pytest.raises(ValueError):
+        await pool.run(fail)
+
+    loop_thread = threading.get_ident()
+    assert calls == [(100.0, loop_thread), (100.0, loop_thread)]
+
+
+def test_shard_publishes_book_changes():
+    shard = EngineShard(0)
+    shard.registry.register(SYMBOL)
+    reader = MarketDataReader()
+    sell = make_order(Side.SELL, 101.0, 2.0)
+    shard.handle(("add_order", SYMBOL, (order_state(sell),)))
+    first = reader.read(SYMBOL)
+    # Reads do not publish
+    shard.handle(("get_best_ask", SYMBOL, ()))
+    shard.handle(("cancel_order", SYMBOL, (sell.order_id,)))
+    second = reader.read(SYMBOL)
+    reader.close()
+
+    assert first["best_ask"] == 101.0
+    assert first["asks"] == [{"price": 101.0, "total_qty": 2.0}]
+    assert second["sequence"] == first["sequence"] + 1
+    assert second["asks"] == []
+
+
+def test_shard_publishes_only_top_changes():
+    shard = EngineShard(0)
+    engine = shard.registry.register(SYMBOL)
+    reader = MarketDataReader()
+    shard.handle(
+        ("add_order", SYMBOL, (order_state(make_order(Side.SELL, 101.0, 1)),))
+    )
+    # Publishing reads the depth ladders, never the full book
+    engine.get_order_book_snapshot = MagicMock(side_effect=AssertionError)
+    first = reader.read(SYMBOL)
+
+    deep = [make_order(Side.SELL, 200.0 + i, 1.0) for i in range(10)]
+    for order in deep:
+        shard.handle(("add_order", SYMBOL, (order_state(order),)))
+    after_deep = reader.read(SYMBOL)
+    # The 11th ask level is below the published depth
+    shard.handle(("cancel_order", SYMBOL, (deep[-1].order_id,)))
+    shard.handle(("set_last_trade_price", SYMBOL, (100.0,)))
+    unchanged = reader.read(SYMBOL)
+    shard.handle(("set_last_trade_price", SYMBOL, (100.5,)))
+    last = reader.read(SYMBOL)
+    reader.close()
+
+    assert after_deep["sequence"] == first["sequence"] + 9
+    assert unchanged["sequence"] == after_deep["sequence"]
+    assert last["sequence"] == unchanged["sequence"] + 1
+    assert last["last_trade_price"] == 100.5
+    assert [level["price"] for level in last["asks"]] == [101.0] + [
+        200.0 + i for i in range(9)
+    ]
+
+
+def test_sharded_engine_quotes_from_the_engine_process(pool):
+    engine = pool.engine(SYMBOL)
+    engine.add_order(make_order(Side.SELL, 101.0, 2.0))
+    engine.add_order(make_order(Side.SELL, 102.0, 2.0))
+    # Requests and replies are pickled over the socket
+    handle = pool._request
+    pool._request = lambda shard, request: pickle.loads(
+        pickle.dumps(handle(shard, pickle.loads(pickle.dumps(request))))
+    )
+
+    quote = engine.quote(Side.BUY, 3.0)
+
+    assert quote.fully_available
+    assert quote.notional == pytest.approx(2 * 101.0 + 102.0)
+    assert quote.worst_price == 102.0
+
+
+def test_sharded_engine_reports_triggered_stops(pool):
+    engine = pool.engine(SYMBOL)
+    stop = make_order(Side.BUY, None, 1.0)
+    stop.order_type = OrderType.STOP
+    stop.stop_price = 100.5
+    engine.add_order(make_order(Side.SELL, 101.0, 2.0))
+    engine.add_order(stop)
+    assert engine.pop_triggered_orders() == []
+
+    engine.add_order(make_order(Side.BUY, 101.0, 1.0))
+
+    (triggered,) = engine.pop_triggered_orders()
+    assert triggered.order_id == stop.order_id
+    assert triggered.order_type == OrderType.MARKET
+    assert triggered.status == OrderStatus.FILLED
+    assert engine.pop_triggered_orders() == []
+
+
+def test_sharded_engine_reads_market_data_without_ipc(pool):
+    engine = pool.engine(SYMBOL)
+    engine.add_order(make_order(Side.SELL, 101.0, 2.0))
+    engine.set_last_trade_price(100.5)
+    pool._request = MagicMock(side_effect=AssertionError("IPC"))
+
+    assert engine.get_best_ask() == 101.0
+    assert engine.get_best_bid() is None
+    assert engine.get_last_trade_price() == 100.5
+    assert engine.get_book_update() == {
+        "bids": [],
+        "asks": [{"price": 101.0, "total_qty": 2.0}],
+        "last_trade_price": 100.5,
+    }
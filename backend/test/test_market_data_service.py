@@ -0,0 +1,75 @@
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from app.api.services.market_data_service import (
+    MarketDataPublisher,
+    MarketDataReader,
+)
+
+
+@pytest.fixture(autouse=True)
+def shm_prefix():
+    with patch(
+        "app.api.services.market_data_service.config."
+        "MARKET_DATA_SHM_PREFIX",
+        f"test-md-{uuid.uuid4().hex[:8]}",
+    ):
+        yield
+
+
+def book_update(bids, asks, last_trade_price=100.0):
+    return {
+        "bids": [{"price": p, "total_qty": q} for p, q in bids],
+        "asks": [{"price": p, "total_qty": q} for p, q in asks],
+        "last_trade_price": last_trade_price,
+    }
+
+
+def test_publish_and_read():
+    publisher = MarketDataPublisher("BTC-USD", depth=2)
+    reader = MarketDataReader()
+    try:
+        publisher.publish(
+            book_update([(101.0, 1.0), (100.0, 2.0), (99.0, 3.0)], [])
+        )
+        market_data = reader.read("BTC-USD")
+    finally:
+        reader.close()
+        publisher.unlink()
+
+    assert market_data["sequence"] == 1
+    assert market_data["best_bid"] == 101.0
+    assert market_data["best_ask"] is None
+    assert market_data["last_trade_price"] == 100.0
+    # Only depth levels are published
+    assert market_data["bids"] == [
+        {"price": 101.0, "total_qty": 1.0},
+        {"price": 100.0, "total_qty": 2.0},
+    ]
+    assert market_data["asks"] == []
+
+
+def test_sequence_continues_with_the_next_owner():
+    publisher = MarketDataPublisher("BTC-USD")
+    publisher.publish(book_update([], [(102.0, 1.0)]))
+    publisher.close()
+
+    successor = MarketDataPublisher("BTC-USD")
+    reader = MarketDataReader()
+    try:
+        successor.publish(book_update([], [(103.0, 1.0)]))
+        market_data = reader.read("BTC-USD")
+    finally:
+        reader.close()
+        successor.unlink()
+
+    assert market_data["sequence"] == 2
+    assert market_data["best_ask"] == 103.0
+
+
+def test_read_unpublished_symbol():
+    reader = MarketDataReader()
+    assert reader.read("ETH-USD") is None
+    assert reader.metrics() == {"reads": 0, "misses": 1, "retries": 0}
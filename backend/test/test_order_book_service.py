@@ -1,7 +1,10 @@
 import asyncio
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from unittest.mock import MagicMock, AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.exc import IntegrityError
 
 import pytest
 
@@ -9,9 +12,16 @@ from app.api.services.order_book_service import (
     OrderBookService,
     PlaceOrderResponse,
 )
-from app.database.enums.oder_enums import Side, OrderType, OrderStatus
+from app.database.enums.oder_enums import (
+    Side,
+    OrderType,
+    OrderStatus,
+    TimeInForce,
+)
+from app.database.models.order_models import Order
 from app.schemas.order_schemas import PlaceOrderRequest, OrderResponse
 from app.schemas.trade_scehmas import TradeResponse
+from app.util.depth_util import Quote
 
 
 class DummyOrder:
@@ -35,6 +45,10 @@ class DummyOrder:
         self.user_id = str(uuid.uuid4())
         self.order_type = OrderType.LIMIT
         self.quantity = 10.0
+        self.client_order_id = None
+        self.time_in_force = TimeInForce.GTC
+        self.stop_price = None
+        self.symbol = "BTC-USD"
 
 
 class DummyTrade:
@@ -70,70 +84,96 @@ def db_session():
     return MagicMock()
 
 
+@contextmanager
+def patch_engine():
+    """Patch the registry to return a mock engine for any symbol"""
+    with patch(
+        "app.api.services.order_book_service.engine_registry"
+    ) as mock_registry:
+        yield mock_registry.get.return_value
+
+
 @pytest.fixture
 def order_book_service(db_session):
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.set_price_change_callback = MagicMock()
         mock_engine.set_last_trade_price = MagicMock()
         service = OrderBookService(db_session)
         return service
 
 
-def test_initialization_with_price_history(db_session):
-    """Test initialization when price history exists"""
+def test_initialization_keeps_the_engine_price(db_session):
+    """The live last trade price is the engine's, not reloaded per request"""
+    with patch_engine() as mock_engine:
+        mock_engine.set_price_change_callback = MagicMock()
+        mock_engine.set_last_trade_price = MagicMock()
+
+        OrderBookService(db_session)
+
+        mock_engine.set_last_trade_price.assert_not_called()
+
+
+def test_restore_with_price_history(db_session):
+    """Test restoring the price when price history exists"""
     # Mock price history query
     mock_price = MagicMock()
     mock_price.price = 150.0
-    db_session.query.return_value.order_by.return_value.first.return_value = (
-        mock_price
+    first = (
+        db_session
+        .query.return_value
+        .filter.return_value
+        .order_by.return_value
+        .first
     )
+    first.return_value = mock_price
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.set_price_change_callback = MagicMock()
         mock_engine.set_last_trade_price = MagicMock()
 
-        OrderBookService(db_session)
+        OrderBookService(db_session)._restore_order_book_from_db()
 
         mock_engine.set_last_trade_price.assert_called_with(150.0)
 
 
-def test_initialization_with_no_price_history_but_trades(db_session):
-    """Test initialization when no price history but trades exist"""
+def test_restore_with_no_price_history_but_trades(db_session):
+    """Test restoring the price when no price history but trades exist"""
     # Mock no price history but trade exists
-    db_session.query.return_value.order_by.return_value.first.side_effect = [
-        None,
-        DummyTrade(),
-    ]
+    first = (
+        db_session
+        .query.return_value
+        .filter.return_value
+        .order_by.return_value
+        .first
+    )
+    first.side_effect = [None, DummyTrade()]
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.set_price_change_callback = MagicMock()
         mock_engine.set_last_trade_price = MagicMock()
 
-        OrderBookService(db_session)
+        OrderBookService(db_session)._restore_order_book_from_db()
 
         mock_engine.set_last_trade_price.assert_called_with(100.0)
 
 
-def test_initialization_with_no_data(db_session):
-    """Test initialization when no price history or trades exist"""
+def test_restore_with_no_data(db_session):
+    """Test restoring the price when no price history or trades exist"""
     # Mock no data
-    db_session.query.return_value.order_by.return_value.first.return_value = (
-        None
+    first = (
+        db_session
+        .query.return_value
+        .filter.return_value
+        .order_by.return_value
+        .first
     )
+    first.return_value = None
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.set_price_change_callback = MagicMock()
         mock_engine.set_last_trade_price = MagicMock()
 
-        OrderBookService(db_session)
+        OrderBookService(db_session)._restore_order_book_from_db()
 
         mock_engine.set_last_trade_price.assert_called_with(100.0)
 
@@ -154,9 +194,7 @@ def test_restore_order_book_from_db(order_book_service, db_session):
     )
     query_result.return_value = mock_orders
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         order_book_service._restore_order_book_from_db()
         mock_engine.restore_from_database.assert_called_once_with(mock_orders)
 
@@ -170,10 +208,8 @@ async def test_place_market_buy_order_no_sellers(
         side=Side.BUY, order_type=OrderType.MARKET, quantity=10.0
     )
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
-        mock_engine.get_best_ask.return_value = None
+    with patch_engine() as mock_engine:
+        mock_engine.quote.return_value = Quote(10.0, 0.0, 0.0, None, None)
 
         # Mock database operations
         valid_uuid = str(uuid.uuid4())
@@ -204,10 +240,8 @@ async def test_place_market_sell_order_no_buyers(
         side=Side.SELL, order_type=OrderType.MARKET, quantity=10.0
     )
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
-        mock_engine.get_best_bid.return_value = None
+    with patch_engine() as mock_engine:
+        mock_engine.quote.return_value = Quote(10.0, 0.0, 0.0, None, None)
 
         # Mock database operations
         valid_uuid = str(uuid.uuid4())
@@ -252,11 +286,9 @@ async def test_place_order_with_trades(order_book_service, db_session):
     mock_trade.sell_user_id = trade_result.sell_user_id
     mock_trade.ts = trade_result.timestamp
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.add_order.return_value = [trade_result]
-        mock_engine.notify_trades_and_book_update = AsyncMock()
+        mock_engine.notify_trades_and_book_update = MagicMock()
 
         # Mock database operations
         valid_uuid = str(uuid.uuid4())
@@ -302,11 +334,9 @@ async def test_place_order_no_trades(order_book_service, db_session):
         side=Side.BUY, order_type=OrderType.LIMIT, price=100.0, quantity=10.0
     )
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.add_order.return_value = []
-        mock_engine._notify_book_update = AsyncMock()
+        mock_engine.notify_book_update = MagicMock()
 
         # Mock database operations
         valid_uuid = str(uuid.uuid4())
@@ -328,7 +358,277 @@ async def test_place_order_no_trades(order_book_service, db_session):
 
         assert result["order_executed"] is False
         assert len(result["trades"]) == 0
-        mock_engine._notify_book_update.assert_called_once()
+        mock_engine.notify_book_update.assert_called_once()
+        # The resting order is left to the book, out of the session
+        db_session.expunge.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_order_does_not_fail_the_batch(
+    order_book_service, db_session
+):
+    """Test an order whose row cannot be added never reaches the engine"""
+    order_request = PlaceOrderRequest(
+        side=Side.BUY, order_type=OrderType.LIMIT, price=100.0, quantity=1.0
+    )
+
+    def refresh_side_effect(order):
+        order.order_id = uuid.uuid4()
+        order.created_at = datetime.utcnow()
+
+    db_session.refresh = MagicMock(side_effect=refresh_side_effect)
+    db_session.flush = MagicMock(side_effect=[None, RuntimeError("db")])
+
+    with patch_engine() as mock_engine:
+        mock_engine.add_order.return_value = []
+
+        placed, failed = await order_book_service.place_orders(
+            "user-123", [order_request, order_request]
+        )
+
+    assert placed["order"].status == OrderStatus.OPEN
+    assert isinstance(failed, RuntimeError)
+    mock_engine.add_order.assert_called_once()
+    assert db_session.begin_nested.call_count == 2
+    db_session.commit.assert_called_once()
+
+    db_session.flush = MagicMock(side_effect=RuntimeError("db"))
+    with patch_engine():
+        with pytest.raises(RuntimeError):
+            await order_book_service.place_order("user-123", order_request)
+
+
+@pytest.mark.asyncio
+async def test_place_ioc_order_without_fill_leaves_book_alone(
+    order_book_service, db_session
+):
+    """Test an IOC order the engine cancelled sends no book update"""
+    order_request = PlaceOrderRequest(
+        side=Side.BUY,
+        order_type=OrderType.LIMIT,
+        price=100.0,
+        quantity=10.0,
+        time_in_force=TimeInForce.IOC,
+    )
+
+    def cancel_remainder(order):
+        order.status = OrderStatus.CANCELED
+        order.active = False
+        return []
+
+    with patch_engine() as mock_engine:
+        mock_engine.add_order.side_effect = cancel_remainder
+
+        def refresh_side_effect(order):
+            order.order_id = str(uuid.uuid4())
+            order.created_at = datetime.utcnow()
+
+        db_session.refresh = MagicMock(side_effect=refresh_side_effect)
+        db_session.flush = MagicMock()
+
+        result = await order_book_service.place_order(
+            "user-123", order_request
+        )
+
+        assert result["order"].status == OrderStatus.CANCELED
+        assert result["order"].time_in_force == TimeInForce.IOC
+        mock_engine.notify_book_update.assert_not_called()
+        mock_engine.notify_trades_and_book_update.assert_not_called()
+
+
+def test_cancelled_remainder_is_not_overwritten_by_trades(
+    order_book_service, db_session
+):
+    """Test trades of an IOC order do not reopen its cancelled row"""
+    trade_result = DummyTradeResult()
+    trade_result.buy_order_remaining = 5.0
+    trade_result.buy_order_status = OrderStatus.PARTIALLY_FILLED
+    maker = DummyOrder(100.0, 0, Side.SELL, trade_result.sell_order_id)
+    db_session.query.return_value.filter.return_value.all.return_value = [
+        maker
+    ]
+
+    order_book_service._update_traded_orders(
+        [trade_result], skip_order_ids=[trade_result.buy_order_id]
+    )
+
+    (filter_clause,) = db_session.query.return_value.filter.call_args[0]
+    assert filter_clause.right.value == [trade_result.sell_order_id]
+    assert maker.status == OrderStatus.FILLED and maker.active is False
+
+
+@pytest.mark.asyncio
+async def test_place_order_saves_triggered_stops(
+    order_book_service, db_session
+):
+    """Test stop orders an order triggers are saved, not as its trades"""
+    order_request = PlaceOrderRequest(
+        side=Side.BUY, order_type=OrderType.LIMIT, price=104.0, quantity=5.0
+    )
+    own_result, stop_result = DummyTradeResult(), DummyTradeResult()
+    stop = DummyOrder(
+        None,
+        0,
+        Side.BUY,
+        order_id=stop_result.buy_order_id,
+        status=OrderStatus.FILLED,
+        active=False,
+    )
+    stop.order_type = OrderType.MARKET
+
+    def add_order(order):
+        order.order_id = own_result.buy_order_id
+        order.created_at = datetime.utcnow()
+        return [own_result, stop_result]
+
+    with patch_engine() as mock_engine:
+        mock_engine.add_order.side_effect = add_order
+        mock_engine.pop_triggered_orders.return_value = [stop]
+
+        with patch(
+            "app.api.services.order_book_service.Trade",
+            side_effect=lambda **kwargs: DummyTrade(),
+        ):
+            result = await order_book_service.place_order(
+                "user-123", order_request
+            )
+
+    assert len(result["trades"]) == 1
+    update = db_session.query.return_value.filter.return_value.update
+    (values,), _ = update.call_args
+    assert values[Order.order_type] == OrderType.MARKET
+    assert values[Order.status] == OrderStatus.FILLED
+    assert values[Order.active] is False
+
+
+@pytest.mark.asyncio
+async def test_place_orders_commits_and_notifies_once(
+    order_book_service, db_session
+):
+    """Test a batch is persisted in one commit with one notification"""
+    order_requests = [
+        PlaceOrderRequest(
+            side=Side.SELL,
+            order_type=OrderType.LIMIT,
+            price=100.0,
+            quantity=5.0,
+        ),
+        PlaceOrderRequest(
+            side=Side.BUY,
+            order_type=OrderType.LIMIT,
+            price=100.0,
+            quantity=5.0,
+        ),
+    ]
+    trade_result = DummyTradeResult()
+    maker = DummyOrder(
+        100.0, 5.0, Side.SELL, order_id=trade_result.sell_order_id
+    )
+
+    def refresh_side_effect(order):
+        order.order_id = uuid.uuid4()
+        order.created_at = datetime.utcnow()
+
+    db_session.refresh = MagicMock(side_effect=refresh_side_effect)
+    db_session.add = MagicMock()
+    db_session.commit = MagicMock()
+    db_session.flush = MagicMock()
+    db_session.query.return_value.filter.return_value.all.return_value = [
+        maker
+    ]
+
+    with patch_engine() as mock_engine:
+        mock_engine.add_order.side_effect = [[], [trade_result]]
+
+        with patch(
+            "app.api.services.order_book_service.Trade",
+            return_value=DummyTrade(),
+        ):
+            results = await order_book_service.place_orders(
+                "user-123", order_requests
+            )
+
+        db_session.commit.assert_called_once()
+        mock_engine.notify_trades_and_book_update.assert_called_once_with(
+            [trade_result]
+        )
+        mock_engine.notify_book_update.assert_not_called()
+
+    assert [r["order_executed"] for r in results] == [False, True]
+    assert maker.remaining == trade_result.sell_order_remaining
+    assert maker.status == trade_result.sell_order_status
+
+
+@pytest.mark.asyncio
+async def test_place_order_retry_returns_existing_order(
+    order_book_service, db_session
+):
+    """Test a known client_order_id returns the order without matching"""
+    order_request = PlaceOrderRequest(
+        side=Side.BUY,
+        order_type=OrderType.LIMIT,
+        price=100.0,
+        quantity=10.0,
+        client_order_id="c-1",
+    )
+    existing = DummyOrder(100.0, 10.0, Side.BUY)
+    existing.client_order_id = "c-1"
+    db_session.get.return_value = existing
+    (
+        db_session.query.return_value.filter.return_value
+        .order_by.return_value.all.return_value
+    ) = []
+
+    with patch_engine() as mock_engine:
+        mock_engine.lookup_client_order_id.return_value = existing.order_id
+
+        result = await order_book_service.place_order(
+            "user-123", order_request
+        )
+
+        mock_engine.add_order.assert_not_called()
+        mock_engine.notify_book_update.assert_not_called()
+        db_session.get.assert_called_once()
+
+    assert result["order"].id == uuid.UUID(existing.order_id)
+    assert result["order"].client_order_id == "c-1"
+
+
+@pytest.mark.asyncio
+async def test_place_order_duplicate_client_order_id_in_db(
+    order_book_service, db_session
+):
+    """Test the unique constraint catches ids missing from the index"""
+    order_request = PlaceOrderRequest(
+        side=Side.BUY,
+        order_type=OrderType.LIMIT,
+        price=100.0,
+        quantity=10.0,
+        client_order_id="c-1",
+    )
+    existing = DummyOrder(100.0, 10.0, Side.BUY)
+    db_session.flush = MagicMock(
+        side_effect=IntegrityError("insert", {}, Exception("duplicate"))
+    )
+    db_session.query.return_value.filter.return_value.first.return_value = (
+        existing
+    )
+    (
+        db_session.query.return_value.filter.return_value
+        .order_by.return_value.all.return_value
+    ) = []
+
+    with patch_engine() as mock_engine:
+        mock_engine.lookup_client_order_id.return_value = None
+
+        result = await order_book_service.place_order(
+            "user-123", order_request
+        )
+
+        mock_engine.add_order.assert_not_called()
+        mock_engine.register_client_order_id.assert_not_called()
+
+    assert result["order"].id == uuid.UUID(existing.order_id)
 
 
 def test_cancel_order_success(order_book_service, db_session):
@@ -338,9 +638,7 @@ def test_cancel_order_success(order_book_service, db_session):
         mock_order
     )
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.cancel_order.return_value = True
 
         result = order_book_service.cancel_order("user-123", "test-order")
@@ -349,6 +647,7 @@ def test_cancel_order_success(order_book_service, db_session):
         assert mock_order.active is False
         assert mock_order.status == OrderStatus.CANCELED
         db_session.commit.assert_called_once()
+        mock_engine.notify_book_update.assert_called_once()
 
 
 def test_cancel_order_not_found(order_book_service, db_session):
@@ -367,9 +666,7 @@ def test_cancel_order_engine_failure(order_book_service, db_session):
         mock_order
     )
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.cancel_order.return_value = False
 
         result = order_book_service.cancel_order("user-123", "test-order")
@@ -378,6 +675,90 @@ def test_cancel_order_engine_failure(order_book_service, db_session):
         db_session.commit.assert_not_called()
 
 
+def test_cancel_orders_skips_orders_of_other_users(
+    order_book_service, db_session
+):
+    """Test batch cancel only cancels the user's own live orders"""
+    own_order = DummyOrder(100.0, 5.0, Side.BUY)
+
+    with patch_engine() as mock_engine:
+        mock_engine.get_user_open_orders.return_value = [own_order]
+        mock_engine.cancel_orders.side_effect = lambda ids: ids
+
+        result = order_book_service.cancel_orders(
+            "user-123", [own_order.order_id, "someone-elses-order"]
+        )
+
+        assert result == [own_order.order_id]
+        mock_engine.cancel_orders.assert_called_once_with(
+            [own_order.order_id]
+        )
+        query_mock = db_session.query.return_value.filter.return_value
+        query_mock.update.assert_called_once()
+        db_session.commit.assert_called_once()
+        mock_engine.notify_book_update.assert_called_once()
+
+
+def test_cancel_all_orders(order_book_service, db_session):
+    """Test mass cancel uses the engine index and one update"""
+    with patch_engine() as mock_engine:
+        mock_engine.cancel_user_orders.return_value = ["a", "b"]
+
+        result = order_book_service.cancel_all_orders("user-123", Side.SELL)
+
+        assert result == ["a", "b"]
+        mock_engine.cancel_user_orders.assert_called_once_with(
+            "user-123", Side.SELL
+        )
+        db_session.commit.assert_called_once()
+        mock_engine.notify_book_update.assert_called_once()
+
+
+def test_cancel_all_orders_nothing_open(order_book_service, db_session):
+    """Test mass cancel without open orders does no DB work"""
+    with patch_engine() as mock_engine:
+        mock_engine.cancel_user_orders.return_value = []
+
+        assert order_book_service.cancel_all_orders("user-123") == []
+        db_session.commit.assert_not_called()
+        mock_engine.notify_book_update.assert_not_called()
+
+
+def test_amend_order_single_row_update(order_book_service, db_session):
+    """Test an amend without trades is one row update and one commit"""
+    order = DummyOrder(100.0, 4.0, Side.BUY)
+
+    with patch_engine() as mock_engine:
+        mock_engine.get_user_order.return_value = order
+        mock_engine.amend_order.return_value = []
+
+        result = order_book_service.amend_order(
+            "user-123", order.order_id, quantity=4.0
+        )
+
+        mock_engine.amend_order.assert_called_once_with(
+            order.order_id, quantity=4.0, price=None
+        )
+        query_mock = db_session.query.return_value.filter.return_value
+        query_mock.update.assert_called_once()
+        query_mock.all.assert_not_called()
+        db_session.commit.assert_called_once()
+        mock_engine.notify_book_update.assert_called_once()
+
+    assert result["order"].remaining == 4.0
+    assert result["order_executed"] is False
+
+
+def test_amend_order_not_live(order_book_service, db_session):
+    """Test amending an order that is not live returns None"""
+    with patch_engine() as mock_engine:
+        mock_engine.get_user_order.return_value = None
+
+        assert order_book_service.amend_order("user-123", "x", 1.0) is None
+        mock_engine.amend_order.assert_not_called()
+        db_session.commit.assert_not_called()
+
+
 def test_get_user_orders_all(order_book_service, db_session):
     """Test getting all user orders"""
     mock_orders = [
@@ -443,9 +824,14 @@ def test_get_order_book_snapshot(order_book_service, db_session):
 
     # Mock last trade price query
     mock_trade = DummyTrade()
-    db_session.query.return_value.order_by.return_value.first.return_value = (
-        mock_trade
+    first = (
+        db_session
+        .query.return_value
+        .filter.return_value
+        .order_by.return_value
+        .first
     )
+    first.return_value = mock_trade
 
     result = order_book_service.get_order_book_snapshot()
 
@@ -460,9 +846,14 @@ def test_get_last_trade_price_from_db_with_trade(
 ):
     """Test getting last trade price when trade exists"""
     mock_trade = DummyTrade(price=105.0)
-    db_session.query.return_value.order_by.return_value.first.return_value = (
-        mock_trade
+    first = (
+        db_session
+        .query.return_value
+        .filter.return_value
+        .order_by.return_value
+        .first
     )
+    first.return_value = mock_trade
 
     result = order_book_service._get_last_trade_price_from_db()
 
@@ -471,9 +862,14 @@ def test_get_last_trade_price_from_db_with_trade(
 
 def test_get_last_trade_price_from_db_no_trade(order_book_service, db_session):
     """Test getting last trade price when no trade exists"""
-    db_session.query.return_value.order_by.return_value.first.return_value = (
-        None
+    first = (
+        db_session
+        .query.return_value
+        .filter.return_value
+        .order_by.return_value
+        .first
     )
+    first.return_value = None
 
     result = order_book_service._get_last_trade_price_from_db()
 
@@ -486,6 +882,7 @@ def test_get_recent_trades(order_book_service, db_session):
     (
         db_session
         .query.return_value
+        .filter.return_value
         .order_by.return_value
         .limit.return_value
         .all.return_value
@@ -499,9 +896,7 @@ def test_get_recent_trades(order_book_service, db_session):
 
 def test_get_market_stats_with_bid_ask(order_book_service, db_session):
     """Test getting market stats when bid and ask exist"""
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.get_best_bid.return_value = 99.0
         mock_engine.get_best_ask.return_value = 101.0
         mock_engine.get_last_trade_price.return_value = 100.0
@@ -516,9 +911,7 @@ def test_get_market_stats_with_bid_ask(order_book_service, db_session):
 
 def test_get_market_stats_no_bid_ask(order_book_service, db_session):
     """Test getting market stats when no bid or ask exists"""
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.get_best_bid.return_value = None
         mock_engine.get_best_ask.return_value = None
         mock_engine.get_last_trade_price.return_value = 100.0
@@ -531,6 +924,20 @@ def test_get_market_stats_no_bid_ask(order_book_service, db_session):
         assert result["last_trade_price"] == 100.0
 
 
+def test_get_quote(order_book_service, db_session):
+    """Test quoting a market order against the engine's depth"""
+    with patch_engine() as mock_engine:
+        mock_engine.quote.return_value = Quote(3.0, 3.0, 302.0, 100.0, 102.0)
+
+        result = order_book_service.get_quote(Side.BUY, 3.0)
+
+        mock_engine.quote.assert_called_once_with(Side.BUY, 3.0)
+        assert result.fully_available is True
+        assert result.average_price == pytest.approx(302.0 / 3)
+        assert result.worst_price == 102.0
+        assert result.slippage == pytest.approx(302.0 / 3 - 100.0)
+
+
 def test_place_order_response_class():
     """Test PlaceOrderResponse class"""
     trades = [
@@ -548,6 +955,7 @@ def test_place_order_response_class():
     ]
     order = OrderResponse(
         id=str(uuid.uuid4()),
+        symbol="BTC-USD",
         side=Side.BUY,
         order_type=OrderType.LIMIT,
         price=100.0,
@@ -583,11 +991,9 @@ def test_order_book_updates_after_place_order(order_book_service, db_session):
     db_session.commit = MagicMock()
     db_session.flush = MagicMock()
 
-    with patch(
-        "app.api.services.order_book_service.matching_engine"
-    ) as mock_engine:
+    with patch_engine() as mock_engine:
         mock_engine.add_order.return_value = []
-        mock_engine._notify_book_update = AsyncMock()
+        mock_engine.notify_book_update = MagicMock()
 
         asyncio.run(order_book_service.place_order(user_id, order_request))
 
@@ -602,3 +1008,78 @@ def test_order_book_updates_after_place_order(order_book_service, db_session):
     snapshot = order_book_service.get_order_book_snapshot()
     assert snapshot["bids"][0]["price"] == 101.0
     assert snapshot["bids"][0]["total_qty"] == 2.0
+
+
+def test_order_book_snapshot_from_market_data(order_book_service, db_session):
+    with patch_engine() as mock_engine:
+        mock_engine.get_market_data.return_value = {
+            "sequence": 7,
+            "best_bid": 101.0,
+            "best_ask": 102.0,
+            "last_trade_price": 101.5,
+            "bids": [{"price": 101.0, "total_qty": 2.0}],
+            "asks": [{"price": 102.0, "total_qty": 1.0}],
+        }
+        db_session.query.reset_mock()
+
+        snapshot = order_book_service.get_order_book_snapshot()
+
+    assert snapshot.bids[0].price == 101.0
+    assert snapshot.asks[0].total_qty == 1.0
+    assert snapshot.last_trade_price == 101.5
+    db_session.query.assert_not_called()
+
+
+def test_place_order_through_order_entry_queue(order_book_service):
+    order_request = PlaceOrderRequest(
+        side=Side.BUY, order_type=OrderType.LIMIT, price=100.0, quantity=1.0
+    )
+    with patch(
+        "app.api.services.order_book_service.order_entry_queue"
+    ) as mock_queue:
+        mock_queue.enabled = True
+        mock_queue.place = AsyncMock(return_value={"order": "queued"})
+
+        result = asyncio.run(
+            order_book_service.place_order("user-1", order_request)
+        )
+
+    assert result == {"order": "queued"}
+    order_book_service.db.close.assert_called_once()
+    mock_queue.place.assert_awaited_once_with(
+        "BTC-USD", "user-1", order_request
+    )
+
+
+def test_cancel_through_order_entry_queue_cancel_lane(order_book_service):
+    with patch(
+        "app.api.services.order_book_service.order_entry_queue"
+    ) as mock_queue:
+        mock_queue.enabled = True
+        mock_queue.run_priority = AsyncMock(return_value=True)
+
+        result = asyncio.run(
+            order_book_service.run_priority_command(
+                "cancel_order", user_id="user-1", order_id="o1"
+            )
+        )
+
+    assert result is True
+    mock_queue.run_priority.assert_awaited_once_with(
+        "BTC-USD", "cancel_order", user_id="user-1", order_id="o1"
+    )
+
+
+def test_cancel_without_order_entry_queue(order_book_service):
+    order_book_service.cancel_order = MagicMock(return_value=False)
+
+    result = asyncio.run(
+        order_book_service.run_priority_command(
+            "cancel_order", user_id="user-1", order_id="o1"
+        )
+    )
+
+    assert result is False
+    order_book_service.cancel_order.assert_called_once_with(
+        user_id="user-1", order_id="o1"
+    )
@@ -1,16 +1,23 @@
 import pytest
 import asyncio
-from unittest.mock import MagicMock, AsyncMock, patch
+from unittest.mock import MagicMock, patch
 
 from uuid import uuid4
 from datetime import datetime
 
 
 from app.api.services.order_matching_service import (
+    EngineRegistry,
     OrderMatchingEngine,
     TradeResult,
+    UnknownInstrumentError,
+)
+from app.database.enums.oder_enums import (
+    Side,
+    OrderType,
+    OrderStatus,
+    TimeInForce,
 )
-from app.database.enums.oder_enums import Side, OrderType, OrderStatus
 from app.database.models.order_models import Order
 
 
@@ -28,6 +35,8 @@ def make_order(
     remaining=None,
     active=True,
     created_at=None,
+    time_in_force=None,
+    stop_price=None,
 ):
     return Order(
         order_id=uuid4(),
@@ -40,6 +49,8 @@ def make_order(
         status=status,
         active=active,
         created_at=created_at or datetime.utcnow(),
+        time_in_force=time_in_force,
+        stop_price=stop_price,
     )
 
 
@@ -140,6 +151,123 @@ def test_order_cancel_not_found(engine):
     assert result is False
 
 
+def test_user_open_orders_index(engine):
+    """Test the per-user index tracks live orders only"""
+    user_id = uuid4()
+    bid = make_order(Side.BUY, price=99.0, quantity=1.0)
+    ask = make_order(Side.SELL, price=101.0, quantity=1.0)
+    bid.user_id = ask.user_id = user_id
+    engine.add_order(bid)
+    engine.add_order(ask)
+
+    assert set(engine.get_user_open_orders(str(user_id))) == {bid, ask}
+    assert engine.get_user_open_orders(user_id, Side.SELL) == [ask]
+
+    # A filled order leaves the index
+    engine.add_order(make_order(Side.BUY, price=101.0, quantity=1.0))
+    assert engine.get_user_open_orders(user_id) == [bid]
+    assert str(ask.order_id) not in engine._orders
+
+    engine.cancel_order(str(bid.order_id))
+    assert engine.get_user_open_orders(user_id) == []
+    assert str(user_id) not in engine._user_orders
+
+
+def test_cancel_user_orders_by_side(engine):
+    """Test mass cancel only touches the user's orders on one side"""
+    user_id = uuid4()
+    orders = [
+        make_order(Side.BUY, price=99.0, quantity=1.0),
+        make_order(Side.BUY, price=98.0, quantity=1.0),
+        make_order(Side.SELL, price=101.0, quantity=1.0),
+    ]
+    for order in orders:
+        order.user_id = user_id
+        engine.add_order(order)
+    other = make_order(Side.BUY, price=99.0, quantity=1.0)
+    engine.add_order(other)
+
+    cancelled = engine.cancel_user_orders(user_id, Side.BUY)
+
+    assert set(cancelled) == {str(o.order_id) for o in orders[:2]}
+    assert all(o.status == OrderStatus.CANCELED for o in orders[:2])
+    assert orders[2].active is True
+    assert other.active is True
+    assert engine.cancel_orders(cancelled + ["missing"]) == []
+
+
+def test_amend_reduce_keeps_queue_priority(engine):
+    """Test a size reduction keeps the order ahead of later orders"""
+    first = make_order(Side.SELL, price=101.0, quantity=5.0)
+    second = make_order(Side.SELL, price=101.0, quantity=5.0)
+    engine.add_order(first)
+    engine.add_order(second)
+
+    assert engine.amend_order(str(first.order_id), quantity=2.0) == []
+    assert first.remaining == 2.0
+    assert engine.get_order_book_snapshot()["asks"] == [
+        {"price": 101.0, "total_qty": 7.0}
+    ]
+
+    trades = engine.add_order(make_order(Side.BUY, price=101.0, quantity=2.0))
+    assert trades[0].sell_order_id == first.order_id
+
+
+def test_amend_increase_loses_queue_priority(engine):
+    """Test a size increase re-queues the order behind its level"""
+    first = make_order(Side.SELL, price=101.0, quantity=1.0)
+    second = make_order(Side.SELL, price=101.0, quantity=1.0)
+    engine.add_order(first)
+    engine.add_order(second)
+
+    assert engine.amend_order(str(first.order_id), quantity=3.0) == []
+    assert first.remaining == 3.0
+    assert len(engine._sell_orders) == 2
+
+    trades = engine.add_order(make_order(Side.BUY, price=101.0, quantity=1.0))
+    assert trades[0].sell_order_id == second.order_id
+
+
+def test_amend_price_crossing_executes(engine):
+    """Test a price amend that crosses the book trades immediately"""
+    bid = make_order(Side.BUY, price=100.0, quantity=1.0)
+    ask = make_order(Side.SELL, price=102.0, quantity=3.0)
+    engine.add_order(bid)
+    engine.add_order(ask)
+
+    trades = engine.amend_order(str(ask.order_id), price=100.0)
+
+    assert len(trades) == 1
+    assert trades[0].price == 100.0
+    assert ask.remaining == 2.0
+    assert ask.status == OrderStatus.PARTIALLY_FILLED
+    assert engine.get_order_book_snapshot()["asks"] == [
+        {"price": 100.0, "total_qty": 2.0}
+    ]
+    assert engine.get_user_order(ask.user_id, str(ask.order_id)) is ask
+
+
+def test_amend_rejects_quantity_not_above_filled(engine):
+    """Test the new quantity must exceed the filled quantity"""
+    ask = make_order(Side.SELL, price=101.0, quantity=3.0)
+    engine.add_order(ask)
+    engine.add_order(make_order(Side.BUY, price=101.0, quantity=2.0))
+
+    with pytest.raises(ValueError):
+        engine.amend_order(str(ask.order_id), quantity=2.0)
+    assert engine.amend_order("missing", quantity=1.0) is None
+
+
+def test_client_order_id_index(engine):
+    """Test client order ids are indexed per user"""
+    user_id, order_id = uuid4(), uuid4()
+    engine.register_client_order_id(user_id, "c-1", order_id)
+
+    assert engine.lookup_client_order_id(str(user_id), "c-1") == str(order_id)
+    assert engine.lookup_client_order_id(uuid4(), "c-1") is None
+    assert engine.lookup_client_order_id(user_id, "c-2") is None
+
+
 def test_get_best_bid_with_orders(engine):
     """Test getting best bid when orders exist"""
     buy_order1 = make_order(Side.BUY, price=99.0, quantity=1.0)
@@ -288,15 +416,11 @@ def test_order_book_snapshot_with_invalid_prices(engine):
     assert snapshot["asks"] == []
 
 
-@pytest.mark.asyncio
-async def test_notify_trades_and_book_update(engine):
-    """Test trade and book update notifications"""
+def test_notify_trades_and_book_update(engine):
+    """Test trade and book update notifications are queued for fan-out"""
     with patch(
-        "app.api.services.order_matching_service.ws_manager"
-    ) as mock_ws:
-        mock_ws.send_order_status_update = AsyncMock()
-        mock_ws.send_order_book_update = AsyncMock()
-
+        "app.api.services.order_matching_service.ws_broadcaster"
+    ) as mock_broadcaster:
         trade = TradeResult(
             buy_order_id=uuid4(),
             sell_order_id=uuid4(),
@@ -311,21 +435,20 @@ async def test_notify_trades_and_book_update(engine):
             sell_order_status=OrderStatus.FILLED,
         )
 
-        await engine.notify_trades_and_book_update([trade])
+        engine.notify_trades_and_book_update([trade])
 
-        # Should call order status updates for both users
-        assert mock_ws.send_order_status_update.call_count == 2
-        # Should call book update once
-        assert mock_ws.send_order_book_update.call_count == 1
+        # One executions message per user plus one book update
+        assert mock_broadcaster.publish.call_count == 3
+        book = mock_broadcaster.publish.call_args_list[-1].args[1]
+        assert book["last_trade_price"] == engine.get_last_trade_price()
 
 
-@pytest.mark.asyncio
-async def test_notify_trades_exception_handling(engine):
+def test_notify_trades_exception_handling(engine):
     """Test exception handling in trade notifications"""
     with patch(
-        "app.api.services.order_matching_service.ws_manager"
-    ) as mock_ws:
-        mock_ws.send_order_status_update = AsyncMock(side_effect=Exception())
+        "app.api.services.order_matching_service.ws_broadcaster"
+    ) as mock_broadcaster:
+        mock_broadcaster.publish.side_effect = Exception()
 
         trade = TradeResult(
             buy_order_id=uuid4(),
@@ -341,8 +464,8 @@ async def test_notify_trades_exception_handling(engine):
             sell_order_status=OrderStatus.FILLED,
         )
 
-        # Should not raise exception despite ws_manager failure
-        await engine.notify_trades_and_book_update([trade])
+        # Should not raise exception despite broadcaster failure
+        engine.notify_trades_and_book_update([trade])
 
 
 def test_restore_from_database_with_trades(engine):
@@ -367,6 +490,31 @@ def test_restore_from_database_with_trades(engine):
         assert mock_db_session.commit.called
 
 
+def test_restore_keeps_partially_filled_orders_on_book(engine):
+    """Test a partially filled order stays on the restored book"""
+    mock_db_session = MagicMock()
+    sell_order = make_order(
+        Side.SELL,
+        price=100.0,
+        quantity=1.0,
+        created_at=datetime(2023, 1, 1, 10, 0, 0),
+    )
+    buy_order = make_order(
+        Side.BUY,
+        price=100.0,
+        quantity=2.0,
+        created_at=datetime(2023, 1, 1, 10, 0, 1),
+    )
+    with patch("app.database.models.trade_models.Trade"):
+        engine.restore_from_database([buy_order, sell_order], mock_db_session)
+
+    assert engine.get_order(str(buy_order.order_id)) is buy_order
+    assert engine.get_best_bid() == 100.0
+    # Reloaded after the commit expired it, and kept out of the session
+    mock_db_session.refresh.assert_called_once_with(buy_order)
+    mock_db_session.expunge.assert_called_once_with(buy_order)
+
+
 def test_restore_from_database_without_session(engine):
     """Test restoring from database without db session"""
     buy_order = make_order(Side.BUY, price=100.0, quantity=1.0)
@@ -433,3 +581,462 @@ def test_limit_order_price_priority(engine):
     assert len(trades) == 1
     # Older order (buy) was in book first, so use its price
     assert trades[0].price == 100.0
+
+
+def test_executions_batched_per_user(engine):
+    """Test fills against one maker are sent as a single message"""
+    maker = uuid4()
+    for price in (100.0, 101.0, 102.0):
+        sell_order = make_order(Side.SELL, price=price, quantity=1.0)
+        sell_order.user_id = maker
+        engine.add_order(sell_order)
+
+    market_buy = make_order(
+        Side.BUY, price=0, quantity=3.0, order_type=OrderType.MARKET
+    )
+    trades = engine.add_order(market_buy)
+    assert len(trades) == 3
+
+    reports = engine.build_execution_reports(trades)
+
+    # One message for the maker and one for the taker
+    assert len(reports) == 2
+    maker_report = reports[str(maker)]
+    assert len(maker_report["fills"]) == 3
+    assert len(maker_report["orders"]) == 3
+    assert all(o["status"] == "filled" for o in maker_report["orders"])
+
+    taker_report = reports[str(market_buy.user_id)]
+    assert [f["price"] for f in taker_report["fills"]] == [
+        100.0,
+        101.0,
+        102.0,
+    ]
+    (taker_order,) = taker_report["orders"]
+    assert taker_order["filled_quantity"] == 3.0
+    assert taker_order["remaining_quantity"] == 0
+    assert taker_order["status"] == "filled"
+    assert taker_report["symbol"] == "BTC-USD"
+
+
+def test_registry_books_are_independent():
+    registry = EngineRegistry()
+    btc = registry.register("BTC-USD")
+    eth = registry.register("ETH-USD")
+    assert registry.register("BTC-USD") is btc
+    assert registry.get("ETH-USD") is eth
+    assert registry.symbols() == ["BTC-USD", "ETH-USD"]
+
+    btc.add_order(make_order(Side.SELL, price=100.0, quantity=1.0))
+    trades = eth.add_order(make_order(Side.BUY, price=101.0, quantity=1.0))
+
+    # The ETH buy does not see the BTC ask
+    assert trades == []
+    assert btc.get_best_ask() == 100.0
+    assert eth.get_best_ask() is None
+    assert eth.get_best_bid() == 101.0
+    assert eth.symbol == "ETH-USD"
+
+
+def test_registry_unknown_symbol_raises():
+    with pytest.raises(UnknownInstrumentError):
+        EngineRegistry().get("DOGE-USD")
+
+
+def test_quote_matches_market_order_fills(engine):
+    for price, quantity in ((100.0, 1.0), (101.0, 2.0), (102.0, 3.0)):
+        engine.add_order(make_order(Side.SELL, price=price, quantity=quantity))
+
+    quote = engine.quote(Side.BUY, 2.5)
+    trades = engine.add_order(
+        make_order(
+            Side.BUY, price=0, quantity=2.5, order_type=OrderType.MARKET
+        )
+    )
+
+    notional = sum(trade.price * trade.quantity for trade in trades)
+    assert quote.fully_available
+    assert quote.notional == pytest.approx(notional)
+    assert quote.worst_price == trades[-1].price == 101.0
+
+    # The fills came off the depth
+    assert engine.quote(Side.BUY, 10.0).filled_quantity == pytest.approx(3.5)
+    assert engine.quote(Side.BUY, 1.0).best_price == 101.0
+
+
+def test_quote_follows_cancels_and_amends(engine):
+    buy_order = make_order(Side.BUY, price=99.0, quantity=2.0)
+    other = make_order(Side.BUY, price=98.0, quantity=1.0)
+    engine.add_order(buy_order)
+    engine.add_order(other)
+    assert engine.quote(Side.SELL, 10.0).filled_quantity == 3.0
+
+    engine.amend_order(str(buy_order.order_id), quantity=1.0)
+    assert engine.quote(Side.SELL, 10.0).filled_quantity == 2.0
+
+    engine.amend_order(str(buy_order.order_id), price=97.0)
+    quote = engine.quote(Side.SELL, 1.0)
+    assert quote.best_price == 98.0
+
+    engine.cancel_order(str(other.order_id))
+    quote = engine.quote(Side.SELL, 10.0)
+    assert quote.filled_quantity == 1.0
+    assert quote.best_price == quote.worst_price == 97.0
+
+    engine.restore_from_database([])
+    assert engine.quote(Side.SELL, 1.0).filled_quantity == 0.0
+
+
+def test_marketable_gtc_limit_order_rests_remainder(engine):
+    engine.add_order(make_order(Side.SELL, price=100.0, quantity=1.0))
+    buy_order = make_order(Side.BUY, price=101.0, quantity=3.0)
+
+    trades = engine.add_order(buy_order)
+
+    assert len(trades) == 1
+    assert buy_order.status == OrderStatus.PARTIALLY_FILLED
+    assert engine.get_order_book_snapshot()["bids"] == [
+        {"price": 101.0, "total_qty": 2.0}
+    ]
+
+
+def test_ioc_cancels_remainder_off_book(engine):
+    engine.add_order(make_order(Side.SELL, price=100.0, quantity=1.0))
+    buy_order = make_order(
+        Side.BUY, price=101.0, quantity=3.0, time_in_force=TimeInForce.IOC
+    )
+
+    trades = engine.add_order(buy_order)
+
+    assert len(trades) == 1
+    assert buy_order.remaining == 2.0
+    assert buy_order.status == OrderStatus.CANCELED
+    assert buy_order.active is False
+    assert engine._buy_orders == []
+    assert engine.get_order(str(buy_order.order_id)) is None
+    assert engine.quote(Side.SELL, 1.0).filled_quantity == 0.0
+
+
+def test_market_order_remainder_is_cancelled(engine):
+    engine.add_order(make_order(Side.SELL, price=100.0, quantity=1.0))
+    market_buy = make_order(
+        Side.BUY, price=0, quantity=2.0, order_type=OrderType.MARKET
+    )
+
+    engine.add_order(market_buy)
+
+    assert market_buy.remaining == 1.0
+    assert market_buy.status == OrderStatus.CANCELED
+    assert engine._buy_orders == []
+
+
+def test_fok_only_trades_when_fully_fillable(engine):
+    sell_order = make_order(Side.SELL, price=100.0, quantity=1.0)
+    engine.add_order(sell_order)
+    engine.add_order(make_order(Side.SELL, price=102.0, quantity=1.0))
+
+    # Only one unit is at or below the limit price
+    killed = make_order(
+        Side.BUY, price=101.0, quantity=2.0, time_in_force=TimeInForce.FOK
+    )
+    assert engine.add_order(killed) == []
+    assert killed.status == OrderStatus.CANCELED
+    assert killed.remaining == 2.0
+    assert sell_order.remaining == 1.0
+    assert engine._buy_orders == []
+
+    filled = make_order(
+        Side.BUY, price=102.0, quantity=2.0, time_in_force=TimeInForce.FOK
+    )
+    trades = engine.add_order(filled)
+    assert [trade.price for trade in trades] == [100.0, 102.0]
+    assert filled.status == OrderStatus.FILLED
+
+
+def test_fok_market_order(engine):
+    engine.add_order(make_order(Side.BUY, price=99.0, quantity=1.0))
+    market_sell = make_order(
+        Side.SELL,
+        price=0,
+        quantity=1.5,
+        order_type=OrderType.MARKET,
+        time_in_force=TimeInForce.FOK,
+    )
+
+    assert engine.add_order(market_sell) == []
+    assert market_sell.status == OrderStatus.CANCELED
+    assert engine.get_best_bid() == 99.0
+
+
+def test_fok_with_decimal_fraction_quantities(engine):
+    for price, quantity in ((100.0, 0.1), (101.0, 0.2), (102.0, 0.7)):
+        engine.add_order(make_order(Side.SELL, price=price, quantity=quantity))
+
+    # 0.1 + 0.2 is 0.30000000000000004 in floats
+    fok = make_order(
+        Side.BUY, price=101.0, quantity=0.3, time_in_force=TimeInForce.FOK
+    )
+    trades = engine.add_order(fok)
+
+    assert [trade.price for trade in trades] == [100.0, 101.0]
+    assert fok.status == OrderStatus.FILLED
+    assert fok.remaining == 0
+    assert engine.get_best_ask() == 102.0
+
+
+def test_fill_leaves_no_float_dust(engine):
+    for price, quantity in ((100.0, 0.7), (101.0, 0.1), (102.0, 0.2)):
+        engine.add_order(make_order(Side.SELL, price=price, quantity=quantity))
+
+    # 0.8 - 0.7 - 0.1 is 8.3e-17 in floats
+    fok = make_order(
+        Side.BUY, price=101.0, quantity=0.8, time_in_force=TimeInForce.FOK
+    )
+    trades = engine.add_order(fok)
+
+    assert len(trades) == 2
+    assert fok.status == OrderStatus.FILLED
+    assert not fok.active
+    assert fok.remaining == 0
+    assert engine._buy_orders == []
+    assert engine.quote(Side.BUY, 0.2).fully_available
+    assert engine.get_best_ask() == 102.0
+
+
+def test_post_only_never_takes_liquidity(engine):
+    engine.add_order(make_order(Side.SELL, price=100.0, quantity=1.0))
+
+    crossing = make_order(
+        Side.BUY,
+        price=100.0,
+        quantity=1.0,
+        time_in_force=TimeInForce.POST_ONLY,
+    )
+    assert engine.add_order(crossing) == []
+    assert crossing.status == OrderStatus.CANCELED
+    assert engine.get_best_ask() == 100.0
+    assert engine._buy_orders == []
+
+    passive = make_order(
+        Side.BUY,
+        price=99.0,
+        quantity=1.0,
+        time_in_force=TimeInForce.POST_ONLY,
+    )
+    assert engine.add_order(passive) == []
+    assert passive.status == OrderStatus.OPEN
+    assert engine.get_best_bid() == 99.0
+
+
+def test_stop_orders_wait_off_the_book(engine):
+    stop = make_order(
+        Side.BUY,
+        price=None,
+        quantity=1.0,
+        order_type=OrderType.STOP,
+        stop_price=105.0,
+    )
+    stop_limit = make_order(
+        Side.SELL,
+        price=94.0,
+        quantity=1.0,
+        order_type=OrderType.STOP_LIMIT,
+        stop_price=95.0,
+    )
+
+    assert engine.add_order(stop) == []
+    assert engine.add_order(stop_limit) == []
+
+    assert stop.order_type == OrderType.STOP
+    assert engine.get_user_order(stop.user_id, str(stop.order_id)) is stop
+    assert engine.get_order_book_snapshot() == {"bids": [], "asks": []}
+    assert engine.quote(Side.BUY, 1.0).filled_quantity == 0.0
+    assert engine.pop_triggered_orders() == []
+
+
+def test_trades_trigger_only_the_stops_they_reach(engine):
+    engine.add_order(make_order(Side.SELL, price=104.0, quantity=1.0))
+    engine.add_order(make_order(Side.SELL, price=106.0, quantity=2.0))
+    reached = make_order(
+        Side.BUY,
+        price=None,
+        quantity=1.0,
+        order_type=OrderType.STOP,
+        stop_price=103.0,
+    )
+    beyond = make_order(
+        Side.BUY,
+        price=None,
+        quantity=1.0,
+        order_type=OrderType.STOP,
+        stop_price=110.0,
+    )
+    engine.add_order(reached)
+    engine.add_order(beyond)
+
+    trades = engine.add_order(make_order(Side.BUY, price=104.0, quantity=1.0))
+
+    # The stop became a market order and lifted the next ask
+    assert [trade.price for trade in trades] == [104.0, 106.0]
+    assert trades[1].buy_order_id == reached.order_id
+    assert reached.order_type == OrderType.MARKET
+    assert reached.status == OrderStatus.FILLED
+    assert engine.get_order(str(reached.order_id)) is None
+    assert engine.pop_triggered_orders() == [reached]
+    assert [order for _, _, order in engine._buy_stops] == [beyond]
+    assert beyond.order_type == OrderType.STOP
+
+
+def test_stop_trades_trigger_further_stops(engine):
+    engine.add_order(make_order(Side.BUY, price=99.0, quantity=1.0))
+    engine.add_order(make_order(Side.BUY, price=97.0, quantity=1.0))
+    engine.add_order(make_order(Side.BUY, price=95.0, quantity=1.0))
+    first = make_order(
+        Side.SELL,
+        price=None,
+        quantity=1.0,
+        order_type=OrderType.STOP,
+        stop_price=98.0,
+    )
+    second = make_order(
+        Side.SELL,
+        price=None,
+        quantity=1.0,
+        order_type=OrderType.STOP,
+        stop_price=96.0,
+    )
+    engine.add_order(first)
+    engine.add_order(second)
+
+    trades = engine.add_order(make_order(Side.SELL, price=99.0, quantity=1.0))
+    assert [trade.price for trade in trades] == [99.0]
+    assert engine.pop_triggered_orders() == []
+
+    trades = engine.add_order(make_order(Side.SELL, price=97.0, quantity=1.0))
+    # 97 reaches the first stop, whose trade at 95 reaches the second
+    assert [trade.price for trade in trades] == [97.0, 95.0]
+    assert second.status == OrderStatus.CANCELED
+    assert engine.pop_triggered_orders() == [first, second]
+    assert engine._sell_stops == []
+
+
+def test_triggered_stop_limit_rests_on_the_book(engine):
+    stop_limit = make_order(
+        Side.SELL,
+        price=98.0,
+        quantity=2.0,
+        order_type=OrderType.STOP_LIMIT,
+        stop_price=99.0,
+    )
+    engine.add_order(stop_limit)
+    engine.add_order(make_order(Side.BUY, price=99.0, quantity=1.0))
+
+    engine.add_order(make_order(Side.SELL, price=99.0, quantity=1.0))
+
+    assert stop_limit.order_type == OrderType.LIMIT
+    assert stop_limit.status == OrderStatus.OPEN
+    assert engine.get_order(str(stop_limit.order_id)) is stop_limit
+    assert engine.get_order_book_snapshot()["asks"] == [
+        {"price": 98.0, "total_qty": 2.0}
+    ]
+
+
+def test_stop_reached_when_placed_activates_at_once(engine):
+    engine.add_order(make_order(Side.SELL, price=101.0, quantity=1.0))
+    stop = make_order(
+        Side.BUY,
+        price=None,
+        quantity=1.0,
+        order_type=OrderType.STOP,
+        stop_price=99.0,
+    )
+
+    trades = engine.add_order(stop)
+
+    # The last trade price of 100 is already above the stop price
+    assert [trade.price for trade in trades] == [101.0]
+    assert stop.order_type == OrderType.MARKET
+    assert engine.pop_triggered_orders() == [stop]
+
+
+def test_cancelled_stops_are_not_triggered(engine):
+    stops = [
+        make_order(
+            Side.BUY,
+            price=None,
+            quantity=1.0,
+            order_type=OrderType.STOP,
+            stop_price=stop_price,
+        )
+        for stop_price in (101.0, 102.0, 103.0)
+    ]
+    for stop in stops:
+        engine.add_order(stop)
+
+    assert engine.cancel_order(str(stops[0].order_id))
+    assert stops[0].status == OrderStatus.CANCELED
+    assert len(engine._buy_stops) == 3
+    # Compacted once most entries are cancelled
+    engine.cancel_order(str(stops[1].order_id))
+    assert [order for _, _, order in engine._buy_stops] == [stops[2]]
+
+    engine.add_order(make_order(Side.SELL, price=102.0, quantity=1.0))
+    engine.add_order(make_order(Side.BUY, price=102.0, quantity=1.0))
+
+    assert engine.pop_triggered_orders() == []
+    assert stops[1].order_type == OrderType.STOP
+
+
+def test_pending_stop_cannot_be_amended(engine):
+    stop = make_order(
+        Side.SELL,
+        price=90.0,
+        quantity=1.0,
+        order_type=OrderType.STOP_LIMIT,
+        stop_price=95.0,
+    )
+    engine.add_order(stop)
+
+    with pytest.raises(ValueError):
+        engine.amend_order(str(stop.order_id), quantity=2.0)
+
+
+def test_restore_saves_triggered_stops(engine):
+    mock_db_session = MagicMock()
+    engine.set_last_trade_price(96.0)
+    stop_limit = make_order(
+        Side.SELL,
+        price=94.0,
+        quantity=1.0,
+        order_type=OrderType.STOP_LIMIT,
+        stop_price=97.0,
+    )
+
+    engine.restore_from_database([stop_limit], mock_db_session)
+
+    # Triggered by the last trade price, without trading
+    assert stop_limit.order_type == OrderType.LIMIT
+    assert engine.get_best_ask() == 94.0
+    mock_db_session.commit.assert_called_once()
+    mock_db_session.refresh.assert_called_once_with(stop_limit)
+
+
+def test_amend_post_only_across_the_spread_is_rejected(engine):
+    engine.add_order(make_order(Side.SELL, price=100.0, quantity=1.0))
+    passive = make_order(
+        Side.BUY,
+        price=99.0,
+        quantity=1.0,
+        time_in_force=TimeInForce.POST_ONLY,
+    )
+    engine.add_order(passive)
+
+    with pytest.raises(ValueError):
+        engine.amend_order(str(passive.order_id), price=100.0)
+
+    assert passive.price == 99.0 and passive.status == OrderStatus.OPEN
+    assert engine.get_best_bid() == 99.0
+    assert engine.get_best_ask() == 100.0
+
+    assert engine.amend_order(str(passive.order_id), price=99.5) == []
+    assert engine.get_best_bid() == 99.5
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.api.services.order_queue_service import OrderEntryQueue
+
+
+@pytest.fixture
+def db_session():
+    session = MagicMock()
+    with patch(
+        "app.api.services.order_queue_service.get_db_session",
+        side_effect=lambda: iter([session]),
+    ):
+        yield session
+
+
+@pytest.fixture
+def service_class(db_session):
+    """OrderBookService whose results echo (symbol, user_id, request)"""
+    with patch(
+        "app.api.services.order_book_service.OrderBookService"
+    ) as mock_class:
+
+        def service(db, symbol):
+            instance = MagicMock()
+            instance.place_user_orders.side_effect = lambda entries: [
+                (symbol, user_id, request) for user_id, request in entries
+            ]
+            instance.cancel_order.side_effect = lambda **kwargs: (
+                "cancelled",
+                kwargs["order_id"],
+            )
+            return instance
+
+        mock_class.side_effect = service
+        yield mock_class
+
+
+async def place_all(queue, commands):
+    results = await asyncio.gather(
+        *(queue.place(*command) for command in commands),
+        return_exceptions=True,
+    )
+    await queue.stop()
+    return results
+
+
+@pytest.mark.asyncio
+async def test_concurrent_orders_share_one_batch(service_class, db_session):
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=0)
+    commands = [("BTC-USD", f"user-{i}", f"order-{i}") for i in range(5)]
+
+    results = await place_all(queue, commands)
+
+    assert results == commands
+    assert queue.batches == 1 and queue.largest_batch == 5
+    service_class.assert_called_once_with(db_session, "BTC-USD")
+    db_session.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_bounded_by_size(service_class):
+    queue = OrderEntryQueue(max_batch=2, max_delay_ms=0)
+    commands = [("BTC-USD", "user", f"order-{i}") for i in range(5)]
+
+    results = await place_all(queue, commands)
+
+    assert results == commands
+    assert queue.batches == 3 and queue.largest_batch == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_instrument_only_fails_its_orders(
+    service_class, db_session
+):
+    place = service_class.side_effect
+
+    def service(db, symbol):
+        if symbol == "ETH-USD":
+            raise RuntimeError("db down")
+        return place(db, symbol)
+
+    service_class.side_effect = service
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=0)
+
+    btc, eth = await place_all(
+        queue, [("BTC-USD", "a", "order-1"), ("ETH-USD", "b", "order-2")]
+    )
+
+    assert btc == ("BTC-USD", "a", "order-1")
+    assert isinstance(eth, RuntimeError)
+    db_session.rollback.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_order_only_fails_its_caller(service_class):
+    place = service_class.side_effect
+
+    def service(db, symbol):
+        instance = place(db, symbol)
+        instance.place_user_orders.side_effect = lambda entries: [
+            ValueError("rejected") if request == "bad" else request
+            for _, request in entries
+        ]
+        return instance
+
+    service_class.side_effect = service
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=0)
+
+    good, bad = await place_all(
+        queue, [("BTC-USD", "a", "good"), ("BTC-USD", "b", "bad")]
+    )
+
+    assert good == "good"
+    assert isinstance(bad, ValueError)
+    assert queue.batches == 1
+
+
+@pytest.mark.asyncio
+async def test_waits_max_delay_for_more_orders(service_class):
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=50)
+
+    first = asyncio.ensure_future(queue.place("BTC-USD", "a", "order-1"))
+    await asyncio.sleep(0.01)
+    second = await queue.place("BTC-USD", "b", "order-2")
+    await queue.stop()
+
+    assert first.result() == ("BTC-USD", "a", "order-1")
+    assert second == ("BTC-USD", "b", "order-2")
+    assert queue.batches == 1
+
+
+def test_disabled_by_default():
+    assert not OrderEntryQueue(max_batch=0).enabled
+
+
+@pytest.mark.asyncio
+async def test_cancels_run_before_new_orders(service_class):
+    calls = []
+    place = service_class.side_effect
+
+    def service(db, symbol):
+        instance = place(db, symbol)
+        instance.place_user_orders.side_effect = lambda entries: [
+            calls.append("place") or "placed" for _ in entries
+        ]
+        instance.cancel_order.side_effect = lambda **kwargs: (
+            calls.append("cancel") or True
+        )
+        return instance
+
+    service_class.side_effect = service
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=0)
+
+    results = await asyncio.gather(
+        queue.place("BTC-USD", "a", "order-1"),
+        queue.place("BTC-USD", "b", "order-2"),
+        queue.run_priority(
+            "BTC-USD", "cancel_order", user_id="c", order_id="o1"
+        ),
+    )
+    await queue.stop()
+
+    assert results == ["placed", "placed", True]
+    assert calls == ["cancel", "place", "place"]
+    assert queue.batches == 1
+
+
+@pytest.mark.asyncio
+async def test_cancels_do_not_wait_for_more_orders(service_class):
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=5000)
+
+    started = time.monotonic()
+    result = await queue.run_priority(
+        "BTC-USD", "cancel_order", user_id="a", order_id="o1"
+    )
+    await queue.stop()
+
+    assert result == ("cancelled", "o1")
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_only_cancels_and_amends_take_the_cancel_lane():
+    queue = OrderEntryQueue(max_batch=10)
+    with pytest.raises(ValueError):
+        await queue.run_priority("BTC-USD", "place_user_orders", entries=[])
+
+
+@pytest.mark.asyncio
+async def test_lane_metrics(service_class):
+    queue = OrderEntryQueue(max_batch=10, max_delay_ms=0)
+    await place_all(
+        queue,
+        [("BTC-USD", "a", "order-1"), ("BTC-USD", "b", "order-2")],
+    )
+    await queue.run_priority(
+        "BTC-USD", "cancel_order", user_id="a", order_id="o1"
+    )
+    await queue.stop()
+
+    lanes = queue.metrics()["lanes"]
+    assert lanes["place"]["commands"] == 2
+    assert lanes["cancel"]["commands"] == 1
+    assert lanes["cancel"]["depth"] == 0
+    assert lanes["place"]["max_wait_ms"] >= lanes["place"]["avg_wait_ms"]
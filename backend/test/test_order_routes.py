@@ -1,11 +1,16 @@
 import pytest
 from fastapi import status
 from httpx import ASGITransport, AsyncClient
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 import uuid
 from datetime import datetime
 
 from app.api.routers.order_routers import router
+from app.config import config as order_routers_config
+from app.core import rate_limit_dependencies
+from app.core.admission_dependencies import order_admission
+from app.database.enums.oder_enums import Side, TimeInForce
+from app.util.rate_limit_util import TokenBucketLimiter
 
 from fastapi import FastAPI
 
@@ -41,20 +46,15 @@ def mock_order_service():
     mock.get_order_book_snapshot = MagicMock()
     mock.get_user_orders = MagicMock()
     mock.get_recent_trades = MagicMock()
-    return mock
-
-
-@pytest.fixture
-def mock_ws_manager():
-    mock = MagicMock()
-    mock.broadcast_message = AsyncMock()
+    # Cancels and amends run the service method named by the route
+    mock.run_priority_command = AsyncMock(
+        side_effect=lambda method, **kwargs: getattr(mock, method)(**kwargs)
+    )
     return mock
 
 
 @pytest.fixture(autouse=True)
-def override_dependencies(
-    mock_user, mock_admin, mock_db, mock_order_service, mock_ws_manager
-):
+def override_dependencies(mock_user, mock_admin, mock_db, mock_order_service):
     from app.api.routers import order_routers
 
     app.dependency_overrides = {}
@@ -65,27 +65,274 @@ def override_dependencies(
         lambda: mock_admin
     )
     app.dependency_overrides[order_routers.get_db_session] = lambda: mock_db
-    order_routers.OrderBookService = lambda db: mock_order_service
-    order_routers.ws_service = mock_ws_manager
+    order_routers.OrderBookService = lambda db, symbol=None: (
+        mock_order_service
+    )
 
 
 @pytest.mark.asyncio
-async def test_cancel_order_success(mock_order_service, mock_ws_manager):
+async def test_cancel_order_success(mock_order_service):
     mock_order_service.cancel_order.return_value = True
-    (
-        mock_order_service
-        .get_order_book_snapshot.return_value
-        .dict.return_value
-    ) = {
-        "bids": [],
-        "asks": [],
-    }
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         response = await ac.delete("/cancel/123")
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["order_id"] == "123"
-    mock_ws_manager.broadcast_message.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_place_order_returns_service_result(mock_order_service):
+    mock_order_service.place_order = AsyncMock(
+        return_value={"trades": [], "order": None, "order_executed": False}
+    )
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/place",
+            json={
+                "side": "BUY",
+                "order_type": "LIMIT",
+                "price": 100.0,
+                "quantity": 1.0,
+            },
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["order_executed"] is False
+    # No database book snapshot is built on the request path
+    mock_order_service.get_order_book_snapshot.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_place_order_batch_returns_results(mock_order_service):
+    mock_order_service.place_orders = AsyncMock(
+        return_value=[
+            {"trades": [], "order": None, "order_executed": False},
+            {"trades": [], "order": None, "order_executed": False},
+        ]
+    )
+    order = {
+        "side": "SELL",
+        "order_type": "LIMIT",
+        "price": 101.0,
+        "quantity": 1.0,
+    }
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/batch", json={"orders": [order, order]})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["results"]) == 2
+    kwargs = mock_order_service.place_orders.call_args.kwargs
+    assert kwargs["user_id"] == "test-user"
+    assert len(kwargs["order_requests"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_place_order_batch_reports_failed_orders(mock_order_service):
+    mock_order_service.place_orders = AsyncMock(
+        return_value=[
+            {"trades": [], "order": None, "order_executed": False},
+            ValueError("Order could not be placed"),
+        ]
+    )
+    order = {"side": "BUY", "order_type": "MARKET", "quantity": 1.0}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/batch", json={"orders": [order, order]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["results"][1] == {
+        "error": "Failed to place order: Order could not be placed"
+    }
+
+
+@pytest.mark.asyncio
+async def test_place_order_batch_charges_each_order(
+    mock_order_service, monkeypatch
+):
+    monkeypatch.setitem(
+        rate_limit_dependencies.rate_limiters,
+        "orders",
+        TokenBucketLimiter(rate=1, burst=3),
+    )
+    mock_order_service.place_orders = AsyncMock(return_value=[])
+    order = {"side": "BUY", "order_type": "MARKET", "quantity": 1.0}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.post("/batch", json={"orders": [order, order]})
+        second = await ac.post("/batch", json={"orders": [order, order]})
+    assert first.status_code == status.HTTP_200_OK
+    assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    mock_order_service.place_orders.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_place_order_batch_larger_than_the_burst(
+    mock_order_service, monkeypatch
+):
+    monkeypatch.setitem(
+        rate_limit_dependencies.rate_limiters,
+        "orders",
+        TokenBucketLimiter(rate=1, burst=3),
+    )
+    mock_order_service.place_orders = AsyncMock(return_value=[])
+    order = {"side": "BUY", "order_type": "MARKET", "quantity": 1.0}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        too_large = await ac.post("/batch", json={"orders": [order] * 4})
+        # The rejected batch took no tokens
+        full = await ac.post("/batch", json={"orders": [order] * 3})
+    assert too_large.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert full.status_code == status.HTTP_200_OK
+    mock_order_service.place_orders.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_place_order_time_in_force(mock_order_service):
+    mock_order_service.place_order = AsyncMock(
+        return_value={"trades": [], "order": None, "order_executed": False}
+    )
+    market = {"side": "BUY", "order_type": "MARKET", "quantity": 1.0}
+    limit = {**market, "order_type": "LIMIT", "price": 100.0}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/place", json=market)
+        await ac.post("/place", json=limit)
+        await ac.post("/place", json={**limit, "time_in_force": "POST_ONLY"})
+        rejected = await ac.post(
+            "/place", json={**market, "time_in_force": "POST_ONLY"}
+        )
+
+    # Market orders never rest, limit orders do unless told otherwise
+    assert [
+        call.kwargs["order_request"].time_in_force
+        for call in mock_order_service.place_order.call_args_list
+    ] == [TimeInForce.IOC, TimeInForce.GTC, TimeInForce.POST_ONLY]
+    assert rejected.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_place_stop_orders(mock_order_service):
+    mock_order_service.place_order = AsyncMock(
+        return_value={"trades": [], "order": None, "order_executed": False}
+    )
+    stop = {
+        "side": "SELL",
+        "order_type": "STOP",
+        "quantity": 1.0,
+        "stop_price": 95.0,
+    }
+    stop_limit = {**stop, "order_type": "STOP_LIMIT", "price": 94.0}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/place", json=stop)
+        await ac.post("/place", json=stop_limit)
+        rejected = [
+            await ac.post("/place", json=order)
+            for order in (
+                {**stop, "stop_price": None},
+                {k: v for k, v in stop.items() if k != "stop_price"},
+                {k: v for k, v in stop_limit.items() if k != "stop_price"},
+                {k: v for k, v in stop_limit.items() if k != "price"},
+                {**stop, "price": 94.0},
+                {**stop_limit, "price": None},
+                {**stop_limit, "order_type": "LIMIT"},
+            )
+        ]
+
+    # Triggered, a stop order is a market order and a stop-limit a limit
+    assert [
+        call.kwargs["order_request"].time_in_force
+        for call in mock_order_service.place_order.call_args_list
+    ] == [TimeInForce.IOC, TimeInForce.GTC]
+    assert all(
+        response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        for response in rejected
+    )
+
+
+@pytest.mark.asyncio
+async def test_place_order_batch_rejects_mixed_symbols(mock_order_service):
+    order = {"side": "BUY", "order_type": "MARKET", "quantity": 1.0}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/batch",
+            json={"orders": [order, {**order, "symbol": "ETH-USD"}]},
+        )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_place_order_batch_rejects_oversized_batch(mock_order_service):
+    order = {"side": "BUY", "order_type": "MARKET", "quantity": 1.0}
+    orders = [order] * (order_routers_config.ORDER_BATCH_MAX_SIZE + 1)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/batch", json={"orders": orders})
+        empty = await ac.post("/batch", json={"orders": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert empty.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_cancel_order_batch(mock_order_service):
+    order_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+    mock_order_service.cancel_orders.return_value = order_ids[:1]
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/cancel-batch", json={"order_ids": order_ids}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["cancelled"] == order_ids[:1]
+    assert response.json()["not_found"] == order_ids[1:]
+    mock_order_service.cancel_orders.assert_called_once_with(
+        user_id="test-user", order_ids=order_ids
+    )
+
+
+@pytest.mark.asyncio
+async def test_cancel_all_orders_by_side(mock_order_service):
+    mock_order_service.cancel_all_orders.return_value = ["a", "b"]
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.delete("/all", params={"side": "BUY"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["cancelled"] == ["a", "b"]
+    kwargs = mock_order_service.cancel_all_orders.call_args.kwargs
+    assert kwargs["side"].value == "BUY"
+
+
+@pytest.mark.asyncio
+async def test_amend_order(mock_order_service):
+    mock_order_service.amend_order.return_value = {
+        "trades": [],
+        "order": None,
+        "order_executed": False,
+    }
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.patch("/abc", json={"quantity": 2.0})
+        mock_order_service.amend_order.return_value = None
+        missing = await ac.patch("/abc", json={"price": 99.0})
+        empty = await ac.patch("/abc", json={})
+    assert response.status_code == status.HTTP_200_OK
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert empty.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    mock_order_service.amend_order.assert_called_with(
+        user_id="test-user", order_id="abc", quantity=None, price=99.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_order_by_client_order_id(mock_order_service):
+    mock_order_service.get_order_by_client_order_id.return_value = None
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/client/c-1")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_order_service.get_order_by_client_order_id.assert_called_once_with(
+        user_id="test-user", client_order_id="c-1"
+    )
 
 
 @pytest.mark.asyncio
@@ -114,6 +361,7 @@ async def test_get_my_orders_success(mock_order_service):
     mock_order_service.get_user_orders.return_value = [
         {
             "id": str(uuid.uuid4()),
+            "symbol": "BTC-USD",
             "side": "BUY",  # must be uppercase
             "order_type": "LIMIT",  # must be uppercase
             "price": 100.0,
@@ -156,6 +404,26 @@ async def test_get_order_book_success(mock_order_service):
     assert "bids" in response.json()
 
 
+@pytest.mark.asyncio
+async def test_get_order_book_uses_symbol_book(mock_order_service):
+    from app.api.routers import order_routers
+
+    symbols = []
+    order_routers.OrderBookService = lambda db, symbol=None: (
+        symbols.append(symbol) or mock_order_service
+    )
+    mock_order_service.get_order_book_snapshot.return_value = {
+        "bids": [],
+        "asks": [],
+        "last_trade_price": 100.0,
+    }
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/book")
+        await ac.get("/book?symbol=ETH-USD")
+    assert symbols == [order_routers_config.DEFAULT_SYMBOL, "ETH-USD"]
+
+
 @pytest.mark.asyncio
 async def test_get_order_book_exception(mock_order_service):
     mock_order_service.get_order_book_snapshot.side_effect = Exception("fail")
@@ -166,6 +434,37 @@ async def test_get_order_book_exception(mock_order_service):
     assert "Failed to get order book" in response.json()["detail"]
 
 
+@pytest.mark.asyncio
+async def test_get_quote(mock_order_service):
+    mock_order_service.get_quote.return_value = {
+        "symbol": "BTC-USD",
+        "side": "BUY",
+        "quantity": 3.0,
+        "filled_quantity": 2.0,
+        "fully_available": False,
+        "average_price": 100.5,
+        "best_price": 100.0,
+        "worst_price": 101.0,
+        "notional": 201.0,
+        "slippage": 0.5,
+    }
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/quote?side=BUY&qty=3")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["fully_available"] is False
+    mock_order_service.get_quote.assert_called_once_with(Side.BUY, 3.0)
+
+
+@pytest.mark.asyncio
+async def test_get_quote_rejects_non_positive_quantity(mock_order_service):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/quote?side=BUY&qty=0")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    mock_order_service.get_quote.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_get_recent_trades_success(mock_order_service):
     # engine_trade_id should be int, not str!
@@ -198,3 +497,28 @@ async def test_get_recent_trades_exception(mock_order_service):
         response = await ac.get("/recent-trades")
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert "Failed to get recent trades" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_place_order_shed_when_overloaded(mock_order_service):
+    mock_order_service.place_order = AsyncMock()
+    mock_order_service.cancel_order.return_value = True
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        with patch.object(order_admission, "admit", return_value=1):
+            response = await ac.post(
+                "/place",
+                json={
+                    "side": "BUY",
+                    "order_type": "LIMIT",
+                    "price": 100.0,
+                    "quantity": 1.0,
+                },
+            )
+            # Cancels still go through
+            cancel = await ac.delete("/cancel/order-1")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    mock_order_service.place_order.assert_not_called()
+    assert cancel.status_code == 200
@@ -32,7 +32,7 @@ def make_price_obj(id, ts=1234567890):
 
 @pytest.mark.asyncio
 async def test_get_price_data_empty(mock_db):
-    mock_db.query().order_by().limit().all.return_value = []
+    mock_db.query().filter().order_by().limit().all.return_value = []
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         resp = await ac.get("/price/")
@@ -60,7 +60,7 @@ async def test_get_price_data_nonempty(monkeypatch, mock_db):
             }
         },
     )
-    mock_db.query().order_by().limit().all.return_value = [price_obj]
+    mock_db.query().filter().order_by().limit().all.return_value = [price_obj]
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         resp = await ac.get("/price/")
@@ -72,7 +72,7 @@ async def test_get_price_data_nonempty(monkeypatch, mock_db):
 
 @pytest.mark.asyncio
 async def test_get_price_data_limit_param(mock_db):
-    mock_db.query().order_by().limit().all.return_value = []
+    mock_db.query().filter().order_by().limit().all.return_value = []
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         resp = await ac.get("/price/?limit=10")
@@ -0,0 +1,79 @@
+import uuid
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit_dependencies
+from app.core.auth_dependencies import get_current_user
+from app.database.enums.user_enums import UserTypeEnum
+from app.schemas.auth_schemas import AuthenticatedUserSchema
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    ip_limit = rate_limit_dependencies.limit_by_ip("test-ip", 1, 2)
+    user_limit = rate_limit_dependencies.limit_by_user("test-user", 1, 1)
+
+    @app.post("/login", dependencies=[Depends(ip_limit)])
+    async def login():
+        return {"ok": True}
+
+    @app.post("/place", dependencies=[Depends(user_limit)])
+    async def place():
+        return {"ok": True}
+
+    yield app
+    rate_limit_dependencies.rate_limiters.pop("test-ip")
+    rate_limit_dependencies.rate_limiters.pop("test-user")
+
+
+def override_user(user_id):
+    async def current_user():
+        return AuthenticatedUserSchema(
+            user_id=user_id, user_type=UserTypeEnum.trader
+        )
+
+    return current_user
+
+
+def test_limit_by_ip_returns_429(app):
+    client = TestClient(app)
+    assert client.post("/login").status_code == 200
+    assert client.post("/login").status_code == 200
+
+    response = client.post("/login")
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Too many requests"
+    assert response.headers["Retry-After"] == "1"
+    assert rate_limit_dependencies.rate_limiters["test-ip"].rejected == 1
+
+
+def test_limit_by_user_keeps_separate_budgets(app):
+    client = TestClient(app)
+    app.dependency_overrides[get_current_user] = override_user(uuid.uuid4())
+    assert client.post("/place").status_code == 200
+    assert client.post("/place").status_code == 429
+
+    app.dependency_overrides[get_current_user] = override_user(uuid.uuid4())
+    assert client.post("/place").status_code == 200
+
+
+def test_rejects_before_the_endpoint_runs(app):
+    calls = []
+
+    @app.post(
+        "/hash",
+        dependencies=[
+            Depends(rate_limit_dependencies.limit_by_ip("test-hash", 1, 1))
+        ],
+    )
+    async def hash_endpoint():
+        calls.append(1)
+
+    client = TestClient(app)
+    client.post("/hash")
+    assert client.post("/hash").status_code == 429
+    assert calls == [1]
+    rate_limit_dependencies.rate_limiters.pop("test-hash")
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import patch
+
+from app.util.rate_limit_util import TokenBucketLimiter
+
+
+def test_allows_burst_then_rejects():
+    limiter = TokenBucketLimiter(rate=1, burst=3)
+    with patch("app.util.rate_limit_util.time.monotonic", return_value=0.0):
+        assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.acquire("a") == 1.0
+        # Buckets are per key
+        assert limiter.acquire("b") == 0.0
+    assert limiter.metrics() == {
+        "allowed": 4,
+        "rejected": 1,
+        "tracked_keys": 2,
+    }
+
+
+def test_refills_at_rate_up_to_burst():
+    limiter = TokenBucketLimiter(rate=2, burst=2)
+    with patch("app.util.rate_limit_util.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        limiter.acquire("a")
+        limiter.acquire("a")
+        assert limiter.acquire("a") == 0.5
+
+        monotonic.return_value = 0.5
+        assert limiter.acquire("a") == 0.0
+        assert limiter.acquire("a") > 0
+
+        monotonic.return_value = 100.0
+        assert limiter.acquire("a") == 0.0
+        assert limiter.acquire("a") == 0.0
+        assert limiter.acquire("a") > 0
+
+
+def test_evicts_least_recently_seen_keys():
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("a")
+    limiter.acquire("c")
+    assert limiter.metrics()["tracked_keys"] == 2
+    # "b" was evicted, so it starts again with a full bucket
+    assert limiter.acquire("b") == 0.0
+
+
+def test_acquires_several_tokens():
+    limiter = TokenBucketLimiter(rate=1, burst=3)
+    with patch("app.util.rate_limit_util.time.monotonic", return_value=0.0):
+        assert limiter.acquire("a", 2) == 0.0
+        assert limiter.acquire("a", 2) == 1.0
+        assert limiter.acquire("a") == 0.0
+        assert limiter.acquire("b", 3) == 0.0
+        assert limiter.acquire("b", 3) == 3.0
+        # More than the burst is charged in full, never capped
+        with pytest.raises(ValueError):
+            limiter.acquire("c", 4)
+    assert limiter.metrics()["tracked_keys"] == 2
@@ -0,0 +1,39 @@
+from app.util.shard_util import ConsistentHashRing
+
+SYMBOLS = [f"SYM{i}-USD" for i in range(200)]
+
+
+def test_same_shard_in_every_ring():
+    first = ConsistentHashRing([0, 1, 2])
+    second = ConsistentHashRing([2, 1, 0])
+    assert [first.shard_for(s) for s in SYMBOLS] == [
+        second.shard_for(s) for s in SYMBOLS
+    ]
+
+
+def test_keys_spread_over_shards():
+    ring = ConsistentHashRing([0, 1, 2, 3])
+    counts = {shard: 0 for shard in ring.shards}
+    for symbol in SYMBOLS:
+        counts[ring.shard_for(symbol)] += 1
+    assert all(count > len(SYMBOLS) / 8 for count in counts.values())
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    ring = ConsistentHashRing([0, 1, 2])
+    before = {symbol: ring.shard_for(symbol) for symbol in SYMBOLS}
+    ring.add_shard(3)
+    moved = [s for s in SYMBOLS if ring.shard_for(s) != before[s]]
+    assert moved
+    assert all(ring.shard_for(s) == 3 for s in moved)
+
+
+def test_assignment_overrides_ring():
+    ring = ConsistentHashRing([0, 1])
+    owner = ring.shard_for("BTC-USD")
+    ring.assign("BTC-USD", 1 - owner)
+    assert ring.shard_for("BTC-USD") == 1 - owner
+
+
+def test_empty_ring():
+    assert ConsistentHashRing([]).shard_for("BTC-USD") is None
@@ -0,0 +1,74 @@
+import multiprocessing
+import struct
+import uuid
+
+import pytest
+
+from app.util.shm_util import SeqlockReader, SeqlockWriter, TornReadError
+
+PAIR = struct.Struct("<QQ")
+
+
+@pytest.fixture
+def writer():
+    writer = SeqlockWriter(f"test-seqlock-{uuid.uuid4().hex[:8]}", 64)
+    yield writer
+    writer.unlink()
+
+
+def _hammer(name: str, writes: int):
+    writer = SeqlockWriter(name, PAIR.size)
+    for i in range(writes):
+        writer.write(PAIR.pack(i, i))
+    writer.close()
+
+
+def test_read_returns_the_last_write(writer):
+    reader = SeqlockReader(writer.name)
+    writer.write(b"first")
+    writer.write(b"second")
+    assert reader.read().startswith(b"second")
+    assert writer.sequence == 4
+    reader.close()
+
+
+def test_read_gives_up_while_a_write_is_in_progress(writer):
+    reader = SeqlockReader(writer.name, max_retries=5)
+    # A writer that died mid-write leaves the sequence odd
+    struct.pack_into("<Q", writer.shm.buf, 0, 3)
+    with pytest.raises(TornReadError):
+        reader.read()
+    assert reader.retries == 5
+    reader.close()
+
+
+def test_next_owner_continues_the_sequence(writer):
+    writer.write(b"x")
+    struct.pack_into("<Q", writer.shm.buf, 0, 5)
+    successor = SeqlockWriter(writer.name, 64)
+    assert successor.sequence == 6
+    successor.close()
+
+
+def test_payload_larger_than_region(writer):
+    with pytest.raises(ValueError):
+        writer.write(b"x" * 65)
+
+
+def test_no_torn_reads_across_processes():
+    name = f"test-seqlock-{uuid.uuid4().hex[:8]}"
+    writer = SeqlockWriter(name, PAIR.size)
+    writer.write(PAIR.pack(0, 0))
+    reader = SeqlockReader(name)
+    process = multiprocessing.get_context("spawn").Process(
+        target=_hammer, args=(name, 200000)
+    )
+    process.start()
+    try:
+        while process.is_alive():
+            first, second = PAIR.unpack_from(reader.read())
+            assert first == second
+    finally:
+        process.join()
+        reader.close()
+        writer.unlink()
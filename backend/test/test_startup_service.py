@@ -13,9 +13,9 @@ def mock_db_session():
 @pytest.fixture
 def mock_matching_engine():
     with patch(
-        "app.api.services.startup_service.matching_engine"
-    ) as mock_engine:
-        yield mock_engine
+        "app.api.services.startup_service.engine_registry"
+    ) as mock_registry:
+        yield mock_registry.register.return_value
 
 
 @pytest.fixture
@@ -30,9 +30,12 @@ def mock_get_db_session(mock_db_session):
 def test_restore_matching_engine_success(
     mock_get_db_session, mock_db_session, mock_matching_engine
 ):
+    mock_db_session.query().filter().all.return_value = [
+        MagicMock(symbol="BTC-USD")
+    ]
     # Mock last trade
     last_trade = MagicMock(price=100)
-    mock_db_session.query().order_by().first.return_value = last_trade
+    mock_db_session.query().filter().order_by().first.return_value = last_trade
     # Mock active orders
     active_orders = [MagicMock(), MagicMock()]
     (mock_db_session.query().filter().order_by().all.return_value) = (
@@ -51,8 +54,11 @@ def test_restore_matching_engine_success(
 def test_restore_matching_engine_no_last_trade(
     mock_get_db_session, mock_db_session, mock_matching_engine
 ):
+    mock_db_session.query().filter().all.return_value = [
+        MagicMock(symbol="BTC-USD")
+    ]
     # No last trade
-    mock_db_session.query().order_by().first.return_value = None
+    mock_db_session.query().filter().order_by().first.return_value = None
     # Mock active orders
     active_orders = []
     (mock_db_session.query().filter().order_by().all.return_value) = (
@@ -68,6 +74,48 @@ def test_restore_matching_engine_no_last_trade(
     mock_db_session.close.assert_called_once()
 
 
+def test_restore_matching_engine_prefers_price_history(
+    mock_get_db_session, mock_db_session, mock_matching_engine
+):
+    mock_db_session.query().filter().all.return_value = [
+        MagicMock(symbol="BTC-USD")
+    ]
+    # Price history first, the last trade is not looked up
+    mock_db_session.query().filter().order_by().first.side_effect = [
+        MagicMock(price=101.5),
+        MagicMock(price=100),
+    ]
+    mock_db_session.query().filter().order_by().all.return_value = []
+
+    startup_service.restore_matching_engine_from_database()
+
+    mock_matching_engine.set_last_trade_price.assert_called_once_with(101.5)
+
+
+def test_restore_matching_engine_each_instrument(
+    mock_get_db_session, mock_db_session
+):
+    mock_db_session.query().filter().all.return_value = [
+        MagicMock(symbol="BTC-USD"),
+        MagicMock(symbol="ETH-USD"),
+    ]
+    mock_db_session.query().filter().order_by().first.return_value = None
+    mock_db_session.query().filter().order_by().all.return_value = []
+
+    with patch(
+        "app.api.services.startup_service.engine_registry"
+    ) as mock_registry:
+        startup_service.restore_matching_engine_from_database()
+
+    assert [
+        call.args[0] for call in mock_registry.register.call_args_list
+    ] == ["BTC-USD", "ETH-USD"]
+    assert (
+        mock_registry.register.return_value.restore_from_database.call_count
+        == 2
+    )
+
+
 def test_restore_matching_engine_db_exception(
     mock_get_db_session, mock_db_session, mock_matching_engine
 ):
@@ -0,0 +1,222 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.api.services import ws_order_service
+from app.schemas.order_schemas import PlaceOrderRequest
+
+
+@pytest.fixture
+def order_service():
+    service = MagicMock()
+    service.run_priority_command = AsyncMock(
+        side_effect=lambda method, **kwargs: getattr(service, method)(**kwargs)
+    )
+    with (
+        patch.object(ws_order_service, "SessionLocal", MagicMock()),
+        patch.object(
+            ws_order_service, "OrderBookService", return_value=service
+        ),
+    ):
+        yield service
+
+
+@pytest.fixture
+def order_limiter():
+    limiter = MagicMock()
+    limiter.acquire.return_value = 0.0
+    with patch.dict(ws_order_service.rate_limiters, {"orders": limiter}):
+        yield limiter
+
+
+@pytest.mark.asyncio
+async def test_place_acks_with_correlation_id(order_service, order_limiter):
+    order_id = uuid.uuid4()
+    order_service.place_order = AsyncMock(
+        return_value={
+            "trades": [],
+            "order": {"id": order_id},
+            "order_executed": False,
+        }
+    )
+    reply = await ws_order_service.handle_order_command(
+        "u1",
+        {
+            "type": "place",
+            "id": "c1",
+            "order": {
+                "side": "BUY",
+                "order_type": "LIMIT",
+                "price": 100.0,
+                "quantity": 1.0,
+            },
+        },
+    )
+    assert reply["type"] == "ack"
+    assert reply["id"] == "c1"
+    assert reply["command"] == "place"
+    assert reply["data"]["order"]["id"] == str(order_id)
+    kwargs = order_service.place_order.call_args.kwargs
+    assert kwargs["user_id"] == "u1"
+    assert isinstance(kwargs["order_request"], PlaceOrderRequest)
+    order_limiter.acquire.assert_called_once_with("u1")
+
+
+@pytest.mark.asyncio
+async def test_place_rejects_invalid_order(order_service, order_limiter):
+    order_service.place_order = AsyncMock()
+    reply = await ws_order_service.handle_order_command(
+        "u1",
+        {
+            "type": "place",
+            "id": "c2",
+            "order": {"side": "BUY", "order_type": "MARKET", "quantity": 0},
+        },
+    )
+    assert reply["type"] == "reject"
+    assert reply["id"] == "c2"
+    assert reply["error"][0]["loc"] == ["quantity"]
+    order_service.place_order.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_place_rejected_when_rate_limited(order_service, order_limiter):
+    order_limiter.acquire.return_value = 0.5
+    reply = await ws_order_service.handle_order_command(
+        "u1", {"type": "place", "id": "c3", "order": {}}
+    )
+    assert reply == {
+        "type": "reject",
+        "command": "place",
+        "id": "c3",
+        "error": "Too many requests",
+    }
+
+
+@pytest.mark.asyncio
+async def test_cancel_ack_and_reject(order_service, order_limiter):
+    order_service.cancel_order.return_value = True
+    reply = await ws_order_service.handle_order_command(
+        "u1", {"type": "cancel", "id": "c4", "order_id": "o1"}
+    )
+    assert reply["type"] == "ack"
+    assert reply["data"] == {"order_id": "o1"}
+    order_service.cancel_order.assert_called_once_with(
+        user_id="u1", order_id="o1"
+    )
+
+    order_service.cancel_order.return_value = False
+    reply = await ws_order_service.handle_order_command(
+        "u1", {"type": "cancel", "id": "c5", "order_id": "o1"}
+    )
+    assert reply["type"] == "reject"
+    assert reply["error"] == "Order not found or cannot be cancelled"
+    order_limiter.acquire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_amend_acks_and_counts_against_limit(
+    order_service, order_limiter
+):
+    order_service.amend_order.return_value = {
+        "trades": [],
+        "order": None,
+        "order_executed": False,
+    }
+    reply = await ws_order_service.handle_order_command(
+        "u1", {"type": "amend", "id": "c6", "order_id": "o1", "price": 99.5}
+    )
+    assert reply["type"] == "ack"
+    assert reply["id"] == "c6"
+    order_service.amend_order.assert_called_once_with(
+        user_id="u1", order_id="o1", quantity=None, price=99.5
+    )
+    order_limiter.acquire.assert_called_once_with("u1")
+
+
+@pytest.mark.asyncio
+async def test_commands_use_the_book_of_their_symbol(order_limiter):
+    service = MagicMock()
+    service.run_priority_command = AsyncMock(return_value=True)
+    with (
+        patch.object(ws_order_service, "SessionLocal", MagicMock()),
+        patch.object(
+            ws_order_service, "OrderBookService", return_value=service
+        ) as service_class,
+    ):
+        await ws_order_service.handle_order_command(
+            "u1",
+            {"type": "cancel", "id": "c7", "order_id": "o1", "symbol": "ETH"},
+        )
+        assert service_class.call_args.args[1] == "ETH"
+
+        service.place_order = AsyncMock(return_value={})
+        await ws_order_service.handle_order_command(
+            "u1",
+            {
+                "type": "place",
+                "id": "c8",
+                "order": {
+                    "symbol": "SOL",
+                    "side": "BUY",
+                    "order_type": "MARKET",
+                    "quantity": 1.0,
+                },
+            },
+        )
+        assert service_class.call_args.args[1] == "SOL"
+
+
+@pytest.mark.asyncio
+async def test_place_shed_when_overloaded(order_service, order_limiter):
+    order_service.place_order = AsyncMock()
+    order_service.cancel_order.return_value = True
+    with patch.object(
+        ws_order_service.order_admission, "admit", return_value=1
+    ):
+        place = await ws_order_service.handle_order_command(
+            "u1",
+            {
+                "type": "place",
+                "id": "c1",
+                "order": {
+                    "side": "BUY",
+                    "order_type": "LIMIT",
+                    "price": 100.0,
+                    "quantity": 1.0,
+                },
+            },
+        )
+        cancel = await ws_order_service.handle_order_command(
+            "u1", {"type": "cancel", "id": "c2", "order_id": "o1"}
+        )
+
+    assert place["type"] == "reject"
+    assert place["error"] == "Server busy, retry later"
+    order_service.place_order.assert_not_called()
+    assert cancel["type"] == "ack"
+
+
+@pytest.mark.asyncio
+async def test_place_is_tracked_by_admission(order_service, order_limiter):
+    order_service.place_order = AsyncMock(side_effect=ValueError("bad"))
+    admission = ws_order_service.order_admission
+    in_flight = admission.in_flight
+
+    await ws_order_service.handle_order_command(
+        "u1",
+        {
+            "type": "place",
+            "id": "c1",
+            "order": {
+                "side": "BUY",
+                "order_type": "LIMIT",
+                "price": 100.0,
+                "quantity": 1.0,
+            },
+        },
+    )
+
+    assert admission.in_flight == in_flight
+    assert admission.admitted >= 1
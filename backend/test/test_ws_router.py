@@ -208,3 +208,86 @@ def test_websocket_malformed_json_triggers_outer_exception(
             assert "Successfully connected" in data
             websocket.send_text("not-a-json")
             # Should trigger the outer exception handler and close
+
+
+@patch("app.api.routers.ws_router.decode_access_token")
+@patch("app.api.routers.ws_router.ws_manager")
+def test_websocket_negotiates_msgpack_encoding(
+    mock_ws_manager, mock_decode, client
+):
+    mock_decode.return_value = {"user_id": "u1"}
+    mock_ws_manager.connect = AsyncMock()
+    with client.websocket_connect(
+        "/api/v1/ws/update?token=goodtoken&encoding=msgpack"
+    ) as websocket:
+        data = websocket.receive_text()
+        assert '"encoding": "msgpack"' in data
+        websocket.close()
+    mock_ws_manager.connect.assert_awaited_once()
+    assert mock_ws_manager.connect.call_args.kwargs["encoding"] == "msgpack"
+
+
+@patch("app.api.routers.ws_router.decode_access_token")
+@patch("app.api.routers.ws_router.ws_manager")
+def test_websocket_resume_replays_from_buffer(
+    mock_ws_manager, mock_decode, client
+):
+    mock_decode.return_value = {"user_id": "u1"}
+    mock_ws_manager.connect = AsyncMock()
+    mock_ws_manager.replay = AsyncMock()
+    with client.websocket_connect(
+        "/api/v1/ws/update?token=goodtoken"
+    ) as websocket:
+        websocket.receive_text()
+        websocket.send_text('{"type": "resume", "last_seq": {"book": 7}}')
+        websocket.send_text('{"type": "ping"}')
+        websocket.receive_text()
+        websocket.close()
+    mock_ws_manager.replay.assert_awaited_once()
+    assert mock_ws_manager.replay.call_args.args[1] == {"book": 7}
+
+
+@patch("app.api.routers.ws_router.decode_access_token")
+@patch("app.api.routers.ws_router.ws_manager")
+def test_websocket_bad_resume_keeps_the_connection(
+    mock_ws_manager, mock_decode, client
+):
+    mock_decode.return_value = {"user_id": "u1"}
+    mock_ws_manager.connect = AsyncMock()
+    mock_ws_manager.replay = AsyncMock(side_effect=ValueError("bad last_seq"))
+    mock_ws_manager.send_to_connection = AsyncMock()
+    with client.websocket_connect(
+        "/api/v1/ws/update?token=goodtoken"
+    ) as websocket:
+        websocket.receive_text()
+        websocket.send_text('{"type": "resume", "last_seq": ["book"]}')
+        websocket.send_text('{"type": "ping"}')
+        assert websocket.receive_text() == '{"type": "pong"}'
+        websocket.close()
+    error = mock_ws_manager.send_to_connection.call_args.args[1]
+    assert error == {"event": "error", "message": "bad last_seq"}
+
+
+@patch("app.api.routers.ws_router.handle_order_command")
+@patch("app.api.routers.ws_router.decode_access_token")
+@patch("app.api.routers.ws_router.ws_manager")
+def test_websocket_routes_order_commands(
+    mock_ws_manager, mock_decode, mock_handle, client
+):
+    mock_decode.return_value = {"user_id": "u1"}
+    mock_ws_manager.connect = AsyncMock()
+    mock_ws_manager.send_to_connection = AsyncMock()
+    reply = {"type": "ack", "command": "cancel", "id": "c1", "data": {}}
+    mock_handle.return_value = reply
+    with client.websocket_connect(
+        "/api/v1/ws/update?token=goodtoken"
+    ) as websocket:
+        websocket.receive_text()
+        websocket.send_text('{"type": "cancel", "id": "c1", "order_id": "o1"}')
+        websocket.send_text('{"type": "ping"}')
+        websocket.receive_text()
+        websocket.close()
+    mock_handle.assert_awaited_once_with(
+        "u1", {"type": "cancel", "id": "c1", "order_id": "o1"}
+    )
+    assert mock_ws_manager.send_to_connection.call_args.args[1] == reply
@@ -1,6 +1,9 @@
+import asyncio
+import json
 import pytest
+from fastapi import status
 from unittest.mock import AsyncMock
-from app.api.services.ws_service import WebSocketManager
+from app.api.services.ws_service import WebSocketManager, TopicBuffer
 from datetime import datetime
 from decimal import Decimal
 from uuid import uuid4
@@ -35,9 +38,10 @@ async def test_connect_and_disconnect_adds_and_removes(
 @pytest.mark.asyncio
 async def test_send_personal_message_success(ws_manager, fake_websocket):
     user_id = "user2"
-    ws_manager.active_connections[user_id] = [fake_websocket]
+    await ws_manager.connect(fake_websocket, user_id)
     msg = {"foo": "bar"}
     await ws_manager.send_personal_message(msg, user_id)
+    await ws_manager.drain()
     fake_websocket.send_text.assert_called_once()
 
 
@@ -47,17 +51,20 @@ async def test_send_personal_message_disconnect_on_error(
 ):
     user_id = "user3"
     fake_websocket.send_text.side_effect = Exception("fail")
-    ws_manager.active_connections[user_id] = [fake_websocket]
+    await ws_manager.connect(fake_websocket, user_id)
     await ws_manager.send_personal_message({"foo": "bar"}, user_id)
+    await ws_manager.drain()
     assert fake_websocket not in ws_manager.active_connections.get(user_id, [])
+    assert fake_websocket not in ws_manager.connection_states
 
 
 @pytest.mark.asyncio
 async def test_broadcast_message_success(ws_manager, fake_websocket):
-    ws_manager.all_connections = [fake_websocket]
-    ws_manager.active_connections["user4"] = [fake_websocket]
+    await ws_manager.connect(fake_websocket, "user4")
     await ws_manager.broadcast_message({"event": "test"})
+    await ws_manager.drain()
     fake_websocket.send_text.assert_called_once()
+    assert ws_manager.get_connection_state(fake_websocket).messages_sent == 1
 
 
 @pytest.mark.asyncio
@@ -65,10 +72,62 @@ async def test_broadcast_message_disconnect_on_error(
     ws_manager, fake_websocket
 ):
     fake_websocket.send_text.side_effect = Exception("fail")
-    ws_manager.all_connections = [fake_websocket]
-    ws_manager.active_connections["user5"] = [fake_websocket]
+    await ws_manager.connect(fake_websocket, "user5")
     await ws_manager.broadcast_message({"event": "test"})
+    await ws_manager.drain()
     assert fake_websocket not in ws_manager.active_connections.get("user5", [])
+    assert fake_websocket not in ws_manager.all_connections
+
+
+@pytest.mark.asyncio
+async def test_broadcast_failure_only_drops_dead_socket(ws_manager):
+    alive, dead = AsyncMock(), AsyncMock()
+    dead.send_text.side_effect = Exception("fail")
+    await ws_manager.connect(alive, "user7")
+    await ws_manager.connect(dead, "user7")
+    await ws_manager.broadcast_message({"event": "test"})
+    await ws_manager.drain()
+    assert ws_manager.active_connections["user7"] == {alive}
+    assert ws_manager.all_connections == {alive}
+    assert dead not in ws_manager.connection_states
+
+
+@pytest.mark.asyncio
+async def test_slow_socket_does_not_hold_up_the_others():
+    ws_manager = WebSocketManager(send_queue_size=2)
+    slow, fast = AsyncMock(), AsyncMock()
+    release = asyncio.Event()
+
+    async def blocked_send(payload):
+        await release.wait()
+
+    slow.send_text.side_effect = blocked_send
+    await ws_manager.connect(slow, "slow")
+    await ws_manager.connect(fast, "fast")
+
+    for n in range(4):
+        await ws_manager.broadcast_message({"n": n})
+        await asyncio.sleep(0)
+    await ws_manager.drain()
+
+    assert fast.send_text.await_count == 4
+    # One message in flight and two queued, the fourth does not fit
+    assert ws_manager.slow_disconnects == 1
+    assert ws_manager.all_connections == {fast}
+    await asyncio.sleep(0)
+    slow.close.assert_awaited_once_with(code=status.WS_1013_TRY_AGAIN_LATER)
+
+
+@pytest.mark.asyncio
+async def test_connection_state_tracks_owner(ws_manager, fake_websocket):
+    await ws_manager.connect(fake_websocket, "user8")
+    state = ws_manager.get_connection_state(fake_websocket)
+    assert state.user_id == "user8"
+    assert state.subscriptions == set()
+    # Owner is resolved from the state map when user_id is omitted
+    ws_manager.disconnect(fake_websocket)
+    assert "user8" not in ws_manager.active_connections
+    assert ws_manager.get_connection_state(fake_websocket) is None
 
 
 @pytest.mark.asyncio
@@ -111,3 +170,169 @@ def test_json_serializer_type_error(ws_manager):
 
     with pytest.raises(TypeError):
         ws_manager._json_serializer(Foo())
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_per_connection_encoding(ws_manager):
+    json_ws, binary_ws = AsyncMock(), AsyncMock()
+    await ws_manager.connect(json_ws, "user9")
+    await ws_manager.connect(binary_ws, "user10", encoding="msgpack")
+    await ws_manager.broadcast_message({"event": "test"})
+    await ws_manager.drain()
+    json_ws.send_text.assert_awaited_once()
+    binary_ws.send_bytes.assert_awaited_once()
+    binary_ws.send_text.assert_not_called()
+
+
+def test_topic_buffer_since_returns_missing_events():
+    buffer = TopicBuffer("book", size=10)
+    for i in range(5):
+        buffer.append({"n": i})
+    missing = buffer.since(3)
+    assert [event["seq"] for event in missing] == [4, 5]
+    assert buffer.since(5) == []
+
+
+def test_topic_buffer_snapshot_when_too_far_behind():
+    buffer = TopicBuffer("book", size=3)
+    for i in range(10):
+        buffer.append({"n": i})
+    for last_seq in (None, 2, 42):
+        (snapshot,) = buffer.since(last_seq)
+        assert snapshot["seq"] == 10
+        assert snapshot["snapshot"] is True
+    # Oldest event still in the ring is 8, so 7 can be caught up
+    assert [event["seq"] for event in buffer.since(7)] == [8, 9, 10]
+
+
+@pytest.mark.asyncio
+async def test_book_update_only_reaches_subscribers(ws_manager):
+    btc, eth, everything = AsyncMock(), AsyncMock(), AsyncMock()
+    for user_id, socket in (("u1", btc), ("u2", eth), ("u3", everything)):
+        await ws_manager.connect(socket, user_id)
+    ws_manager.subscribe(btc, ["BTC-USD"])
+    ws_manager.subscribe(eth, ["ETH-USD"])
+
+    await ws_manager.broadcast_book_update({"bids": [], "asks": []}, "ETH-USD")
+    await ws_manager.drain()
+
+    btc.send_text.assert_not_called()
+    message = json.loads(eth.send_text.call_args.args[0])
+    assert message["symbol"] == "ETH-USD"
+    assert message["topic"] == "book.ETH-USD"
+    everything.send_text.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_with_topic_sequences_without_connections(ws_manager):
+    await ws_manager.broadcast_message({"type": "book"}, topic="book")
+    await ws_manager.broadcast_message({"type": "book"}, topic="book")
+    assert ws_manager.topics["book"].seq == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_sends_missing_events_and_completion(
+    ws_manager, fake_websocket
+):
+    await ws_manager.connect(fake_websocket, "user11")
+    for price in (1.0, 2.0, 3.0):
+        await ws_manager.broadcast_price_change(price, datetime.utcnow())
+    await ws_manager.drain()
+    fake_websocket.send_text.reset_mock()
+
+    await ws_manager.replay(fake_websocket, {"price.BTC-USD": 1, "unknown": 4})
+
+    sent = [
+        json.loads(call.args[0])
+        for call in fake_websocket.send_text.call_args_list
+    ]
+    assert [msg.get("seq") for msg in sent[:-1]] == [2, 3]
+    assert sent[-1] == {
+        "type": "resume_complete",
+        "seq": {"price.BTC-USD": 3},
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "last_seq",
+    [
+        ["price.BTC-USD"],
+        {"price.BTC-USD": "1"},
+        {"price.BTC-USD": 1.5},
+        {"price.BTC-USD": True},
+    ],
+)
+async def test_replay_rejects_malformed_last_seq(
+    ws_manager, fake_websocket, last_seq
+):
+    await ws_manager.connect(fake_websocket, "user11")
+    await ws_manager.broadcast_price_change(1.0, datetime.utcnow())
+    await ws_manager.drain()
+    fake_websocket.send_text.reset_mock()
+
+    with pytest.raises(ValueError):
+        await ws_manager.replay(fake_websocket, last_seq)
+
+    fake_websocket.send_text.assert_not_called()
+    assert ws_manager.get_connection_state(fake_websocket) is not None
+
+
+@pytest.mark.asyncio
+async def test_send_executions_calls_personal(ws_manager):
+    ws_manager.send_personal_message = AsyncMock()
+    await ws_manager.send_executions("user12", {"fills": [], "orders": []})
+    message, user_id = ws_manager.send_personal_message.call_args[0]
+    assert message["event"] == "executions"
+    assert user_id == "user12"
+
+
+@pytest.mark.asyncio
+async def test_check_heartbeats_pings_quiet_and_reaps_stale(ws_manager):
+    active, quiet, stale = AsyncMock(), AsyncMock(), AsyncMock()
+    for i, websocket in enumerate((active, quiet, stale)):
+        await ws_manager.connect(websocket, f"user-hb-{i}")
+    ws_manager.get_connection_state(quiet).last_activity -= 20
+    ws_manager.get_connection_state(stale).last_activity -= 60
+
+    reaped = await ws_manager.check_heartbeats(interval=15, timeout=45)
+    await ws_manager.drain()
+
+    assert reaped == 1
+    stale.close.assert_awaited_once()
+    assert stale not in ws_manager.all_connections
+    quiet.send_text.assert_awaited_once_with('{"type": "ping"}')
+    active.send_text.assert_not_called()
+    assert ws_manager.all_connections == {active, quiet}
+
+
+@pytest.mark.asyncio
+async def test_touch_resets_idle_time(ws_manager, fake_websocket):
+    await ws_manager.connect(fake_websocket, "user-hb")
+    state = ws_manager.get_connection_state(fake_websocket)
+    state.last_activity -= 60
+    ws_manager.touch(fake_websocket)
+    assert await ws_manager.check_heartbeats(interval=15, timeout=45) == 0
+    assert fake_websocket in ws_manager.all_connections
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_task_start_stop(ws_manager):
+    ws_manager.start_heartbeats(interval=0.01, timeout=0.02)
+    task = ws_manager._heartbeat_task
+    ws_manager.start_heartbeats()
+    assert ws_manager._heartbeat_task is task
+    await ws_manager.stop_heartbeats()
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_send_to_connection_uses_negotiated_encoding(ws_manager):
+    binary_ws = AsyncMock()
+    await ws_manager.connect(binary_ws, "user11", encoding="msgpack")
+    assert await ws_manager.send_to_connection(binary_ws, {"type": "ack"})
+    binary_ws.send_bytes.assert_awaited_once()
+
+    binary_ws.send_bytes.side_effect = Exception("closed")
+    assert not await ws_manager.send_to_connection(binary_ws, {"type": "ack"})
+    assert binary_ws not in ws_manager.all_connections
@@ -45,6 +45,13 @@ interface OrderData {
   [key: string]: any;
 }
 
+interface OrderStatusData {
+  order_id: string;
+  status: string;
+  filled_quantity: number;
+  remaining_quantity: number;
+}
+
 interface WebSocketContextType {
   isConnected: boolean;
   error: string | null;
@@ -92,11 +99,13 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
     try {
       const msg = JSON.parse(event.data);
 
-      // Handle order_status event
-      if (msg.event === 'order_status' && msg.data) {
-        console.log('[WS] ✅ Processing order status update');
-        const { order_id, status, filled_quantity, remaining_quantity } = msg.data;
-        
+      // Answer server heartbeats so the connection is not reaped as idle
+      if (msg.type === 'ping') {
+        wsRef.current?.send(JSON.stringify({ type: 'pong' }));
+        return;
+      }
+
+      const applyOrderStatus = ({ order_id, status, remaining_quantity }: OrderStatusData) => {
         // Update the order in real-time
         setActiveOrders(prevActive => {
           const orderIndex = prevActive.findIndex(order => order.id === order_id);
@@ -154,7 +163,19 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
           
           return prevActive;
         });
-        
+      };
+
+      // Handle order_status event
+      if (msg.event === 'order_status' && msg.data) {
+        console.log('[WS] ✅ Processing order status update');
+        applyOrderStatus(msg.data);
+        return;
+      }
+
+      // Handle batched executions event (one message per matching pass)
+      if (msg.event === 'executions' && msg.data) {
+        console.log('[WS] ✅ Processing executions update');
+        msg.data.orders.forEach(applyOrderStatus);
         return;
       }
 